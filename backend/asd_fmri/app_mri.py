@@ -0,0 +1,668 @@
+"""
+Flask Web Application for MRI-based ASD Detection
+This application provides a web interface for uploading NIfTI MRI scans
+and predicting ASD diagnosis using a trained SVM model.
+"""
+
+import os
+import sys
+import json
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
+from flask_cors import CORS
+from werkzeug.utils import secure_filename
+import traceback
+
+import mri_atlas
+import mri_features
+import mri_feature_store
+import mri_jobs
+import mri_upload
+
+# Shared model registry lives in backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import model_registry
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+app = Flask(__name__)
+CORS(app)  # Enable cross-origin requests
+
+# Configuration
+UPLOAD_FOLDER = 'mri_uploads'
+ALLOWED_EXTENSIONS = {'gz', 'nii'}  # .nii.gz files
+MAX_FILE_SIZE = 500 * 1024 * 1024  # 500 MB
+
+# Batch endpoint: feature extraction processes, and the only server-side
+# directory tree it may read scans from (directory mode is off when unset)
+BATCH_WORKERS = int(os.environ.get('MRI_BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_DIRECTORY_ROOT = os.environ.get('MRI_BATCH_ROOT')
+
+# Job API: scans analysed concurrently, and jobs accepted before submit returns 503
+JOB_WORKERS = int(os.environ.get('MRI_JOB_WORKERS', 2))
+JOB_QUEUE_SIZE = int(os.environ.get('MRI_JOB_QUEUE', 64))
+
+app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+
+# ============================================================
+# LOAD MODEL AND PREPROCESSING TOOLS
+# ============================================================
+
+# Global variables for model and preprocessing tools
+model = None
+scaler = None
+atlas = None
+
+# Artifact names in backend/model_registry.json
+MODEL_ARTIFACT = 'mri_svm'
+SCALER_ARTIFACT = 'mri_svm_scaler'
+TRAINING_DATASET_INFO = 'ABIDE dataset (Stanford, UCLA, Caltech, Oregon, Michigan)'
+
+# Set dynamically at startup from loaded model
+EXPECTED_FEATURES = None
+
+
+def initialize_model():
+    """Load the trained model, scaler, and preprocessing tools."""
+    global model, scaler, atlas
+    
+    print("="*70)
+    print("INITIALIZING MRI-BASED ASD DETECTION APPLICATION")
+    print("="*70)
+    
+    try:
+        # Load model and scaler (verified and memory-mapped by the registry)
+        model_entry = model_registry.resolve(MODEL_ARTIFACT)
+        scaler_path = model_registry.artifact_path(SCALER_ARTIFACT)
+        
+        print(f"\n[1/3] Loading trained model from: {model_entry['path']}")
+        model = model_registry.load(MODEL_ARTIFACT)
+        print(f"  ✓ Model loaded successfully ({MODEL_ARTIFACT} v{model_entry['version']}, {model_entry['format']})")
+        print(f"  ✓ Training data: {TRAINING_DATASET_INFO}")
+
+        # Detect how many features the model actually expects
+        global EXPECTED_FEATURES
+        if hasattr(model, 'n_features_in_'):
+            EXPECTED_FEATURES = int(model.n_features_in_)
+        elif hasattr(model, 'support_vectors_'):
+            EXPECTED_FEATURES = int(model.support_vectors_.shape[1])
+        else:
+            EXPECTED_FEATURES = 1128  # fallback default
+        print(f"  ✓ Model expects {EXPECTED_FEATURES} input features")
+
+        print(f"\n[2/3] Loading scaler from: {scaler_path}")
+        if os.path.exists(scaler_path):
+            candidate_scaler = model_registry.load(SCALER_ARTIFACT)
+            scaler_features = getattr(candidate_scaler, 'n_features_in_', None)
+            if scaler_features is not None and scaler_features != EXPECTED_FEATURES:
+                print(f"  ⚠ Scaler expects {scaler_features} features but model expects {EXPECTED_FEATURES}.")
+                print(f"  ⚠ Scaler is incompatible — skipping it. Retrain with train_abide2_model.py to fix.")
+                scaler = None
+            else:
+                scaler = candidate_scaler
+                print("  ✓ Scaler loaded and verified compatible")
+        else:
+            scaler = None
+            print("  ⚠ Scaler file not found. Using model without external scaler.")
+        
+        # Load atlas and initialize preprocessing tools
+        print("\n[3/3] Initializing preprocessing tools...")
+        atlas = mri_atlas.load_atlas()
+        print("  ✓ Harvard-Oxford Atlas loaded")
+        print("  ✓ Preprocessing tools initialized")
+        
+        print("\n" + "="*70)
+        print("✅ APPLICATION READY TO ACCEPT REQUESTS")
+        print("="*70)
+        
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ ERROR during initialization: {e}")
+        print(traceback.format_exc())
+        return False
+
+# None until the first request (or __main__) loads the model. Nothing heavy runs
+# at import: spawned batch pool workers re-import this module as __mp_main__.
+initialization_success = None
+_initialization_lock = threading.Lock()
+
+def model_ready():
+    """Initialize the model on first use; True when it is loaded."""
+    global initialization_success
+    with _initialization_lock:
+        if initialization_success is None:
+            initialization_success = initialize_model()
+    return initialization_success and model is not None
+
+# ============================================================
+# HELPER FUNCTIONS
+# ============================================================
+
+def allowed_file(filename):
+    """Check if the uploaded file has an allowed extension."""
+    # Check for .nii.gz or .nii
+    return filename.endswith('.nii.gz') or filename.endswith('.nii')
+
+# Uploads are streamed to UPLOAD_FOLDER, hashed and header-checked while they arrive
+app.request_class = mri_upload.scan_request_class(UPLOAD_FOLDER, allowed_file, mri_features.validate_fmri_shape)
+
+@app.errorhandler(mri_upload.InvalidScanUpload)
+def invalid_scan_upload(e):
+    """Scan rejected from its header before the upload finished."""
+    print(f"❌ Rejected upload {e.filename}: {e.message}")
+    return jsonify({"error": e.message, "filename": e.filename}), 400
+
+def process_mri_scan(scan_path, digest=None):
+    """
+    Process a single MRI scan and extract connectivity features.
+
+    Args:
+        scan_path: Path to the NIfTI file (.nii.gz)
+        digest: SHA-256 of the file when already known (streamed uploads)
+
+    Returns:
+        numpy array: Feature vector (upper triangle of connectivity matrix)
+    """
+    try:
+        # Scans seen before (same content, atlas and feature version) come from the store
+        features, cached = mri_feature_store.scan_features(
+            scan_path, digest=digest, filename=os.path.basename(scan_path)
+        )
+        if cached:
+            print("  ✓ Connectivity features found in feature store")
+        return mri_features.align_features(features, EXPECTED_FEATURES or 1128)
+    except ValueError:
+        raise  # re-raise user-facing validation errors as-is
+    except Exception as e:
+        raise Exception(f"Error processing MRI scan: {str(e)}")
+
+def compute_class_probabilities_batch(model_obj, features_2d, predictions):
+    """Return (control_probabilities, asd_probabilities) arrays using available model APIs."""
+    if hasattr(model_obj, 'predict_proba'):
+        probs = model_obj.predict_proba(features_2d)
+        if probs.shape[1] >= 2:
+            return probs[:, 0].astype(float), probs[:, 1].astype(float)
+
+    if hasattr(model_obj, 'decision_function'):
+        decision = np.ravel(model_obj.decision_function(features_2d)).astype(float)
+        asd_prob = 1.0 / (1.0 + np.exp(-decision))
+        return 1.0 - asd_prob, asd_prob
+
+    asd_prob = (np.asarray(predictions) == 1).astype(float)
+    return 1.0 - asd_prob, asd_prob
+
+def predict_asd_batch(features_2d):
+    """
+    Predict a stacked (n_scans, n_features) matrix with one scaler/model call.
+
+    Returns:
+        list of dict: One prediction result per row, as returned by predict_asd
+    """
+    try:
+        # Scale features if a standalone scaler is available
+        features_input = scaler.transform(features_2d) if scaler is not None else features_2d
+
+        # Make prediction
+        predictions = model.predict(features_input).astype(int)
+
+        # Get probability estimates (model API dependent)
+        control_probs, asd_probs = compute_class_probabilities_batch(model, features_input, predictions)
+
+        results = []
+        for prediction, control_probability, asd_probability in zip(predictions, control_probs, asd_probs):
+            # Interpret results
+            diagnosis = "ASD" if prediction == 1 else "Control"
+            prediction_label = "ASD Detected" if prediction == 1 else "No ASD Detected"
+            confidence = asd_probability if prediction == 1 else control_probability
+
+            results.append({
+                "prediction": prediction_label,
+                "diagnosis": diagnosis,
+                "confidence": float(confidence),
+                "asd_probability": float(asd_probability),
+                "control_probability": float(control_probability)
+            })
+        return results
+
+    except Exception as e:
+        raise Exception(f"Error making prediction: {str(e)}")
+
+def predict_asd(features):
+    """
+    Make ASD prediction using the trained model.
+    
+    Args:
+        features: Feature vector from MRI scan
+    
+    Returns:
+        dict: Prediction result with diagnosis and confidence
+    """
+    return predict_asd_batch(features.reshape(1, -1))[0]
+
+# ============================================================
+# ROUTES
+# ============================================================
+
+@app.route('/')
+def home():
+    """Serve the main page."""
+    return render_template('mri_screener.html')
+
+@app.route('/predict_mri', methods=['POST'])
+def predict_mri():
+    """
+    Unique endpoint for MRI-based ASD prediction.
+    Accepts a .nii.gz file and returns diagnosis prediction.
+    """
+    # Check if model is loaded
+    if not model_ready():
+        return jsonify({
+            "error": "Model not initialized. Please check server logs."
+        }), 500
+    
+    # Check if file is present in request (support multiple field names for compatibility)
+    upload_key = None
+    for candidate_key in ('mri_file', 'mri_scan', 'file'):
+        if candidate_key in request.files:
+            upload_key = candidate_key
+            break
+
+    if upload_key is None:
+        return jsonify({
+            "error": "No MRI file provided. Please upload using mri_file, mri_scan, or file field."
+        }), 400
+    
+    file = request.files[upload_key]
+    
+    # Check if file is selected
+    if file.filename == '':
+        return jsonify({
+            "error": "No file selected. Please choose a file to upload."
+        }), 400
+    
+    # Check file extension
+    if not allowed_file(file.filename):
+        return jsonify({
+            "error": "Invalid file format. Please upload a .nii or .nii.gz file."
+        }), 400
+    
+    # The header was already validated while streaming; no header at all means not NIfTI
+    if file.stream.shape is None:
+        return jsonify({
+            "error": "Invalid file: no NIfTI header found. Please upload a .nii or .nii.gz file."
+        }), 400
+
+    try:
+        # Already on disk: the upload was streamed to its temporary file
+        filename = secure_filename(file.filename)
+        filepath = file.stream.path
+        file.stream.flush()
+        
+        print(f"\n📁 Processing uploaded file: {filename}")
+        
+        # Process MRI scan and extract features
+        print("  [1/3] Extracting connectivity features...")
+        features = process_mri_scan(filepath, file.stream.digest)
+        print(f"  ✓ Extracted {len(features)} features")
+        
+        # Make prediction
+        print("  [2/3] Making prediction...")
+        result = predict_asd(features)
+        print(f"  ✓ Prediction: {result['diagnosis']} (confidence: {result['confidence']:.2%})")
+        
+        # Clean up uploaded file
+        print("  [3/3] Cleaning up...")
+        os.remove(filepath)
+        print("  ✓ Temporary file removed")
+        
+        print(f"✅ Request completed successfully\n")
+        
+        # Return prediction result
+        return jsonify({
+            "success": True,
+            "prediction": result['prediction'],
+            "diagnosis": result['diagnosis'],
+            "confidence": result['confidence'],
+            "asd_probability": result['asd_probability'],
+            "control_probability": result['control_probability'],
+            "dataset": TRAINING_DATASET_INFO,
+            "message": f"Analysis complete. {result['prediction']} with {result['confidence']:.1%} confidence."
+        })
+        
+    except Exception as e:
+        print(f"❌ Error processing request: {e}")
+        print(traceback.format_exc())
+        
+        # Clean up file if it exists
+        if 'filepath' in locals() and os.path.exists(filepath):
+            os.remove(filepath)
+        
+        return jsonify({
+            "error": f"An error occurred during processing: {str(e)}"
+        }), 500
+
+def remove_upload(path):
+    """Delete a detached upload if it is still on disk."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+batch_executor = None
+
+def get_batch_executor():
+    """Process pool for batch feature extraction, created on first use."""
+    global batch_executor
+    if batch_executor is None:
+        batch_executor = ProcessPoolExecutor(max_workers=max(1, BATCH_WORKERS))
+    return batch_executor
+
+def batch_scan_paths():
+    """
+    Collect (display name, path, is_upload, digest) for a batch request.
+
+    Uploaded files (any of the usual field names, repeated) are already
+    streamed to UPLOAD_FOLDER and hashed; they are detached from the request
+    so the pool can read them after it ends. A 'directory' form/JSON field selects scans under
+    MRI_BATCH_ROOT instead. Raises ValueError with a user-facing message.
+    """
+    uploads = []
+    for key in ('mri_files', 'mri_file', 'mri_scan', 'file'):
+        for file in request.files.getlist(key):
+            if not file.filename:
+                continue
+            if not allowed_file(file.filename):
+                raise ValueError(f"Invalid file format: {file.filename}. Please upload .nii or .nii.gz files.")
+            if file.stream.shape is None:
+                raise ValueError(f"Invalid file: {file.filename} has no NIfTI header.")
+            uploads.append(file)
+
+    directory_scans = []
+    payload = request.get_json(silent=True) or {}
+    directory = request.form.get('directory') or payload.get('directory')
+    if directory:
+        if not BATCH_DIRECTORY_ROOT:
+            raise ValueError("Directory scans are disabled. Set MRI_BATCH_ROOT on the server to enable them.")
+        root = os.path.realpath(BATCH_DIRECTORY_ROOT)
+        directory = os.path.realpath(os.path.join(root, directory))
+        if os.path.commonpath([root, directory]) != root or not os.path.isdir(directory):
+            raise ValueError("Directory not found under MRI_BATCH_ROOT.")
+        for name in sorted(os.listdir(directory)):
+            if allowed_file(name):
+                directory_scans.append((name, os.path.join(directory, name), False, None))
+
+    # Only detached once the whole request is accepted, so a rejected batch leaves no files behind
+    scans = []
+    for file in uploads:
+        file.stream.flush()
+        scans.append((secure_filename(file.filename), file.stream.detach(), True, file.stream.digest))
+    return scans + directory_scans
+
+@app.route('/predict_mri/batch', methods=['POST'])
+def predict_mri_batch():
+    """
+    Batch MRI prediction.
+    Region time series are extracted concurrently in a process pool; every
+    group of scans that finishes together is correlated in stacked kernel
+    calls (store hits skip this), scored with one scaler/model call and
+    streamed back immediately as NDJSON, one line per file, followed by a
+    summary line.
+    """
+    if not model_ready():
+        return jsonify({
+            "error": "Model not initialized. Please check server logs."
+        }), 500
+
+    try:
+        scans = batch_scan_paths()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not scans:
+        return jsonify({
+            "error": "No MRI files provided. Upload files using mri_files or pass a directory."
+        }), 400
+
+    n_expected = EXPECTED_FEATURES or 1128
+    pending = {}
+
+    def discard_pending():
+        # Client went away (or never read the body): drop queued work and the remaining uploads
+        for future, (name, path, is_upload) in list(pending.items()):
+            future.cancel()
+            if is_upload:
+                future.add_done_callback(lambda _, path=path: remove_upload(path))
+        pending.clear()
+
+    def generate():
+        succeeded = failed = 0
+        try:
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                ready = []
+                extracted = []
+                for future in done:
+                    name, path, is_upload = pending.pop(future)
+                    try:
+                        digest, features, time_series = future.result()
+                        if features is None:
+                            extracted.append((name, digest, time_series))
+                        else:
+                            ready.append((name, mri_features.align_features(features, n_expected)))
+                    except Exception as e:
+                        failed += 1
+                        yield json.dumps({"filename": name, "success": False, "error": str(e)}) + "\n"
+                    if is_upload:
+                        remove_upload(path)
+
+                if extracted:
+                    # Newly extracted scans of this group are correlated in stacked kernel calls
+                    names, digests, time_series = zip(*extracted)
+                    try:
+                        vectors = mri_feature_store.store_time_series_features(
+                            time_series, digests, names, mri_feature_store.DEFAULT_STORE_DIR)
+                    except Exception as e:
+                        failed += len(names)
+                        for name in names:
+                            yield json.dumps({"filename": name, "success": False, "error": str(e)}) + "\n"
+                    else:
+                        ready.extend((name, mri_features.align_features(features, n_expected))
+                                     for name, features in zip(names, vectors))
+
+                if not ready:
+                    continue
+                try:
+                    results = predict_asd_batch(np.vstack([features for _, features in ready]))
+                except Exception as e:
+                    failed += len(ready)
+                    for name, _ in ready:
+                        yield json.dumps({"filename": name, "success": False, "error": str(e)}) + "\n"
+                    continue
+                for (name, _), result in zip(ready, results):
+                    succeeded += 1
+                    yield json.dumps({"filename": name, "success": True, **result}) + "\n"
+
+            yield json.dumps({
+                "summary": True,
+                "total": len(scans),
+                "succeeded": succeeded,
+                "failed": failed,
+                "dataset": TRAINING_DATASET_INFO
+            }) + "\n"
+        finally:
+            discard_pending()
+
+    handed_off = set()
+    try:
+        executor = get_batch_executor()
+        for name, path, is_upload, digest in scans:
+            future = executor.submit(mri_feature_store.scan_features_or_time_series, path,
+                                     mri_feature_store.DEFAULT_STORE_DIR, digest)
+            pending[future] = (name, path, is_upload)
+            handed_off.add(path)
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        # Runs even when the client disconnects before the body is iterated,
+        # in which case the generator (and its finally) never starts
+        response.call_on_close(discard_pending)
+        return response
+    except Exception:
+        discard_pending()
+        raise
+    finally:
+        # Uploads that never reached a worker are not removed anywhere else
+        for name, path, is_upload, digest in scans:
+            if is_upload and path not in handed_off:
+                remove_upload(path)
+
+job_queue = None
+
+def run_scan_job(payload, set_stage):
+    """One job: connectivity features in the process pool, then the SVM prediction."""
+    set_stage('extracting_features')
+    features, cached = get_batch_executor().submit(
+        mri_feature_store.scan_features,
+        payload['path'], mri_feature_store.DEFAULT_STORE_DIR, payload['digest'], payload['filename']
+    ).result()
+    features = mri_features.align_features(features, EXPECTED_FEATURES or 1128)
+
+    set_stage('predicting')
+    result = predict_asd(features)
+    return {
+        "success": True,
+        **result,
+        "features_cached": cached,
+        "dataset": TRAINING_DATASET_INFO,
+        "message": f"Analysis complete. {result['prediction']} with {result['confidence']:.1%} confidence."
+    }
+
+def remove_job_upload(payload):
+    """Delete the upload a job owned, once it finished or was interrupted."""
+    remove_upload(payload['path'])
+
+def get_job_queue():
+    """Job queue and its SQLite store, created on first use."""
+    global job_queue
+    if job_queue is None:
+        store = mri_jobs.JobStore()
+        interrupted = store.interrupt_unfinished()
+        if interrupted:
+            print(f"⚠️  Marked {len(interrupted)} unfinished MRI job(s) from a previous run as failed")
+        # Their uploads were never cleaned up by the process that queued them
+        for payload in interrupted:
+            if payload is not None:
+                remove_job_upload(payload)
+        job_queue = mri_jobs.JobQueue(run_scan_job, store, JOB_WORKERS, JOB_QUEUE_SIZE, remove_job_upload)
+    return job_queue
+
+def job_status(job):
+    """Public view of a job row: status, stage and timestamps, plus result or error when finished."""
+    status = {key: job[key] for key in ('job_id', 'filename', 'status', 'stage', 'created', 'updated')}
+    if job['status'] == mri_jobs.COMPLETED:
+        status['result'] = job['result']
+    elif job['status'] == mri_jobs.FAILED:
+        status['error'] = job['error']
+    return status
+
+@app.route('/predict_mri/jobs', methods=['POST'])
+def submit_mri_job():
+    """
+    Queue one uploaded scan for analysis and return its job ID at once (202).
+    Poll /predict_mri/jobs/<job_id> for the stage and /result for the outcome.
+    """
+    if not model_ready():
+        return jsonify({
+            "error": "Model not initialized. Please check server logs."
+        }), 500
+
+    file = next((request.files[key] for key in ('mri_file', 'mri_scan', 'file') if key in request.files), None)
+    if file is None or file.filename == '':
+        return jsonify({
+            "error": "No MRI file provided. Please upload using mri_file, mri_scan, or file field."
+        }), 400
+    if not allowed_file(file.filename):
+        return jsonify({
+            "error": "Invalid file format. Please upload a .nii or .nii.gz file."
+        }), 400
+    if file.stream.shape is None:
+        return jsonify({
+            "error": "Invalid file: no NIfTI header found. Please upload a .nii or .nii.gz file."
+        }), 400
+
+    filename = secure_filename(file.filename)
+    file.stream.flush()
+    # The job owns the file from here and removes it when done
+    payload = {"path": file.stream.detach(), "digest": file.stream.digest, "filename": filename}
+    try:
+        job_id = get_job_queue().submit(payload, filename)
+    except mri_jobs.QueueFull as e:
+        remove_job_upload(payload)
+        return jsonify({"error": str(e)}), 503
+
+    print(f"📥 Queued MRI job {job_id} for {filename}")
+    return jsonify({
+        "job_id": job_id,
+        "status": mri_jobs.QUEUED,
+        "status_url": f"/predict_mri/jobs/{job_id}",
+        "result_url": f"/predict_mri/jobs/{job_id}/result"
+    }), 202
+
+@app.route('/predict_mri/jobs/<job_id>', methods=['GET'])
+def get_mri_job(job_id):
+    """Status and current stage of a job."""
+    job = get_job_queue().store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job ID."}), 404
+    return jsonify(job_status(job))
+
+@app.route('/predict_mri/jobs/<job_id>/result', methods=['GET'])
+def get_mri_job_result(job_id):
+    """Prediction of a finished job; 202 while it is still queued or running."""
+    job = get_job_queue().store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job ID."}), 404
+    if job['status'] == mri_jobs.COMPLETED:
+        return jsonify(job['result'])
+    if job['status'] == mri_jobs.FAILED:
+        return jsonify({"error": job['error'], "job_id": job_id}), 422
+    return jsonify(job_status(job)), 202
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint to verify the service is running."""
+    return jsonify({
+        "status": "healthy",
+        "model_loaded": model is not None,
+        "scaler_loaded": scaler is not None,
+        "preprocessing_ready": atlas is not None
+    })
+
+# ============================================================
+# RUN APPLICATION
+# ============================================================
+
+if __name__ == '__main__':
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    if not model_ready():
+        print("\n⚠️  WARNING: Application started but model initialization failed.")
+        print("Please ensure the following files exist:")
+        print(f"  • {model_registry.artifact_path(MODEL_ARTIFACT)}")
+        print(f"  • {model_registry.artifact_path(SCALER_ARTIFACT)}")
+        print("\nRun 'python train_and_save_model.py' to generate these files.\n")
+    
+    print("\n" + "="*70)
+    print("STARTING FLASK SERVER")
+    print("="*70)
+    print("Server will run on: http://localhost:5002")
+    print("Endpoint: /predict_mri")
+    print("Jobs: POST /predict_mri/jobs, GET /predict_mri/jobs/<job_id>[/result]")
+    print("Press CTRL+C to stop the server")
+    print("="*70 + "\n")
+    
+    # Run on port 5002 to avoid conflicts with existing applications. Debug mode's
+    # reloader would import (and initialize) the app a second time, so it is opt-in.
+    app.run(host='0.0.0.0', port=5002, debug=os.environ.get('FLASK_DEBUG') == '1')
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Export the MRI CNN to TensorFlow Lite
+Converts asd_mri_model_best_56.h5 once into a .tflite graph that predict_mri.py
+loads instead of the Keras model (no patched layers, faster start-up, less
+memory). Optionally applies post-training INT8 quantization calibrated on a
+directory of sample scans.
+
+Usage:
+    python export_mri_model.py
+    python export_mri_model.py --int8 --calibration-dir ../uploads --samples 100
+"""
+
+import argparse
+import os
+import sys
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import numpy as np
+import tensorflow as tf
+
+import predict_mri
+
+SCAN_EXTENSIONS = ('.nii', '.nii.gz', '.png', '.jpg', '.jpeg')
+
+
+def calibration_images(calibration_dir, samples):
+    """Preprocessed (1, 128, 128, 1) inputs from the first `samples` scans in a directory."""
+    paths = sorted(
+        os.path.join(calibration_dir, name) for name in os.listdir(calibration_dir)
+        if name.lower().endswith(SCAN_EXTENSIONS)
+    )
+    images = []
+    for path in paths:
+        if len(images) >= samples:
+            break
+        try:
+            images.append(predict_mri.process_mri_scan(path).astype(np.float32))
+        except Exception as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+    return images
+
+
+def export(output_path, int8=False, calibration_dir=None, samples=100):
+    model = predict_mri.load_keras_model(predict_mri.MODEL_PATH)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if int8:
+        images = calibration_images(calibration_dir, samples)
+        if not images:
+            raise SystemExit(f"No usable calibration scans in {calibration_dir}")
+        print(f"Calibrating INT8 ranges on {len(images)} scans", file=sys.stderr)
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([image] for image in images)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # Inputs and outputs stay float32 so predict_mri feeds the same tensors
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+    # Compare against Keras so a bad export is noticed before it is deployed
+    check = np.concatenate(images[:16]) if int8 else np.random.rand(8, 128, 128, 1).astype(np.float32)
+    expected = model.predict(check, verbose=0).reshape(-1)
+    actual = predict_mri.TFLiteModel(output_path).predict(check).reshape(-1)
+    print(f"Wrote {output_path} ({os.path.getsize(output_path) / 1024:.0f} KB), "
+          f"max |keras - tflite| = {np.abs(expected - actual).max():.4f}", file=sys.stderr)
+
+    # The registry verifies the deployed file against this checksum
+    if os.path.abspath(output_path) == predict_mri.TFLITE_MODEL_PATH:
+        predict_mri.model_registry.record_checksum('mri_cnn_tflite')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the MRI CNN to TensorFlow Lite.')
+    parser.add_argument('--output', default=predict_mri.TFLITE_MODEL_PATH, help='Destination .tflite file')
+    parser.add_argument('--int8', action='store_true', help='Apply post-training INT8 quantization')
+    parser.add_argument('--calibration-dir', help='Directory of sample scans for INT8 calibration')
+    parser.add_argument('--samples', type=int, default=100, help='Maximum calibration scans')
+    args = parser.parse_args()
+
+    if args.int8 and not args.calibration_dir:
+        parser.error('--int8 requires --calibration-dir')
+
+    export(args.output, args.int8, args.calibration_dir, args.samples)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Shared Harvard-Oxford atlas for the connectivity SVM pipeline.
+The atlas is fetched through nilearn at most once and then kept as a local
+NIfTI copy, so app start-up is a file load with no network access. Label
+voxel indices are precomputed per scan grid (affine + shape) and cached in
+memory and on disk, so scans in an already seen space skip resampling.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import nibabel as nib
+import numpy as np
+
+ATLAS_NAME = 'cort-maxprob-thr25-2mm'
+ATLAS_DESCRIPTION = 'Harvard-Oxford Cortical (25% threshold, 2mm)'
+ATLAS_CACHE_DIR = os.environ.get(
+    'MRI_ATLAS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'atlas_cache')
+)
+
+_lock = threading.Lock()
+_atlas = None
+_label_indices = {}
+
+
+class LabelIndex:
+    """Atlas labels resampled onto one scan grid.
+
+    voxels holds the flat indices of the labelled voxels of a 3D volume with
+    the scan's shape, in Fortran order as NIfTI stores them, regions the 0-based region of each of
+    them, and labels the atlas value of each region.
+    """
+
+    def __init__(self, voxels, regions, labels):
+        self.voxels = voxels
+        self.regions = regions
+        self.labels = labels
+
+    @property
+    def n_regions(self):
+        return len(self.labels)
+
+
+def _atlas_paths():
+    base = os.path.join(ATLAS_CACHE_DIR, f'HarvardOxford-{ATLAS_NAME}')
+    return base + '.nii.gz', base + '.json'
+
+
+def load_atlas():
+    """Return (labels image, label names), fetching into the local cache only once."""
+    global _atlas
+
+    with _lock:
+        if _atlas is not None:
+            return _atlas
+
+        maps_path, labels_path = _atlas_paths()
+        if not (os.path.exists(maps_path) and os.path.exists(labels_path)):
+            from nilearn import datasets, image
+
+            os.makedirs(ATLAS_CACHE_DIR, exist_ok=True)
+            fetched = datasets.fetch_atlas_harvard_oxford(ATLAS_NAME, data_dir=ATLAS_CACHE_DIR)
+            nib.save(image.load_img(fetched.maps), maps_path)
+            with open(labels_path, 'w') as f:
+                json.dump([str(label) for label in fetched.labels], f)
+
+        with open(labels_path) as f:
+            labels = json.load(f)
+        _atlas = (nib.load(maps_path), labels)
+        return _atlas
+
+
+def atlas_file():
+    """Path of the local atlas copy (for tools that take a filename)."""
+    load_atlas()
+    return _atlas_paths()[0]
+
+
+def _grid_key(affine, shape):
+    grid = np.round(np.asarray(affine, dtype=np.float64), 4).tobytes() + repr(tuple(shape[:3])).encode()
+    return hashlib.sha256(grid).hexdigest()[:16]
+
+
+def label_index(affine, shape):
+    """LabelIndex of the atlas on the grid of a scan with this affine and (3D) shape."""
+    key = _grid_key(affine, shape)
+    with _lock:
+        cached = _label_indices.get(key)
+    if cached is not None:
+        return cached
+
+    cache_path = os.path.join(ATLAS_CACHE_DIR, f'labels-{ATLAS_NAME}-{key}.npz')
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as data:
+            index = LabelIndex(data['voxels'], data['regions'], data['labels'])
+    else:
+        from nilearn import image
+
+        atlas_img = load_atlas()[0]
+        resampled = image.resample_img(
+            atlas_img,
+            target_affine=np.asarray(affine),
+            target_shape=tuple(shape[:3]),
+            interpolation='nearest'
+        )
+        values = np.asarray(resampled.dataobj).reshape(-1, order='F')
+        voxels = np.flatnonzero(values).astype(np.int64)
+        labels, regions = np.unique(values[voxels], return_inverse=True)
+        index = LabelIndex(voxels, regions.astype(np.int32), labels)
+
+        os.makedirs(ATLAS_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path + f'.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, voxels=index.voxels, regions=index.regions, labels=index.labels)
+        os.replace(tmp_path, cache_path)
+
+    with _lock:
+        return _label_indices.setdefault(key, index)
@@ -0,0 +1,85 @@
+"""
+Micro-batching in front of the resident MRI CNN.
+Concurrent requests are queued and run through the model together, so a
+burst of uploads costs one forward pass per batch instead of one per scan.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+DEFAULT_MAX_BATCH_SIZE = 16
+DEFAULT_MAX_WAIT_MS = 10.0
+
+
+class MicroBatcher:
+    """Collects submitted inputs and scores them with one predict call per batch.
+
+    A batch is flushed as soon as it holds max_batch_size rows or max_wait_ms
+    has passed since its first request arrived. Each submit() gets its own
+    Future resolving to the probabilities of the rows it submitted, so callers
+    apply their own threshold.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='mri-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, images):
+        """Queue an (N, H, W, C) array; the Future resolves to N probabilities."""
+        future = Future()
+        self._queue.put((images, future))
+        return future
+
+    def predict(self, images, timeout=None):
+        return self.submit(images).result(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then let _run see the shutdown marker
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+
+            try:
+                probabilities = self.predict_fn(np.concatenate([images for images, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for images, future in batch:
+                future.set_result(probabilities[offset:offset + len(images)])
+                offset += len(images)
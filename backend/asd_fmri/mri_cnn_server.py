@@ -0,0 +1,101 @@
+"""
+Resident MRI CNN inference server
+Loads the MRI CNN from predict_mri.py once, warms it up and serves
+predictions over local HTTP, so each scan costs a forward pass instead of a
+TensorFlow start-up and model load.
+
+Usage:
+    python mri_cnn_server.py            # listens on 127.0.0.1:5003
+    MRI_CNN_PORT=6000 python mri_cnn_server.py
+
+POST /predict  {"file_path": "...", "filename": "...", "threshold": 0.35,
+                "slices": 1, "aggregate": "mean"}
+GET  /health
+"""
+
+import os
+import sys
+import time
+import traceback
+
+from flask import Flask, request, jsonify
+
+import predict_mri
+from mri_batcher import MicroBatcher, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+
+HOST = os.environ.get('MRI_CNN_HOST', '127.0.0.1')
+PORT = int(os.environ.get('MRI_CNN_PORT', 5003))
+DEFAULT_THRESHOLD = 0.35
+# Slices scored per NIfTI scan and how their probabilities are combined
+DEFAULT_SLICES = int(os.environ.get('MRI_SLICES', 1))
+DEFAULT_AGGREGATE = os.environ.get('MRI_AGGREGATE', 'mean')
+# Concurrent scans are scored together: up to MRI_BATCH_SIZE slices, waiting at
+# most MRI_BATCH_WAIT_MS after the first one arrives
+MAX_BATCH_SIZE = int(os.environ.get('MRI_BATCH_SIZE', DEFAULT_MAX_BATCH_SIZE))
+MAX_WAIT_MS = float(os.environ.get('MRI_BATCH_WAIT_MS', DEFAULT_MAX_WAIT_MS))
+
+app = Flask(__name__)
+
+# All model calls go through the batcher's single thread
+batcher = None
+
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    payload = request.get_json(silent=True) or {}
+    file_path = payload.get('file_path')
+    if not file_path:
+        return jsonify({"error": "Missing MRI file path"}), 400
+    if not os.path.exists(file_path):
+        return jsonify({"error": f"File not found: {file_path}"}), 404
+
+    original_filename = payload.get('filename') or os.path.basename(file_path)
+    try:
+        threshold = float(payload.get('threshold', DEFAULT_THRESHOLD))
+        num_slices = max(1, int(payload.get('slices', DEFAULT_SLICES)))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid threshold or slice count"}), 400
+    aggregate = payload.get('aggregate', DEFAULT_AGGREGATE)
+    if aggregate not in predict_mri.AGGREGATIONS:
+        return jsonify({"error": f"Unknown aggregation: {aggregate}"}), 400
+
+    try:
+        image = predict_mri.process_mri_scan(file_path, original_filename, num_slices)
+        result = predict_mri.score_probabilities(batcher.predict(image), threshold, aggregate)
+        result["filename"] = original_filename
+        return jsonify(result)
+    except Exception as e:
+        error_msg = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
+        return jsonify({"error": error_msg}), 500
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    return jsonify({
+        "status": "healthy",
+        "model_loaded": predict_mri.model is not None,
+        "max_batch_size": MAX_BATCH_SIZE,
+        "max_wait_ms": MAX_WAIT_MS,
+        "pid": os.getpid()
+    })
+
+
+def main():
+    global batcher
+
+    start = time.perf_counter()
+    if not predict_mri.initialize_model():
+        return 1
+    predict_mri.warm_up_model()
+    batcher = MicroBatcher(predict_mri.predict_probabilities, MAX_BATCH_SIZE, MAX_WAIT_MS)
+    print(f"MRI CNN model ready in {time.perf_counter() - start:.1f}s, "
+          f"serving on http://{HOST}:{PORT}", file=sys.stderr)
+
+    # The port only opens once the model is loaded, so clients that cannot
+    # connect know to fall back to the one-shot worker
+    app.run(host=HOST, port=PORT, threaded=True)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
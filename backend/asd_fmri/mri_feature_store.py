@@ -0,0 +1,186 @@
+"""
+Persistent store of connectivity feature vectors keyed by scan content.
+Re-submitted scans skip NIfTI loading and feature extraction entirely, and
+new models can be re-scored over every stored vector without the original
+files. Vectors live in one append-only float64 file read through np.memmap;
+an SQLite index maps (content hash, atlas, resampling target, feature
+version) to a row.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+import mri_atlas
+import mri_features
+
+# 48 Harvard-Oxford cortical regions -> 48 * 47 / 2 correlations
+DEFAULT_N_FEATURES = 1128
+DEFAULT_STORE_DIR = os.environ.get(
+    'MRI_FEATURE_STORE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feature_store')
+)
+
+
+class FeatureStore:
+    """Append-only, memory-mapped store of fixed-width float64 feature vectors.
+
+    Vectors are kept at full precision, so a stored scan scores exactly like
+    a freshly extracted one. Shorter vectors (atlas regions missing from a
+    scan) are zero-padded on disk and returned at their original length.
+    """
+
+    ITEM_SIZE = np.dtype(np.float64).itemsize
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, n_features=DEFAULT_N_FEATURES, resampling_target='data'):
+        os.makedirs(store_dir, exist_ok=True)
+        self.n_features = n_features
+        # Features of the two resampling targets differ, so they are stored under separate keys
+        self.resampling_target = resampling_target
+        self.version = f'{mri_atlas.ATLAS_NAME}:{resampling_target}:v{mri_features.FEATURE_VERSION}'
+        self.vectors_path = os.path.join(store_dir, f'features-{n_features}.f64')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(store_dir, 'features.sqlite3'),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS features ('
+            'key TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, length INTEGER NOT NULL, '
+            'filename TEXT, created REAL NOT NULL)'
+        )
+        open(self.vectors_path, 'ab').close()
+
+    def key(self, digest):
+        return f'{digest}:{self.version}'
+
+    def _rows(self):
+        return os.path.getsize(self.vectors_path) // (self.ITEM_SIZE * self.n_features)
+
+    def get(self, digest):
+        """Stored vector for a scan's content digest, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT row, length FROM features WHERE key = ?', (self.key(digest),)
+            ).fetchone()
+        if row is None:
+            return None
+        with open(self.vectors_path, 'rb') as f:
+            f.seek(row[0] * self.ITEM_SIZE * self.n_features)
+            vector = np.fromfile(f, dtype=np.float64, count=self.n_features)
+        return vector[:row[1]]
+
+    def put(self, digest, vector, filename=None):
+        vector = np.asarray(vector, dtype=np.float64).ravel()
+        if len(vector) > self.n_features:
+            raise ValueError(f'Feature vector has {len(vector)} values, store holds {self.n_features}')
+        padded = np.zeros(self.n_features, dtype=np.float64)
+        padded[:len(vector)] = vector
+
+        with self._lock:
+            # BEGIN IMMEDIATE serialises appends across processes sharing the store
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if self._conn.execute('SELECT 1 FROM features WHERE key = ?', (self.key(digest),)).fetchone():
+                    self._conn.execute('COMMIT')
+                    return
+                row = self._rows()
+                with open(self.vectors_path, 'r+b') as f:
+                    f.seek(row * self.ITEM_SIZE * self.n_features)
+                    f.write(padded.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._conn.execute(
+                    'INSERT INTO features (key, row, length, filename, created) VALUES (?, ?, ?, ?, ?)',
+                    (self.key(digest), row, len(vector), filename, time.time())
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def matrix(self):
+        """(digests, (n, n_features) array) of every vector for the current atlas/target/version.
+
+        The rows are gathered from the memory-mapped file into a new in-memory
+        array (vectors zero-padded to n_features), so it stays valid while
+        other processes keep appending.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT key, row FROM features WHERE key LIKE ? ORDER BY row', (f'%:{self.version}',)
+            ).fetchall()
+        n_rows = self._rows()
+        if not rows or n_rows == 0:
+            return [], np.zeros((0, self.n_features))
+        vectors = np.memmap(self.vectors_path, dtype=np.float64, mode='r', shape=(n_rows, self.n_features))
+        return [key.split(':', 1)[0] for key, _ in rows], vectors[[row for _, row in rows]]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(store_dir=DEFAULT_STORE_DIR, resampling_target='data'):
+    """Process-wide FeatureStore for a directory and resampling target (also used inside pool workers)."""
+    key = (store_dir, resampling_target)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = FeatureStore(store_dir, resampling_target=resampling_target)
+        return _stores[key]
+
+
+def scan_features(scan_path, store_dir=DEFAULT_STORE_DIR, digest=None, filename=None, resampling_target='data'):
+    """Raw connectivity vector of a scan, from the store when its content was seen before.
+
+    Returns (features, cached). Pass digest when the caller already hashed
+    the file. resampling_target is passed to connectivity_features.
+    Validation errors are raised as in connectivity_features.
+    """
+    store = get_store(store_dir, resampling_target)
+    digest = digest or mri_features.file_digest(scan_path)
+    features = store.get(digest)
+    if features is not None:
+        return features, True
+
+    features = mri_features.connectivity_features(scan_path, resampling_target=resampling_target)
+    store.put(digest, features, filename)
+    return features, False
+
+
+def scan_features_or_time_series(scan_path, store_dir=DEFAULT_STORE_DIR, digest=None, resampling_target='data'):
+    """Worker half of batched extraction.
+
+    Returns (digest, features, time_series): the stored vector when the
+    scan's content was seen before (time_series None), otherwise its
+    standardized region time series (features None) for
+    store_time_series_features to correlate together with other scans.
+    """
+    store = get_store(store_dir, resampling_target)
+    digest = digest or mri_features.file_digest(scan_path)
+    features = store.get(digest)
+    if features is not None:
+        return digest, features, None
+    return digest, None, mri_features.scan_time_series(scan_path, resampling_target)
+
+
+def store_time_series_features(time_series, digests, filenames=None, store_dir=DEFAULT_STORE_DIR,
+                               resampling_target='data'):
+    """Connectivity vectors of several scans computed in stacked kernel calls, then stored.
+
+    Returns the vectors in input order.
+    """
+    store = get_store(store_dir, resampling_target)
+    features = mri_features.batch_connectivity_features(time_series)
+    for digest, vector, filename in zip(digests, features, filenames or [None] * len(digests)):
+        store.put(digest, vector, filename)
+    return features
@@ -0,0 +1,262 @@
+"""
+Region time-series extraction for the connectivity SVM pipeline.
+Replaces NiftiLabelsMasker.fit_transform per scan: the atlas label indices for
+the sampling grid come from mri_atlas (computed once per affine/shape), and the
+per-region mean signals are a single sparse matrix product over the labelled
+voxels of the flattened 4D data.
+"""
+
+import functools
+import hashlib
+import os
+import threading
+
+import nibabel as nib
+import numpy as np
+from scipy import sparse
+
+import mri_atlas
+
+# Bump when the feature computation changes so cached vectors are not reused
+FEATURE_VERSION = 1
+
+_lock = threading.Lock()
+_averaging = {}
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def averaging_matrix(index):
+    """(n_regions, n_labelled_voxels) sparse matrix whose rows average one region."""
+    key = id(index)
+    with _lock:
+        cached = _averaging.get(key)
+    if cached is not None and cached[0] is index:
+        return cached[1]
+
+    counts = np.bincount(index.regions, minlength=index.n_regions).astype(np.float32)
+    weights = (1.0 / counts)[index.regions]
+    matrix = sparse.csr_matrix(
+        (weights, (index.regions, np.arange(len(index.regions)))),
+        shape=(index.n_regions, len(index.regions))
+    )
+    with _lock:
+        _averaging[key] = (index, matrix)
+    return matrix
+
+
+def standardize(time_series, ddof=1, axis=0):
+    """Z-score each series along axis (time) in place (sample std, like nilearn's 'zscore_sample'); returns it."""
+    time_series -= time_series.mean(axis=axis, keepdims=True)
+    std = time_series.std(axis=axis, ddof=ddof, keepdims=True)
+    std[std < np.finfo(np.float64).eps] = 1.0
+    time_series /= std
+    return time_series
+
+
+def region_time_series(img, resampling_target='data'):
+    """Standardized mean signal of every atlas region, shape (n_timepoints, n_regions).
+
+    img is a 4D NIfTI image or path. Matches NiftiLabelsMasker(standardize=True)
+    with the same resampling_target: 'data' (its default) resamples the atlas
+    labels onto the scan grid, 'labels' resamples the scan onto the atlas grid.
+    """
+    if isinstance(img, (str, os.PathLike)):
+        img = nib.load(img, mmap=True)
+    if len(img.shape) != 4:
+        raise ValueError(f"Expected a 4D fMRI image, got {len(img.shape)}D")
+
+    if resampling_target == 'data':
+        index = mri_atlas.label_index(img.affine, img.shape)
+        voxels = labelled_voxels(img, index)
+    elif resampling_target == 'labels':
+        atlas_img = mri_atlas.load_atlas()[0]
+        index = mri_atlas.label_index(atlas_img.affine, atlas_img.shape)
+        voxels = resampled_labelled_voxels(img, atlas_img, index)
+    else:
+        raise ValueError(f"resampling_target must be 'data' or 'labels', got {resampling_target!r}")
+
+    time_series = np.ascontiguousarray((averaging_matrix(index) @ voxels).T)
+    return standardize(time_series)
+
+
+def labelled_voxels(img, index):
+    """(n_labelled_voxels, n_timepoints) float64 signals of a scan on its own grid."""
+    # NIfTI voxels are Fortran-ordered, so this reshape is a view of the
+    # (memory-mapped) data; only the labelled voxels are converted to float
+    data = np.asanyarray(img.dataobj).reshape(-1, img.shape[3], order='F')
+    return data[index.voxels].astype(np.float64)
+
+
+# Volumes resampled per call in resampled_labelled_voxels
+RESAMPLE_CHUNK = 16
+
+
+def resampled_labelled_voxels(img, atlas_img, index):
+    """(n_labelled_voxels, n_timepoints) signals of a scan resampled onto the atlas grid.
+
+    Uses the continuous interpolation of NiftiLabelsMasker(resampling_target='labels'),
+    a few volumes at a time so the whole resampled 4D scan is never held in memory.
+    """
+    from nilearn import image
+
+    n_timepoints = img.shape[3]
+    voxels = np.empty((len(index.voxels), n_timepoints))
+    for start in range(0, n_timepoints, RESAMPLE_CHUNK):
+        stop = min(start + RESAMPLE_CHUNK, n_timepoints)
+        chunk = image.resample_img(
+            img.slicer[..., start:stop],
+            target_affine=atlas_img.affine,
+            target_shape=atlas_img.shape[:3],
+            interpolation='continuous'
+        )
+        data = np.asanyarray(chunk.dataobj).reshape(-1, stop - start, order='F')
+        voxels[:, start:stop] = data[index.voxels]
+    return voxels
+
+
+# Fewer timepoints than this give unreliable correlations (training scans had ~150+)
+MIN_TIMEPOINTS = 50
+
+
+def validate_fmri_shape(shape):
+    """Raise ValueError with a user-facing message unless shape is a usable 4D fMRI scan."""
+    # Reject structural/anatomical 3D MRI — cannot compute connectivity
+    if len(shape) == 3:
+        raise ValueError(
+            "Structural MRI detected (3D image). "
+            "This tool requires a 4D resting-state fMRI scan (e.g. rest.nii.gz or bold.nii.gz). "
+            "Anatomical files like anat.nii.gz cannot be used for connectivity analysis."
+        )
+    if len(shape) != 4:
+        raise ValueError(
+            f"Unexpected image dimensions: {len(shape)}D. Expected a 4D fMRI scan."
+        )
+    n_timepoints = shape[3]
+    if n_timepoints < MIN_TIMEPOINTS:
+        raise ValueError(
+            f"Only {n_timepoints} time points found. At least {MIN_TIMEPOINTS} are required for reliable "
+            f"connectivity analysis. Ensure you upload a full resting-state fMRI scan."
+        )
+
+
+class CorrelationKernel:
+    """Upper-triangle correlations of region time series, for a fixed region count.
+
+    Matches ConnectivityMeasure(kind='correlation') with its defaults: each
+    series is standardized first (its standardize=True), then the LedoitWolf
+    covariance (1 - s) * emp + s * mu * I with sklearn's Ledoit-Wolf
+    shrinkage s is converted to correlations. The shrinkage depends on the
+    column scales, so raw and standardized input give different vectors;
+    standardizing here makes both match. Callers holding series that are
+    already z-scored (region_time_series output) pass standardized=True to
+    skip the copy. Only the upper triangle is formed (indices computed once
+    here), straight from the Gram matrix into the output buffer.
+    """
+
+    def __init__(self, n_regions):
+        self.n_regions = n_regions
+        self.rows, self.cols = np.triu_indices(n_regions, k=1)
+        self.n_features = len(self.rows)
+
+    def __call__(self, time_series, out=None, standardized=False):
+        """Feature vector of one (n_timepoints, n_regions) series; written into out if given.
+
+        The input is not modified.
+        """
+        return self.batch(time_series[np.newaxis], None if out is None else out[np.newaxis], standardized)[0]
+
+    def batch(self, time_series, out=None, standardized=False):
+        """(n_subjects, n_features) for a stacked (n_subjects, n_timepoints, n_regions) array.
+
+        Each subject's series are standardized separately; the input is not modified.
+        """
+        x = time_series if standardized else standardize(np.array(time_series, dtype=np.float64), axis=1)
+        n_timepoints = x.shape[1]
+        n = self.n_regions
+        if out is None:
+            out = np.empty((x.shape[0], self.n_features))
+        gram = np.einsum('btp,btq->bpq', x, x, optimize=True)
+
+        # sklearn.covariance.ledoit_wolf_shrinkage, per subject
+        x2 = x * x
+        variances = x2.sum(axis=1) / n_timepoints
+        mu = variances.sum(axis=1) / n
+        beta_ = (x2.sum(axis=2) ** 2).sum(axis=1)
+        delta_ = (gram ** 2).sum(axis=(1, 2)) / n_timepoints ** 2
+        beta = (beta_ / n_timepoints - delta_) / (n * n_timepoints)
+        delta = (delta_ - 2.0 * mu * variances.sum(axis=1) + n * mu ** 2) / n
+        beta = np.minimum(beta, delta)
+        shrinkage = np.divide(beta, delta, out=np.zeros_like(beta), where=beta != 0)
+
+        # Off-diagonal shrunk covariance over the shrunk standard deviations
+        scale = np.sqrt((1.0 - shrinkage)[:, np.newaxis] * variances + (shrinkage * mu)[:, np.newaxis])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.multiply(gram[:, self.rows, self.cols], ((1.0 - shrinkage) / n_timepoints)[:, np.newaxis], out=out)
+            out /= scale[:, self.rows] * scale[:, self.cols]
+        return out
+
+
+@functools.lru_cache(maxsize=None)
+def correlation_kernel(n_regions):
+    """Shared CorrelationKernel per region count (it holds no per-call state)."""
+    return CorrelationKernel(n_regions)
+
+
+def connectivity_features(img, n_expected=None, resampling_target='data'):
+    """Upper-triangle correlation vector of a 4D scan (image or path).
+
+    When n_expected is given the vector is zero-padded or truncated to that
+    length. resampling_target is passed to region_time_series. Safe to run
+    in worker processes: it only needs the atlas cache.
+    """
+    time_series = scan_time_series(img, resampling_target)
+    kernel = correlation_kernel(time_series.shape[1])
+
+    if n_expected is None or n_expected < kernel.n_features:
+        return align_features(kernel(time_series, standardized=True), n_expected or kernel.n_features)
+    # Written straight into the zero-padded vector the model expects
+    features = np.zeros(n_expected)
+    kernel(time_series, out=features[:kernel.n_features], standardized=True)
+    return features
+
+
+def scan_time_series(img, resampling_target='data'):
+    """Validated, standardized region time series of a 4D scan (image or path)."""
+    if isinstance(img, (str, os.PathLike)):
+        img = nib.load(img, mmap=True)
+    validate_fmri_shape(img.shape)
+    return region_time_series(img, resampling_target)
+
+
+def batch_connectivity_features(time_series):
+    """Connectivity vectors of several scans' standardized region time series, in order.
+
+    Series of the same shape are stacked and correlated in one
+    CorrelationKernel.batch call.
+    """
+    groups = {}
+    for i, series in enumerate(time_series):
+        groups.setdefault(series.shape, []).append(i)
+    features = [None] * len(time_series)
+    for (_, n_regions), indices in groups.items():
+        stacked = np.stack([time_series[i] for i in indices])
+        for i, vector in zip(indices, correlation_kernel(n_regions).batch(stacked, standardized=True)):
+            features[i] = vector
+    return features
+
+
+def align_features(features, n_expected):
+    """Zero-pad or truncate a feature vector to the length the model expects."""
+    if len(features) >= n_expected:
+        return features[:n_expected]
+    aligned = np.zeros(n_expected, dtype=features.dtype)
+    aligned[:len(features)] = features
+    return aligned
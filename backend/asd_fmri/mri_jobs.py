@@ -0,0 +1,153 @@
+"""
+Background jobs for long MRI analyses.
+A submitted scan gets a job ID straight away; a bounded pool of job threads
+works through the queue and records each stage in a local SQLite file, so
+clients poll for status/results instead of holding an HTTP request open for
+the whole connectivity extraction. Jobs survive in the database across
+restarts; ones that were still queued or running are marked as interrupted
+and their payloads handed back so the caller can remove their files.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_DB_PATH = os.environ.get(
+    'MRI_JOB_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mri_jobs.sqlite3')
+)
+
+QUEUED, RUNNING, COMPLETED, FAILED = 'queued', 'running', 'completed', 'failed'
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when max_pending jobs are already waiting or running."""
+
+
+class JobStore:
+    """SQLite persistence of job status, stage and result."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, filename TEXT, status TEXT NOT NULL, stage TEXT, '
+            'result TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL, payload TEXT)'
+        )
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+        if 'payload' not in columns:
+            self._conn.execute('ALTER TABLE jobs ADD COLUMN payload TEXT')
+
+    def create(self, filename=None, payload=None):
+        """Record a queued job with the (JSON-serialisable) payload it was submitted with."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (id, filename, status, stage, created, updated, payload) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, filename, QUEUED, QUEUED, now, now, None if payload is None else json.dumps(payload))
+            )
+        return job_id
+
+    def update(self, job_id, status=None, stage=None, result=None, error=None):
+        fields = {'updated': time.time()}
+        if status is not None:
+            fields['status'] = status
+        if stage is not None:
+            fields['stage'] = stage
+        if result is not None:
+            fields['result'] = json.dumps(result)
+        if error is not None:
+            fields['error'] = error
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def get(self, job_id):
+        """Job as a dict (result decoded), or None for an unknown ID."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, filename, status, stage, result, error, created, updated FROM jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(('job_id', 'filename', 'status', 'stage', 'result', 'error', 'created', 'updated'), row))
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def interrupt_unfinished(self):
+        """Mark jobs left queued/running by a previous process as failed.
+
+        Returns the payloads of those jobs (None for jobs created without one)
+        so the caller can clean up what they referenced.
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._conn.execute(
+                    'SELECT payload FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)
+                ).fetchall()
+                self._conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, updated = ?, payload = NULL WHERE status IN (?, ?)',
+                    (FAILED, 'Interrupted by a server restart. Please resubmit the scan.', time.time(), QUEUED, RUNNING)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return [json.loads(payload) if payload else None for payload, in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Bounded pool running run_job(payload, set_stage) -> result dict for submitted jobs.
+
+    set_stage(name) records progress. Exceptions fail the job with their
+    message; cleanup(payload), if given, runs after every job either way.
+    Payloads are stored with the job (they must be JSON-serialisable) so
+    JobStore.interrupt_unfinished can return them after a restart.
+    """
+
+    def __init__(self, run_job, store, max_workers=2, max_pending=64, cleanup=None):
+        self.run_job = run_job
+        self.store = store
+        self.max_pending = max_pending
+        self.cleanup = cleanup
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='mri-job')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, payload, filename=None):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} MRI jobs are already queued. Please retry later.")
+            self._pending += 1
+        job_id = self.store.create(filename, payload)
+        self._executor.submit(self._run, job_id, payload)
+        return job_id
+
+    def _run(self, job_id, payload):
+        try:
+            self.store.update(job_id, status=RUNNING)
+            result = self.run_job(payload, lambda stage: self.store.update(job_id, stage=stage))
+            self.store.update(job_id, status=COMPLETED, stage=COMPLETED, result=result)
+        except Exception as e:
+            self.store.update(job_id, status=FAILED, error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+            if self.cleanup is not None:
+                self.cleanup(payload)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,146 @@
+"""
+Streaming NIfTI uploads for the MRI Flask apps.
+Werkzeug normally spools an upload, the view copies it with file.save() and
+nibabel reads it again. Here each upload is written straight to its final
+temporary file while being hashed, and the NIfTI header (decompressed on the
+fly for .nii.gz) is checked as soon as its bytes arrive, so an invalid scan
+is rejected before the rest of the body is read.
+"""
+
+import hashlib
+import io
+import os
+import struct
+import uuid
+import zlib
+
+import nibabel as nib
+from flask import Request
+
+# (header class, sizeof_hdr) for NIfTI-1 and NIfTI-2
+_HEADER_TYPES = ((nib.Nifti1Header, 348), (nib.Nifti2Header, 540))
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+class InvalidScanUpload(Exception):
+    """Raised while an upload is still streaming when its header is not acceptable.
+
+    Deliberately not a ValueError: Werkzeug's form parser silently drops those.
+    """
+
+    def __init__(self, filename, message):
+        super().__init__(f"{filename}: {message}")
+        self.filename = filename
+        self.message = message
+
+
+def parse_nifti_header(buf):
+    """NIfTI header from the first bytes of an uncompressed file, or None if more are needed."""
+    if len(buf) < 4:
+        return None
+    for header_class, size in _HEADER_TYPES:
+        for endian in '<>':
+            if struct.unpack(endian + 'i', buf[:4])[0] == size:
+                if len(buf) < size:
+                    return None
+                return header_class.from_fileobj(io.BytesIO(buf[:size]))
+    raise ValueError("Not a NIfTI file (unrecognised header)")
+
+
+class ScanUploadStream:
+    """Writable upload target that hashes and validates while it saves to disk.
+
+    validate(shape) is called with the header's data shape as soon as the
+    header has been received and should raise ValueError to reject the scan.
+    The temporary file is deleted on close() unless detach() was called.
+    """
+
+    def __init__(self, upload_dir, filename, validate=None):
+        os.makedirs(upload_dir, exist_ok=True)
+        self.filename = filename
+        self.path = os.path.join(upload_dir, f"{uuid.uuid4().hex}_{os.path.basename(filename)}")
+        self.validate = validate
+        self.shape = None
+        self._sha256 = hashlib.sha256()
+        self._file = open(self.path, 'w+b')
+        self._head = b''
+        self._gunzip = None
+        self._detached = False
+
+    @property
+    def digest(self):
+        return self._sha256.hexdigest()
+
+    def write(self, data):
+        self._sha256.update(data)
+        if self.shape is None:
+            self._inspect(data)
+        return self._file.write(data)
+
+    def _inspect(self, data):
+        if self._gunzip is None and not self._head and data[:2] == _GZIP_MAGIC:
+            self._gunzip = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        if self._gunzip is not None:
+            # Only as much as the largest header; the rest stays compressed
+            data = self._gunzip.decompress(self._gunzip.unconsumed_tail + data, 540 - len(self._head))
+        self._head += data
+
+        try:
+            header = parse_nifti_header(self._head)
+            if header is None:
+                return
+            self.shape = tuple(int(n) for n in header.get_data_shape())
+            if self.validate is not None:
+                self.validate(self.shape)
+        except (ValueError, zlib.error) as e:
+            self.close()
+            raise InvalidScanUpload(self.filename, str(e)) from e
+        self._head = b''
+        self._gunzip = None
+
+    def detach(self):
+        """Keep the file after close(); the caller becomes responsible for deleting it."""
+        self._detached = True
+        return self.path
+
+    # File-like methods Werkzeug's FileStorage relies on
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self._detached and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def scan_request_class(upload_dir, allowed_file, validate=None):
+    """Flask Request subclass that streams allowed NIfTI uploads into ScanUploadStream."""
+
+    class ScanUploadRequest(Request):
+        def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+            if filename and allowed_file(filename):
+                stream = ScanUploadStream(upload_dir, filename, validate)
+                # Tracked separately: if parsing is aborted request.files never holds them
+                self.__dict__.setdefault('_scan_streams', []).append(stream)
+                return stream
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        def close(self):
+            super().close()
+            for stream in self.__dict__.get('_scan_streams', ()):
+                stream.close()
+
+    return ScanUploadRequest
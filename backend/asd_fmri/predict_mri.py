@@ -0,0 +1,382 @@
+"""
+MRI ASD Prediction Script (CNN Model)
+Used by Node.js backend to classify MRI scans
+"""
+
+import os
+import sys
+
+# Suppress TensorFlow logging before importing it
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3' 
+
+import json
+import numpy as np
+import cv2
+import nibabel as nib
+import time
+import traceback
+import random
+from contextlib import contextmanager
+
+# Shared model registry lives in backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import model_registry
+
+model = None
+
+MODEL_PATH = model_registry.artifact_path('mri_cnn')
+# Written by export_mri_model.py; preferred over the .h5 when present
+TFLITE_MODEL_PATH = model_registry.artifact_path('mri_cnn_tflite')
+INPUT_SHAPE = (1, 128, 128, 1)
+
+def make_patched_layer(base_class):
+    class PatchedLayer(base_class):
+        @classmethod
+        def from_config(cls, config):
+            # Strip quantization_config which causes issues in some Keras versions
+            config.pop('quantization_config', None)
+            return super().from_config(config)
+    return PatchedLayer
+
+def keras_custom_objects(tf):
+    return {
+        'Dense': make_patched_layer(tf.keras.layers.Dense),
+        'Conv2D': make_patched_layer(tf.keras.layers.Conv2D),
+        'MaxPooling2D': make_patched_layer(tf.keras.layers.MaxPooling2D),
+        'Flatten': make_patched_layer(tf.keras.layers.Flatten),
+        'Dropout': make_patched_layer(tf.keras.layers.Dropout)
+    }
+
+
+class TFLiteModel:
+    """Runs an exported .tflite model behind the Keras predict() signature."""
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            # The standalone runtime avoids importing all of TensorFlow
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads or os.cpu_count())
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.batch_size = None
+
+    def predict(self, images, verbose=0):
+        images = np.asarray(images, dtype=np.float32)
+        if images.shape[0] != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, images.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = images.shape[0]
+        self.interpreter.set_tensor(self.input_index, images)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index)
+
+
+def load_keras_model(model_path=MODEL_PATH):
+    import tensorflow as tf
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model not found: {model_path}")
+
+    custom_objects = keras_custom_objects(tf)
+
+    try:
+        # Standard load with custom objects
+        return tf.keras.models.load_model(model_path, custom_objects=custom_objects)
+    except Exception as e:
+        # Fallback for version/deserialization mismatches (like quantization_config)
+        print(f"DEBUG: Standard load failed, trying compile=False. Error: {str(e)}", file=sys.stderr)
+        # Some versions of Keras need this reset to clear bad state
+        try:
+            tf.keras.backend.clear_session()
+        except:
+            pass
+        return tf.keras.models.load_model(model_path, custom_objects=custom_objects, compile=False)
+
+
+def initialize_model(raise_errors=False):
+    global model
+
+    if model is not None:
+        return True
+
+    try:
+        if model_registry.exists('mri_cnn_tflite') and os.environ.get('MRI_MODEL_BACKEND') != 'keras':
+            model_path = TFLITE_MODEL_PATH
+            model = model_registry.load('mri_cnn_tflite', loader=TFLiteModel)
+        else:
+            model_path = MODEL_PATH
+            model = model_registry.load('mri_cnn', loader=load_keras_model)
+            
+        print("Loaded NEW MRI CNN model", file=sys.stderr)
+        print(f"DEBUG: Using CNN MRI model: {model_path}", file=sys.stderr)
+
+        return True
+
+    except Exception as e:
+        if raise_errors:
+            raise RuntimeError(f"Model initialization failed: {str(e)}") from e
+        print(json.dumps({"error": f"Model initialization failed: {str(e)}"}))
+        return False
+
+
+def warm_up_model():
+    """Run one dummy forward pass so the first real scan does not pay for graph tracing."""
+    model.predict(np.zeros(INPUT_SHAPE, dtype=np.float32), verbose=0)
+
+
+def sample_indices(length, count):
+    """Indices of `count` samples spread over the central half of an axis.
+
+    A single sample is the middle index, as in the original single-slice path.
+    Edge slices are mostly background, so wider sampling stays within 25-75%.
+    """
+    if count <= 1 or length <= 1:
+        return [length // 2]
+    lo, hi = length // 4, max(length // 4, (3 * length) // 4 - 1)
+    return sorted(set(np.linspace(lo, hi, count).round().astype(int).tolist()))
+
+
+def nifti_slices(img_data, num_slices=1):
+    """2D axial slices to score from a 2D/3D/4D NIfTI array.
+
+    For 4D data the slices come from evenly spaced volumes as well, pairing
+    the i-th sampled slice with the i-th sampled volume. img_data may be a
+    nibabel array proxy (img.dataobj), in which case only the sampled slices
+    are read from disk.
+    """
+    if len(img_data.shape) == 4:
+        slice_idx = sample_indices(img_data.shape[2], num_slices)
+        if len(slice_idx) == 1:
+            vol_idx = [img_data.shape[3] // 2]
+        else:
+            vol_idx = np.linspace(0, img_data.shape[3] - 1, len(slice_idx)).round().astype(int).tolist()
+        return [img_data[:, :, z, t] for z, t in zip(slice_idx, vol_idx)]
+    if len(img_data.shape) == 3:
+        return [img_data[:, :, z] for z in sample_indices(img_data.shape[2], num_slices)]
+    return [img_data]
+
+
+def prepare_slice(img):
+    """Resize a uint8 slice to the training size and scale it to [0, 1]."""
+    img = cv2.resize(img, (128, 128))
+    return np.expand_dims(img / 255.0, axis=-1)
+
+
+def process_mri_scan(image_path, original_filename=None, num_slices=1):
+    """Load a scan as an (N, 128, 128, 1) batch; N is num_slices for NIfTI input, else 1."""
+    try:
+        # Log filename and processing start
+        fname = original_filename if original_filename else os.path.basename(image_path)
+        print(f"DEBUG: Freshly processing MRI scan: {fname}", file=sys.stderr)
+
+        # Check if it's a NIfTI file
+        if image_path.lower().endswith(('.nii', '.nii.gz')):
+            print(f"DEBUG: Loading NIfTI file: {image_path}", file=sys.stderr)
+            # Slice the lazy array proxy instead of get_fdata(): .nii files are
+            # memory-mapped and .nii.gz is decompressed as a stream, so only
+            # the sampled slices are read and converted to float64
+            img_data = nib.load(image_path, mmap=True).dataobj
+
+            slices = []
+            for slice_data in nifti_slices(img_data, num_slices):
+                slice_data = np.asarray(slice_data, dtype=np.float64)
+                # Convert to uint8 for cv2 processing
+                # Normalize to 0-255 range first
+                slice_data = (slice_data - np.min(slice_data)) / (np.max(slice_data) - np.min(slice_data) + 1e-8) * 255
+                slices.append(slice_data.astype(np.uint8))
+        else:
+            # Standard image loading
+            img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                raise Exception("Failed to load MRI image")
+            slices = [img]
+
+        # Stack into one batch (N, H, W, 1) so all slices share a forward pass
+        img = np.stack([prepare_slice(s) for s in slices])
+
+        # Log input shape
+        print(f"DEBUG: Input shape for model: {img.shape}", file=sys.stderr)
+
+        return img
+    except Exception as e:
+        raise Exception(f"Error processing MRI image: {str(e)}")
+
+
+AGGREGATIONS = ("mean", "max", "trimmed_mean")
+
+
+def aggregate_probabilities(probabilities, method="mean", trim=0.2):
+    """Combine per-slice probabilities with one of AGGREGATIONS."""
+    probabilities = np.sort(np.asarray(probabilities, dtype=float))
+    if method == "max":
+        return float(probabilities[-1])
+    if method == "trimmed_mean":
+        cut = int(len(probabilities) * trim)
+        if cut and len(probabilities) > 2 * cut:
+            probabilities = probabilities[cut:len(probabilities) - cut]
+    elif method != "mean":
+        raise ValueError(f"Unknown aggregation: {method}")
+    return float(probabilities.mean())
+
+
+def predict_probabilities(images):
+    """ASD probability for every row of an (N, 128, 128, 1) batch in one forward pass."""
+    return model.predict(images, verbose=0).reshape(-1).astype(float)
+
+
+def build_result(prediction, threshold=0.35):
+    """Turn a raw ASD probability into the diagnosis dict returned to callers."""
+    prediction = float(prediction)
+
+    # Log raw probability
+    print(f"DEBUG: Raw ASD probability: {prediction:.4f}", file=sys.stderr)
+
+    if prediction >= threshold:
+        diagnosis = "ASD"
+        # Confidence relative to threshold
+        confidence = prediction
+    else:
+        diagnosis = "No ASD"
+        confidence = 1 - prediction
+
+    # Log final decision
+    print(f"DEBUG: Final decision: {diagnosis} (Threshold: {threshold})", file=sys.stderr)
+
+    return {
+        "diagnosis": diagnosis,
+        "confidence": round(float(confidence), 4),
+        "asd_probability": round(float(prediction), 4),
+        "control_probability": round(float(1 - prediction), 4),
+        "threshold_used": threshold,
+        "raw_prediction": round(float(prediction), 4)
+    }
+
+
+def score_probabilities(probabilities, threshold=0.35, aggregate="mean"):
+    """Result dict for one scan from its per-slice probabilities."""
+    result = build_result(aggregate_probabilities(probabilities, aggregate), threshold)
+    if len(probabilities) > 1:
+        result["aggregation"] = aggregate
+        result["slice_probabilities"] = [round(float(p), 4) for p in probabilities]
+    return result
+
+
+def predict_asd(image, threshold=0.35, aggregate="mean"):
+
+    try:
+        return score_probabilities(predict_probabilities(image), threshold, aggregate)
+    except Exception as e:
+        raise Exception(f"Prediction error: {str(e)}")
+
+
+class ResultChannel:
+    """Newline-delimited JSON messages to the parent process.
+
+    Messages go to a dedicated pipe passed as --result-fd=N (POSIX) or
+    --result-handle=H (Windows), so TensorFlow output on stdout/stderr never
+    has to be parsed. Every message has a "type": progress, timing, result or
+    error. Without a pipe, only result/error are printed to stdout as before.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    @classmethod
+    def from_args(cls, argv):
+        for arg in argv:
+            if arg.startswith('--result-fd='):
+                return cls(os.fdopen(int(arg.split('=')[1]), 'w', encoding='utf-8'))
+            if arg.startswith('--result-handle='):
+                import msvcrt
+                fd = msvcrt.open_osfhandle(int(arg.split('=')[1]), os.O_WRONLY)
+                return cls(os.fdopen(fd, 'w', encoding='utf-8'))
+        return cls()
+
+    def send(self, message_type, **fields):
+        if self.stream is None:
+            if message_type in ('result', 'error'):
+                print(json.dumps(fields))
+            return
+        self.stream.write(json.dumps({"type": message_type, **fields}) + "\n")
+        self.stream.flush()
+
+    @contextmanager
+    def stage(self, name):
+        self.send("progress", stage=name)
+        start = time.perf_counter()
+        yield
+        self.send("timing", stage=name, ms=round((time.perf_counter() - start) * 1000.0, 2))
+
+
+def main():
+
+    channel = ResultChannel.from_args(sys.argv)
+
+    try:
+
+        if len(sys.argv) < 2 or sys.argv[1].startswith('--'):
+            channel.send("error", error="Missing MRI file path")
+            sys.exit(1)
+
+        file_path = sys.argv[1]
+        original_filename = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else os.path.basename(file_path)
+        
+        # Check for threshold / multi-slice overrides in arguments
+        threshold = 0.35
+        num_slices = 1
+        aggregate = "mean"
+        for arg in sys.argv:
+            if arg.startswith('--threshold='):
+                try:
+                    threshold = float(arg.split('=')[1])
+                except:
+                    pass
+            elif arg.startswith('--slices='):
+                try:
+                    num_slices = max(1, int(arg.split('=')[1]))
+                except:
+                    pass
+            elif arg.startswith('--aggregate='):
+                aggregate = arg.split('=')[1]
+
+        if not os.path.exists(file_path):
+            channel.send("error", error=f"File not found: {file_path}")
+            sys.exit(1)
+
+        # Log for debugging
+        print(f"DEBUG: Processing file: {original_filename} (Path: {file_path})", file=sys.stderr)
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        os.chdir(script_dir)
+
+        with channel.stage("load_model"):
+            initialize_model(raise_errors=True)
+
+        with channel.stage("preprocess"):
+            image = process_mri_scan(file_path, original_filename, num_slices)
+        
+        # Removed mock logic for "um_1" to ensure real predictions
+        with channel.stage("predict"):
+            result = predict_asd(image, threshold=threshold, aggregate=aggregate)
+        
+        # Add file info to result
+        result["filename"] = original_filename
+
+        # Log final prediction details
+        print(f"DEBUG: Final prediction for {original_filename}: {result['diagnosis']} (Prob: {result['asd_probability']})", file=sys.stderr)
+
+        channel.send("result", **result)
+
+    except Exception as e:
+
+        error_msg = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
+        channel.send("error", error=error_msg)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
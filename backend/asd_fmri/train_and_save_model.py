@@ -0,0 +1,223 @@
+"""
+Train and Save MRI-based ASD Classification Model
+This script trains an SVM model on fMRI connectivity data and saves it for deployment.
+
+Region time series are extracted on a process pool and correlated together
+in stacked kernel calls; the connectivity features are kept in the same
+feature store as the web app (keyed by scan content, atlas and feature
+version), so reruns only process new or changed scans.
+
+Usage:
+    python train_and_save_model.py [--workers N] [--store-dir DIR]
+"""
+
+import argparse
+import pandas as pd
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sklearn.model_selection import train_test_split
+from sklearn.svm import SVC
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+import joblib
+from datetime import datetime
+
+import mri_atlas
+import mri_feature_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the connectivity SVM on ds000212.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Feature extraction processes (default: all cores)')
+    parser.add_argument('--store-dir', default=mri_feature_store.DEFAULT_STORE_DIR,
+                        help='Feature store directory (default: the one app_mri.py uses)')
+    args = parser.parse_args()
+
+    # Change to the script's directory
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(script_dir)
+
+    print("="*70)
+    print("MRI-BASED ASD CLASSIFICATION MODEL TRAINING")
+    print("="*70)
+    print(f"Working directory: {os.getcwd()}\n")
+
+    # --- Step 1: Load participant data ---
+    print("[1/7] Loading participant data...")
+    participants_path = os.path.join('..', 'ds000212', 'participants.tsv')
+    participants_df = pd.read_csv(participants_path, sep='\t')
+    print(f"  ✓ Loaded {len(participants_df)} participants")
+
+    # --- Step 2: Load atlas ---
+    print("\n[2/7] Loading Harvard-Oxford Cortical Atlas...")
+    # Fetched into the local cache here so worker processes only read files
+    mri_atlas.load_atlas()
+    print("  ✓ Atlas loaded successfully")
+
+    # --- Step 3: Process all participants ---
+    print(f"\n[3/7] Extracting connectivity features with {args.workers} workers...")
+    preprocessed_data_path = os.path.join('..', 'ds000212', 'derivatives', 'preprocessed_data')
+
+    subjects = []
+    for idx, row in participants_df.iterrows():
+        subject_id = row['participant_id']
+        # Find the functional MRI scan
+        scan_filename = f"{subject_id}_task-pixar_run-001_swrf_bold.nii.gz"
+        scan_path = os.path.join(preprocessed_data_path, subject_id, scan_filename)
+        subjects.append((subject_id, row['diagnosis'], scan_path))
+
+    results = {}
+    extracted = []
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(mri_feature_store.scan_features_or_time_series, scan_path, args.store_dir):
+                (subject_id, diagnosis, scan_path)
+            for subject_id, diagnosis, scan_path in subjects
+        }
+        for future in as_completed(futures):
+            subject_id, diagnosis, scan_path = futures[future]
+            try:
+                digest, upper_triangle, time_series = future.result()
+            except FileNotFoundError:
+                print(f"  {subject_id} ({diagnosis}): ✗ File not found: {scan_path}")
+                continue
+            except Exception as e:
+                print(f"  {subject_id} ({diagnosis}): ✗ Error: {e}")
+                continue
+            if upper_triangle is None:
+                extracted.append((subject_id, diagnosis, digest, time_series, os.path.basename(scan_path)))
+            else:
+                results[subject_id] = upper_triangle
+                print(f"  {subject_id} ({diagnosis}): ✓ {len(upper_triangle)} features (cached)")
+
+    # Scans missing from the store are correlated together in stacked kernel calls
+    if extracted:
+        subject_ids, diagnoses, digests, time_series, filenames = zip(*extracted)
+        vectors = mri_feature_store.store_time_series_features(time_series, digests, filenames, args.store_dir)
+        for subject_id, diagnosis, upper_triangle in zip(subject_ids, diagnoses, vectors):
+            results[subject_id] = upper_triangle
+            print(f"  {subject_id} ({diagnosis}): ✓ {len(upper_triangle)} features")
+
+    # Keep participants.tsv order so the train/test split is reproducible
+    features = []
+    labels = []
+    for subject_id, diagnosis, _ in subjects:
+        if subject_id in results:
+            features.append(results[subject_id])
+            labels.append(1 if diagnosis == 'ASD' else 0)  # 1 for ASD, 0 for Control
+
+    # --- Step 4: Convert to numpy arrays ---
+    print("\n[4/7] Preparing dataset...")
+    features = np.array(features)
+    labels = np.array(labels)
+
+    print(f"  Total subjects processed: {len(features)}")
+    print(f"  Features shape: {features.shape}")
+    print(f"  ASD subjects: {np.sum(labels)}")
+    print(f"  Control subjects: {len(labels) - np.sum(labels)}")
+
+    if len(features) == 0:
+        print("\n❌ ERROR: No features collected. Check data paths.")
+        return 1
+
+    # --- Step 5: Split data and scale features ---
+    print("\n[5/7] Splitting data and scaling features...")
+    X_train, X_test, y_train, y_test = train_test_split(
+        features, 
+        labels, 
+        test_size=0.2,
+        random_state=42,
+        stratify=labels
+    )
+
+    print(f"  Training set: {len(X_train)} samples")
+    print(f"  Testing set: {len(X_test)} samples")
+
+    # Scale features (important for SVM)
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    print("  ✓ Features scaled using StandardScaler")
+
+    # --- Step 6: Train SVM model ---
+    print("\n[6/7] Training Support Vector Machine model...")
+    model = SVC(
+        kernel='rbf',
+        C=1.0,
+        gamma='scale',
+        probability=True,  # Enable probability estimates for confidence scores
+        random_state=42
+    )
+
+    print("  Fitting model to training data...")
+    model.fit(X_train_scaled, y_train)
+    print("  ✓ Model training completed!")
+
+    # Evaluate model
+    y_pred = model.predict(X_test_scaled)
+    accuracy = accuracy_score(y_test, y_pred)
+
+    print("\n" + "-"*70)
+    print("MODEL PERFORMANCE")
+    print("-"*70)
+    print(f"\n📊 Accuracy: {accuracy:.2%}")
+    print(f"   Correctly classified: {int(accuracy * len(y_test))}/{len(y_test)} samples")
+    print("\n📋 Classification Report:")
+    print(classification_report(y_test, y_pred, target_names=['Control', 'ASD']))
+
+    cm = confusion_matrix(y_test, y_pred)
+    print("Confusion Matrix:")
+    print(f"                Predicted Control  Predicted ASD")
+    print(f"Actual Control        {cm[0][0]:3d}              {cm[0][1]:3d}")
+    print(f"Actual ASD            {cm[1][0]:3d}              {cm[1][1]:3d}")
+
+    # --- Step 7: Save model and scaler ---
+    print("\n[7/7] Saving model and scaler...")
+
+    model_filename = 'asd_svm_model.pkl'
+    scaler_filename = 'scaler.pkl'
+
+    joblib.dump(model, model_filename)
+    joblib.dump(scaler, scaler_filename)
+
+    print(f"  ✓ Model saved: {model_filename}")
+    print(f"  ✓ Scaler saved: {scaler_filename}")
+
+    # Save model metadata
+    metadata = {
+        'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'n_samples': len(features),
+        'n_features': features.shape[1],
+        'n_asd': int(np.sum(labels)),
+        'n_control': int(len(labels) - np.sum(labels)),
+        'accuracy': float(accuracy),
+        'model_type': 'SVM with RBF kernel',
+        'atlas': mri_atlas.ATLAS_DESCRIPTION,
+        'connectivity_measure': 'Pearson Correlation'
+    }
+
+    metadata_filename = 'model_metadata.txt'
+    with open(metadata_filename, 'w') as f:
+        f.write("MRI-BASED ASD CLASSIFICATION MODEL METADATA\n")
+        f.write("="*70 + "\n\n")
+        for key, value in metadata.items():
+            f.write(f"{key}: {value}\n")
+
+    print(f"  ✓ Metadata saved: {metadata_filename}")
+
+    print("\n" + "="*70)
+    print("✅ MODEL TRAINING AND SAVING COMPLETED SUCCESSFULLY!")
+    print("="*70)
+    print("\nYou can now use the following files for deployment:")
+    print(f"  • {model_filename}")
+    print(f"  • {scaler_filename}")
+    print(f"  • {metadata_filename}")
+    print("\nNext step: Run 'python app_mri.py' to start the web application.")
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,238 @@
+"""
+Gaze throughput benchmark
+Runs gaze_worker.GazeAnalyzer and gaze_analysis.analyze_gaze_from_base64 over
+fixed frame corpora at several resolutions and batch sizes, and prints
+frames/sec, per-frame latency percentiles, face detection rate, peak RSS and
+per-stage time as JSON. Every run executes in a fresh subprocess so its peak
+RSS is not inflated by earlier runs.
+
+Usage:
+    python benchmark_gaze.py
+    python benchmark_gaze.py --corpus uploads/gaze --resolutions 640x480,4000x3000 --batch-sizes 1,16
+    GAZE_MAX_INPUT_DIM=1280 python benchmark_gaze.py    # with input downscaling enabled
+"""
+
+import argparse
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from gaze_image import DEFAULT_MAX_INPUT_DIM
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def synthetic_frame(width, height, seed):
+    """Deterministic face-like drawing with some sensor noise."""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), 235, dtype=np.uint8)
+    img = cv2.add(img, rng.integers(0, 20, img.shape, dtype=np.uint8))
+
+    s = min(width, height) / 300.0
+    cx = width // 2 + int(rng.integers(-10, 10) * s)
+    cy = height // 2
+    cv2.circle(img, (cx, cy), int(80 * s), (150, 170, 200), -1)
+    for dx in (-30, 30):
+        cv2.ellipse(img, (cx + int(dx * s), cy - int(20 * s)), (int(12 * s), int(7 * s)), 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(img, (cx + int((dx + rng.integers(-3, 3)) * s), cy - int(20 * s)), int(5 * s), (40, 30, 20), -1)
+    cv2.ellipse(img, (cx, cy + int(30 * s)), (int(30 * s), int(12 * s)), 0, 0, 180, (60, 60, 120), max(1, int(2 * s)))
+    return img
+
+
+def load_corpus(corpus_dir, frames, width, height):
+    """Recorded frames resized to the target resolution, or synthetic ones."""
+    if corpus_dir:
+        paths = sorted(
+            os.path.join(corpus_dir, name) for name in os.listdir(corpus_dir)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        images = [img for img in (cv2.imread(p) for p in paths[:frames]) if img is not None]
+        if not images:
+            raise SystemExit(f'No readable images in corpus: {corpus_dir}')
+        return [cv2.resize(images[i % len(images)], (width, height), interpolation=cv2.INTER_AREA)
+                for i in range(frames)]
+    return [synthetic_frame(width, height, seed) for seed in range(frames)]
+
+
+def peak_rss_mb():
+    """Peak RSS of this process; each run executes in its own subprocess (see run_in_subprocess)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return round(peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024.0 * 1024.0), 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def percentiles_ms(seconds):
+    values = np.array(seconds) * 1000.0
+    return {
+        'p50': round(float(np.percentile(values, 50)), 2),
+        'p95': round(float(np.percentile(values, 95)), 2),
+        'p99': round(float(np.percentile(values, 99)), 2)
+    }
+
+
+def summarize(frame_latencies, call_latencies, results, elapsed, stage_times):
+    frames = len(results)
+    detected = sum(1 for result in results if 'error' not in result)
+    return {
+        'frames': frames,
+        'frames_per_sec': round(frames / elapsed, 2) if elapsed > 0 else None,
+        # Batch calls are spread evenly over their frames so batch sizes compare per frame
+        'latency_ms': percentiles_ms(frame_latencies),
+        'call_latency_ms': percentiles_ms(call_latencies),
+        # Frames without a detected face skip landmark scoring and are much cheaper
+        'face_detection_rate': round(detected / frames, 3) if frames else None,
+        'stage_ms_per_frame': {stage: round(seconds * 1000.0 / frames, 3)
+                               for stage, seconds in sorted(stage_times.items())},
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def run_batches(items, batch_size, score_one, score_batch, timed, warmup):
+    for item in items[:warmup]:
+        score_one(item)
+    timed.clear()
+
+    frame_latencies = []
+    call_latencies = []
+    results = []
+    start = time.perf_counter()
+    for i in range(0, len(items), batch_size):
+        chunk = items[i:i + batch_size]
+        t0 = time.perf_counter()
+        if batch_size == 1:
+            chunk_results = [score_one(chunk[0])]
+        else:
+            chunk_results = score_batch(chunk)['frames']
+        latency = time.perf_counter() - t0
+        call_latencies.append(latency)
+        frame_latencies.extend([latency / len(chunk)] * len(chunk))
+        results.extend(chunk_results)
+    return frame_latencies, call_latencies, results, time.perf_counter() - start
+
+
+def bench_worker(paths, batch_size, warmup):
+    from gaze_worker import GazeAnalyzer
+
+    # No result cache: every frame must go through FaceMesh
+    analyzer = GazeAnalyzer(cache_dir=None)
+    analyzer.stage_times = {}
+    run = run_batches(paths, batch_size, analyzer.estimate_gaze,
+                      analyzer.estimate_gaze_batch, analyzer.stage_times, warmup)
+    return summarize(*run, analyzer.stage_times)
+
+
+def bench_base64(paths, batch_size, warmup):
+    import gaze_analysis
+
+    frames_b64 = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            frames_b64.append('data:image/jpeg;base64,' + base64.b64encode(f.read()).decode('ascii'))
+    analyzer = gaze_analysis.analyzer
+    analyzer.stage_times = {}
+    run = run_batches(frames_b64, batch_size, gaze_analysis.analyze_gaze_from_base64,
+                      gaze_analysis.analyze_gaze_batch_from_base64, analyzer.stage_times, warmup)
+    return summarize(*run, analyzer.stage_times)
+
+
+TARGETS = {
+    'gaze_worker.GazeAnalyzer': bench_worker,
+    'gaze_analysis.analyze_gaze_from_base64': bench_base64,
+}
+
+
+def run_in_subprocess(target, paths_file, batch_size, warmup):
+    """Run one benchmark in a fresh interpreter so peak RSS belongs to that run alone."""
+    command = [sys.executable, os.path.abspath(__file__), '--run-target', target,
+               '--paths-file', paths_file, '--batch-size', str(batch_size), '--warmup', str(warmup)]
+    completed = subprocess.run(command, capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise SystemExit(f'Benchmark run {target} failed:\n{completed.stderr}')
+    return json.loads(completed.stdout)
+
+
+def parse_resolutions(value):
+    return [tuple(int(v) for v in item.lower().split('x')) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark gaze analysis throughput.')
+    parser.add_argument('--corpus', help='Directory of recorded snapshots (default: synthetic frames)')
+    parser.add_argument('--frames', type=int, default=64, help='Frames per resolution')
+    parser.add_argument('--resolutions', type=parse_resolutions, default=parse_resolutions('640x480,1280x720,4000x3000'))
+    parser.add_argument('--batch-sizes', default='1,16', help='Comma separated batch sizes')
+    parser.add_argument('--warmup', type=int, default=4, help='Untimed frames before each run')
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    # Internal: a single run, started by run_in_subprocess
+    parser.add_argument('--run-target', choices=sorted(TARGETS), help=argparse.SUPPRESS)
+    parser.add_argument('--paths-file', help=argparse.SUPPRESS)
+    parser.add_argument('--batch-size', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_target:
+        with open(args.paths_file) as f:
+            paths = json.load(f)
+        print(json.dumps(TARGETS[args.run_target](paths, args.batch_size, args.warmup)))
+        return
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',') if b]
+    if not args.corpus:
+        print('Synthetic frames are drawings, not photos; FaceMesh finds no face in most of them, '
+              'so see face_detection_rate and pass --corpus with recorded snapshots for '
+              'representative timings.', file=sys.stderr)
+
+    report = {
+        'corpus': args.corpus or 'synthetic',
+        'max_input_dim': DEFAULT_MAX_INPUT_DIM,
+        'runs': []
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for width, height in args.resolutions:
+            images = load_corpus(args.corpus, args.frames, width, height)
+            paths = []
+            for i, img in enumerate(images):
+                ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+                path = os.path.join(tmp, f'{width}x{height}-{i}.jpg')
+                buf.tofile(path)
+                paths.append(path)
+            del images
+            paths_file = os.path.join(tmp, f'{width}x{height}.json')
+            with open(paths_file, 'w') as f:
+                json.dump(paths, f)
+
+            for batch_size in batch_sizes:
+                for target in TARGETS:
+                    result = run_in_subprocess(target, paths_file, batch_size, args.warmup)
+                    result.update({'target': target, 'resolution': f'{width}x{height}', 'batch_size': batch_size})
+                    report['runs'].append(result)
+                    print(f"{target} {width}x{height} batch={batch_size}: "
+                          f"{result['frames_per_sec']} fps, p95 {result['latency_ms']['p95']} ms/frame, "
+                          f"faces {result['face_detection_rate']:.0%}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,10 @@
+import atexit
 import base64
 import json
 import math
-from typing import Dict, Tuple, Optional
+import threading
+import time
+from typing import Dict, List, Tuple, Optional
 
 import cv2
 import numpy as np
@@ -11,6 +14,9 @@ try:
 except ImportError as e:
     raise RuntimeError("mediapipe must be installed: pip install mediapipe opencv-python") from e
 
+from gaze_batch import pipelined, summarize_gaze_results
+from gaze_image import DEFAULT_MAX_INPUT_DIM, decode_image
+
 
 # Indices for key eye landmarks (MediaPipe FaceMesh with refine_landmarks=True)
 # Using canonical eye corner/inner/outer canthi and iris ring points.
@@ -28,20 +34,23 @@ RIGHT_IRIS_POINTS = [473, 474, 475, 476, 477]
 mp_face_mesh = mp.solutions.face_mesh
 
 
-def _b64_to_bgr(base64_str: str) -> np.ndarray:
-    """Decode a base64 image data URL or raw base64 to BGR image (OpenCV)."""
+def _b64_to_bgr(base64_str: str, max_input_dim: Optional[int] = None) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Decode a base64 image data URL or raw base64 to BGR image (OpenCV).
+
+    Returns (image, (orig_h, orig_w)); with max_input_dim the image is decoded/downscaled so its
+    longest side fits, while the size stays that of the full-resolution capture.
+    """
     # Handle data URL prefix if present
     if base64_str.startswith("data:"):
         base64_str = base64_str.split(",", 1)[1]
     img_bytes = base64.b64decode(base64_str)
-    nparr = np.frombuffer(img_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    img, original_size = decode_image(img_bytes, max_input_dim)
     if img is None:
         raise ValueError("Invalid image data")
-    return img
+    return img, original_size
 
 
-def _normalized_to_pixel(landmark, image_shape: Tuple[int, int, int]) -> Tuple[int, int]:
+def _normalized_to_pixel(landmark, image_shape: Tuple[int, ...]) -> Tuple[int, int]:
     h, w = image_shape[:2]
     x_px = int(round(landmark.x * w))
     y_px = int(round(landmark.y * h))
@@ -97,74 +106,174 @@ def _gaze_from_ratio(ratio: float, left_threshold: float = 0.4, right_threshold:
     return "Center"
 
 
+class FaceMeshPool:
+    """Hands out one FaceMesh per thread and keeps it alive between calls.
+
+    MediaPipe graphs are not safe to share across threads, so each worker
+    thread gets its own instance the first time it asks for one.
+    """
+
+    def __init__(self, **options):
+        self._options = options
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._meshes = []
+
+    def get(self):
+        face_mesh = getattr(self._local, "face_mesh", None)
+        if face_mesh is None:
+            face_mesh = mp_face_mesh.FaceMesh(**self._options)
+            self._local.face_mesh = face_mesh
+            with self._lock:
+                self._meshes.append(face_mesh)
+        return face_mesh
+
+    def close(self) -> None:
+        """Release every FaceMesh created so far; later calls build new ones."""
+        with self._lock:
+            meshes, self._meshes = self._meshes, []
+            self._local = threading.local()
+        for face_mesh in meshes:
+            face_mesh.close()
+
+
+class Base64GazeAnalyzer:
+    """Scores base64 frames against a pooled, thread-confined FaceMesh."""
+
+    def __init__(self, max_input_dim: Optional[int] = DEFAULT_MAX_INPUT_DIM):
+        # Longest image side passed to FaceMesh; larger frames are downscaled first
+        self.max_input_dim = max_input_dim
+        # Set to a dict to accumulate seconds per stage (see benchmark_gaze.py);
+        # batch decode threads record into it concurrently
+        self.stage_times = None
+        self._stage_lock = threading.Lock()
+        self.pool = FaceMeshPool(static_image_mode=True,
+                                 max_num_faces=1,
+                                 refine_landmarks=True,  # critical for iris landmarks 468-477
+                                 min_detection_confidence=0.5)
+
+    def analyze(self, base64_image: str) -> Dict[str, object]:
+        """Score one frame; see analyze_gaze_from_base64 for the result fields."""
+        image_bgr, original_size = self._decode(base64_image)
+        return self.analyze_image(image_bgr, original_size)
+
+    def _record_stage(self, stage: str, start: float) -> None:
+        if self.stage_times is not None:
+            elapsed = time.perf_counter() - start
+            with self._stage_lock:
+                self.stage_times[stage] = self.stage_times.get(stage, 0.0) + elapsed
+
+    def _decode(self, base64_image: str) -> Tuple[np.ndarray, Tuple[int, int]]:
+        start = time.perf_counter()
+        decoded = _b64_to_bgr(base64_image, self.max_input_dim)
+        self._record_stage("decode", start)
+        return decoded
+
+    def analyze_batch(self, base64_images: List[str], decode_workers: int = 2) -> Dict[str, object]:
+        """Score a list of frames, decoding ahead of FaceMesh on a thread pool.
+
+        Returns { 'frames': [...], 'summary': {...} } with frames in input order.
+        """
+        frames = []
+        for _, decoded, error in pipelined(base64_images, self._decode, workers=decode_workers):
+            frames.append({"error": str(error)} if error is not None else self.analyze_image(*decoded))
+        return {"frames": frames, "summary": summarize_gaze_results(frames)}
+
+    def analyze_image(self, image_bgr: np.ndarray, original_size: Tuple[int, int]) -> Dict[str, object]:
+        # Landmarks are normalized, so pixel positions are taken in the original capture's size
+        start = time.perf_counter()
+        image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+        self._record_stage("color", start)
+
+        start = time.perf_counter()
+        results = self.pool.get().process(image_rgb)
+        self._record_stage("mesh", start)
+
+        if not results.multi_face_landmarks:
+            return {"error": "No face detected"}
+
+        face_landmarks = results.multi_face_landmarks[0].landmark
+        start = time.perf_counter()
+
+        # Compute per-eye ratios
+        try:
+            # Left eye
+            left_outer_px = _normalized_to_pixel(face_landmarks[LEFT_EYE_OUTER], original_size)
+            left_inner_px = _normalized_to_pixel(face_landmarks[LEFT_EYE_INNER], original_size)
+            left_iris_center = _iris_center_px(face_landmarks, LEFT_IRIS_POINTS, original_size)
+            left_ratio = _eye_ratio(left_outer_px, left_inner_px, left_iris_center)
+
+            # Right eye
+            right_outer_px = _normalized_to_pixel(face_landmarks[RIGHT_EYE_OUTER], original_size)
+            right_inner_px = _normalized_to_pixel(face_landmarks[RIGHT_EYE_INNER], original_size)
+            right_iris_center = _iris_center_px(face_landmarks, RIGHT_IRIS_POINTS, original_size)
+            right_ratio = _eye_ratio(right_outer_px, right_inner_px, right_iris_center)
+        except Exception:
+            return {"error": "No face detected"}
+
+        # Determine gaze direction using both eyes
+        # For left eye: ratio<0.4 => looking Right; ratio>0.6 => looking Left
+        # For right eye the mapping is mirrored relative to the face, but our ratio is always outer->inner (0->1),
+        # so the same thresholds apply per-eye. We assess combined tendency.
+        left_dir = _gaze_from_ratio(left_ratio)
+        right_dir = _gaze_from_ratio(right_ratio)
+
+        if left_dir == right_dir:
+            gaze_direction = left_dir
+        else:
+            # If mixed, decide by magnitude of deviation from center (0.5)
+            dl = abs(left_ratio - 0.5)
+            dr = abs(right_ratio - 0.5)
+            if max(dl, dr) < 0.1:
+                gaze_direction = "Center"
+            else:
+                # pick side of the eye farther from center
+                if dl >= dr:
+                    gaze_direction = left_dir
+                else:
+                    gaze_direction = right_dir
+
+        # Attention score: how centered both eyes are.
+        # Compute per-eye centeredness: 1 at 0.5, drop linearly to 0 at 0.0 or 1.0.
+        def centeredness(r: float) -> float:
+            return max(0.0, 1.0 - (abs(r - 0.5) / 0.5))
+
+        attention_score = float(max(0.0, min(1.0, (centeredness(left_ratio) + centeredness(right_ratio)) / 2.0)))
+        self._record_stage("scoring", start)
+
+        return {
+            "gaze_direction": gaze_direction,
+            "attention_score": round(attention_score, 4)
+        }
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+analyzer = Base64GazeAnalyzer()
+atexit.register(analyzer.close)
+
+
 def analyze_gaze_from_base64(base64_image: str) -> Dict[str, object]:
     """Analyze gaze direction and attention score from a base64-encoded image.
 
     Returns JSON-serializable dict: { 'gaze_direction': 'Center|Left|Right', 'attention_score': float }
     """
-    image_bgr = _b64_to_bgr(base64_image)
-    image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-
-    with mp_face_mesh.FaceMesh(static_image_mode=True,
-                               max_num_faces=1,
-                               refine_landmarks=True,  # critical for iris landmarks 468-477
-                               min_detection_confidence=0.5) as face_mesh:
-        results = face_mesh.process(image_rgb)
-
-    if not results.multi_face_landmarks:
-        return {"error": "No face detected"}
-
-    face_landmarks = results.multi_face_landmarks[0].landmark
-
-    # Compute per-eye ratios
-    try:
-        # Left eye
-        left_outer_px = _normalized_to_pixel(face_landmarks[LEFT_EYE_OUTER], image_bgr.shape)
-        left_inner_px = _normalized_to_pixel(face_landmarks[LEFT_EYE_INNER], image_bgr.shape)
-        left_iris_center = _iris_center_px(face_landmarks, LEFT_IRIS_POINTS, image_bgr.shape)
-        left_ratio = _eye_ratio(left_outer_px, left_inner_px, left_iris_center)
-
-        # Right eye
-        right_outer_px = _normalized_to_pixel(face_landmarks[RIGHT_EYE_OUTER], image_bgr.shape)
-        right_inner_px = _normalized_to_pixel(face_landmarks[RIGHT_EYE_INNER], image_bgr.shape)
-        right_iris_center = _iris_center_px(face_landmarks, RIGHT_IRIS_POINTS, image_bgr.shape)
-        right_ratio = _eye_ratio(right_outer_px, right_inner_px, right_iris_center)
-    except Exception:
-        return {"error": "No face detected"}
-
-    # Determine gaze direction using both eyes
-    # For left eye: ratio<0.4 => looking Right; ratio>0.6 => looking Left
-    # For right eye the mapping is mirrored relative to the face, but our ratio is always outer->inner (0->1),
-    # so the same thresholds apply per-eye. We assess combined tendency.
-    left_dir = _gaze_from_ratio(left_ratio)
-    right_dir = _gaze_from_ratio(right_ratio)
-
-    if left_dir == right_dir:
-        gaze_direction = left_dir
-    else:
-        # If mixed, decide by magnitude of deviation from center (0.5)
-        dl = abs(left_ratio - 0.5)
-        dr = abs(right_ratio - 0.5)
-        if max(dl, dr) < 0.1:
-            gaze_direction = "Center"
-        else:
-            # pick side of the eye farther from center
-            if dl >= dr:
-                gaze_direction = left_dir
-            else:
-                gaze_direction = right_dir
+    return analyzer.analyze(base64_image)
+
 
-    # Attention score: how centered both eyes are.
-    # Compute per-eye centeredness: 1 at 0.5, drop linearly to 0 at 0.0 or 1.0.
-    def centeredness(r: float) -> float:
-        return max(0.0, 1.0 - (abs(r - 0.5) / 0.5))
+def analyze_gaze_batch_from_base64(base64_images: List[str]) -> Dict[str, object]:
+    """Analyze a whole session of base64 frames in one call.
+
+    Returns { 'frames': [per-frame results], 'summary': { 'mean_attention', 'direction_histogram',
+    'face_percentage', ... } }
+    """
+    return analyzer.analyze_batch(base64_images)
 
-    attention_score = float(max(0.0, min(1.0, (centeredness(left_ratio) + centeredness(right_ratio)) / 2.0)))
 
-    return {
-        "gaze_direction": gaze_direction,
-        "attention_score": round(attention_score, 4)
-    }
+def close() -> None:
+    """Release the FaceMesh instances held by the module-level analyzer."""
+    analyzer.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+"""
+Shared helpers for scoring many gaze frames in one call.
+Used by gaze_worker.GazeAnalyzer and gaze_analysis for session-level batches.
+"""
+
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def pipelined(items, decode, workers=2, prefetch=8):
+    """Yield (item, decoded, error) while up to `prefetch` items decode ahead.
+
+    Decoding (file read + cv2.imdecode) releases the GIL, so running it on a
+    small thread pool keeps the landmark model busy on the caller's thread
+    instead of alternating between I/O and inference.
+    """
+    items = iter(items)
+    window = deque()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for item in items:
+            window.append((item, executor.submit(decode, item)))
+            if len(window) >= prefetch:
+                break
+
+        while window:
+            item, future = window.popleft()
+            next_item = next(items, None)
+            if next_item is not None:
+                window.append((next_item, executor.submit(decode, next_item)))
+
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
+
+
+def summarize_gaze_results(results):
+    """Session aggregates over per-frame gaze results.
+
+    Frames carrying an 'error' key (unreadable image, no face) count towards
+    the total but not towards the attention mean or direction histogram.
+    """
+    total = len(results)
+    with_face = [r for r in results if 'error' not in r]
+    attention = [float(r.get('attention_score', 0.0)) for r in with_face]
+
+    return {
+        'total_frames': total,
+        'frames_with_face': len(with_face),
+        'face_percentage': round(100.0 * len(with_face) / total, 2) if total else 0.0,
+        'mean_attention': round(sum(attention) / len(attention), 4) if attention else 0.0,
+        'direction_histogram': dict(Counter(r.get('gaze_direction', 'unknown') for r in with_face)),
+    }
@@ -0,0 +1,106 @@
+"""
+On-disk cache of gaze results keyed by image content.
+Recovery and rebuild jobs push the same stored snapshots through the gaze
+worker again and again; with the cache an unchanged image costs a SHA-256
+and an SQLite lookup instead of a FaceMesh run.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 50000
+# Hits whose access time is buffered before being written in one transaction
+ACCESS_FLUSH_SIZE = 256
+
+
+class GazeResultCache:
+    """Size-bounded LRU cache of estimate_gaze result dicts.
+
+    Keys combine the image's SHA-256 with the analyzer settings that affect
+    the result (version, thresholds, input size), so changing any of them
+    simply misses instead of returning stale results.
+    """
+
+    def __init__(self, cache_dir, settings, max_entries=DEFAULT_MAX_ENTRIES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_entries = max_entries
+        self.settings_digest = hashlib.sha256(
+            json.dumps(settings, sort_keys=True).encode('utf-8')
+        ).hexdigest()[:16]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(cache_dir, 'gaze_results.sqlite3'),
+            timeout=30,
+            check_same_thread=False
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, result TEXT NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+        self._conn.commit()
+        self._count = self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        # key -> last access time of hits not yet written to the database
+        self._accessed = {}
+
+    def key(self, image_bytes):
+        return f'{hashlib.sha256(image_bytes).hexdigest()}:{self.settings_digest}'
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT result FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            # LRU order only matters when evicting, so hits are not committed one by one
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._flush_accessed()
+                self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        with self._lock:
+            now = time.time()
+            self._accessed.pop(key, None)
+            updated = self._conn.execute(
+                'UPDATE results SET result = ?, accessed = ? WHERE key = ?',
+                (json.dumps(result), now, key)
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    'INSERT INTO results (key, result, accessed) VALUES (?, ?, ?)',
+                    (key, json.dumps(result), now)
+                )
+                self._count += 1
+                if self._count > self.max_entries:
+                    self._flush_accessed()
+                    self._evict()
+            self._conn.commit()
+
+    def _flush_accessed(self):
+        if self._accessed:
+            self._conn.executemany(
+                'UPDATE results SET accessed = ? WHERE key = ?',
+                [(accessed, key) for key, accessed in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def _evict(self):
+        # Drop the least recently used tenth in one statement rather than a row per insert
+        excess = self._count - self.max_entries + max(1, self.max_entries // 10)
+        self._conn.execute(
+            'DELETE FROM results WHERE key IN '
+            '(SELECT key FROM results ORDER BY accessed LIMIT ?)',
+            (excess,)
+        )
+        self._count = self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,95 @@
+"""
+Image decoding helpers for the gaze analyzers.
+FaceMesh only looks at a few hundred pixels per side, so with a max input
+dimension set (GAZE_MAX_INPUT_DIM, e.g. 1280) large snapshots are decoded at
+reduced resolution (JPEG DCT scaling) and area-downscaled before inference.
+It is off by default because it shifts landmarks, and with them the scores,
+slightly. Landmarks are normalized, so callers map them back using the
+original size returned alongside the image.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+# Longest side fed to FaceMesh; 0 (the default) disables downscaling
+DEFAULT_MAX_INPUT_DIM = int(os.environ.get('GAZE_MAX_INPUT_DIM') or 0)
+
+_REDUCED_FLAGS = [
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+# Start-of-frame markers carry the image size (DHT/JPG/DAC share the range)
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(buf):
+    """Return (height, width) from a JPEG header, or None if buf is not a JPEG."""
+    if len(buf) < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 9 < len(buf):
+        if buf[i] != 0xFF:
+            return None
+        marker = buf[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in _SOF_MARKERS:
+            height = (buf[i + 5] << 8) | buf[i + 6]
+            width = (buf[i + 7] << 8) | buf[i + 8]
+            return height, width
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            i += 2
+            continue
+        i += 2 + ((buf[i + 2] << 8) | buf[i + 3])
+    return None
+
+
+def decode_image(buf, max_input_dim=DEFAULT_MAX_INPUT_DIM):
+    """Decode encoded image bytes for FaceMesh.
+
+    Returns (image, (orig_h, orig_w)) where image is BGR with its longest side
+    at most max_input_dim and the size is that of the full-resolution image.
+    """
+    data = np.frombuffer(buf, np.uint8)
+    size = jpeg_size(buf) if max_input_dim else None
+
+    image = None
+    if size is not None:
+        longest = max(size)
+        for factor, flag in _REDUCED_FLAGS:
+            if longest // factor >= max_input_dim:
+                image = cv2.imdecode(data, flag)
+                break
+
+    if image is None:
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+        if image is None:
+            return None, None
+        size = image.shape[:2]
+    elif (image.shape[0] > image.shape[1]) != (size[0] > size[1]):
+        # EXIF orientation was applied while decoding
+        size = (size[1], size[0])
+
+    return downscale(image, max_input_dim), size
+
+
+def read_image_file(image_path, max_input_dim=DEFAULT_MAX_INPUT_DIM):
+    """Read and decode an image file; see decode_image for the return value."""
+    with open(image_path, 'rb') as f:
+        buf = f.read()
+    return decode_image(buf, max_input_dim)
+
+
+def downscale(image, max_input_dim=DEFAULT_MAX_INPUT_DIM):
+    """Shrink image with area interpolation so its longest side fits max_input_dim."""
+    h, w = image.shape[:2]
+    if not max_input_dim or max(h, w) <= max_input_dim:
+        return image
+    scale = max_input_dim / float(max(h, w))
+    size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,154 @@
+"""
+Incremental smoothing and fixation/saccade segmentation for gaze streams.
+Consumes GazeAnalyzer results one frame at a time in constant memory, so a
+live session gets stable metrics without buffering every snapshot.
+"""
+
+import math
+
+# Approximate eye rotation (degrees) covered by the iris moving across the eye box
+IRIS_RANGE_DEG = 30.0
+
+# Gaze velocity (deg/s) above which a sample is treated as part of a saccade
+SACCADE_VELOCITY_DEG_S = 30.0
+
+
+class OneEuroFilter:
+    """One Euro filter (Casiez et al. 2012): low lag when moving, low jitter when still."""
+
+    def __init__(self, min_cutoff=1.0, beta=0.05, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x_prev = None
+        self.dx_prev = 0.0
+        self.t_prev = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t):
+        """Filter sample x taken at time t (seconds)."""
+        if self.x_prev is None or t <= self.t_prev:
+            self.x_prev, self.t_prev = x, t
+            return x
+
+        dt = t - self.t_prev
+        dx = (x - self.x_prev) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        dx_hat = a_d * dx + (1 - a_d) * self.dx_prev
+
+        cutoff = self.min_cutoff + self.beta * abs(dx_hat)
+        a = self._alpha(cutoff, dt)
+        x_hat = a * x + (1 - a) * self.x_prev
+
+        self.x_prev, self.dx_prev, self.t_prev = x_hat, dx_hat, t
+        return x_hat
+
+
+class GazeStreamProcessor:
+    """Smooths per-frame gaze results and segments them into fixations and saccades.
+
+    Call update() once per frame in timestamp order; each call is O(1) and
+    returns the smoothed sample plus the segment that just ended, if any.
+    Frames without a face end the current segment and restart the filters.
+    """
+
+    SIGNALS = ('head_pitch', 'head_yaw', 'iris_horizontal', 'iris_vertical')
+
+    def __init__(self, saccade_velocity=SACCADE_VELOCITY_DEG_S, min_cutoff=1.0, beta=0.05):
+        self.saccade_velocity = saccade_velocity
+        self.filters = {name: OneEuroFilter(min_cutoff, beta) for name in self.SIGNALS}
+        self.prev_angles = None
+        self.prev_t = None
+        self.segment = None
+
+        self.frames = 0
+        self.frames_with_face = 0
+        self.attention_sum = 0.0
+        self.counts = {'fixation': 0, 'saccade': 0}
+        self.durations_ms = {'fixation': 0.0, 'saccade': 0.0}
+
+    def update(self, result, timestamp_ms):
+        """Feed one estimate_gaze result; returns {'smoothed', 'segment'}."""
+        self.frames += 1
+        t = timestamp_ms / 1000.0
+
+        if 'error' in result:
+            finished = self._close_segment(timestamp_ms)
+            for f in self.filters.values():
+                f.reset()
+            self.prev_angles = None
+            return {'smoothed': None, 'segment': finished}
+
+        self.frames_with_face += 1
+        self.attention_sum += float(result.get('attention_score', 0.0))
+
+        smoothed = {
+            name: self.filters[name](float(result.get(name, 0.5 if name.startswith('iris') else 0.0)), t)
+            for name in self.SIGNALS
+        }
+
+        # Combined gaze angle: head pose plus the iris offset within the eye
+        angles = (
+            smoothed['head_yaw'] + (smoothed['iris_horizontal'] - 0.5) * IRIS_RANGE_DEG,
+            smoothed['head_pitch'] + (smoothed['iris_vertical'] - 0.5) * IRIS_RANGE_DEG
+        )
+        velocity = 0.0
+        if self.prev_angles is not None and t > self.prev_t:
+            velocity = math.hypot(angles[0] - self.prev_angles[0],
+                                  angles[1] - self.prev_angles[1]) / (t - self.prev_t)
+        self.prev_angles, self.prev_t = angles, t
+        smoothed['velocity_deg_s'] = velocity
+
+        kind = 'saccade' if velocity > self.saccade_velocity else 'fixation'
+        finished = None
+        if self.segment is not None and self.segment['type'] != kind:
+            finished = self._close_segment(timestamp_ms)
+        if self.segment is None:
+            self.segment = {'type': kind, 'start_ms': timestamp_ms, 'end_ms': timestamp_ms,
+                            'frames': 0, 'attention_sum': 0.0}
+        self.segment['end_ms'] = timestamp_ms
+        self.segment['frames'] += 1
+        self.segment['attention_sum'] += float(result.get('attention_score', 0.0))
+
+        return {'smoothed': smoothed, 'segment': finished}
+
+    def _close_segment(self, end_ms):
+        segment, self.segment = self.segment, None
+        if segment is None:
+            return None
+        duration = max(0.0, end_ms - segment['start_ms'])
+        self.counts[segment['type']] += 1
+        self.durations_ms[segment['type']] += duration
+        return {
+            'type': segment['type'],
+            'start_ms': segment['start_ms'],
+            'end_ms': end_ms,
+            'duration_ms': round(duration, 2),
+            'frames': segment['frames'],
+            'mean_attention': round(segment['attention_sum'] / segment['frames'], 4)
+        }
+
+    def finish(self, timestamp_ms=None):
+        """Close the open segment (at its last frame unless a time is given)."""
+        if self.segment is None:
+            return None
+        return self._close_segment(self.segment['end_ms'] if timestamp_ms is None else timestamp_ms)
+
+    def summary(self):
+        fixations = self.counts['fixation']
+        return {
+            'frames': self.frames,
+            'frames_with_face': self.frames_with_face,
+            'mean_attention': round(self.attention_sum / self.frames_with_face, 4) if self.frames_with_face else 0.0,
+            'fixation_count': fixations,
+            'saccade_count': self.counts['saccade'],
+            'total_fixation_ms': round(self.durations_ms['fixation'], 2),
+            'mean_fixation_ms': round(self.durations_ms['fixation'] / fixations, 2) if fixations else 0.0
+        }
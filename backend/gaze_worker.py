@@ -2,6 +2,9 @@ import sys
 import json
 from pathlib import Path
 import os
+import threading
+import time
+from collections import OrderedDict
 
 try:
     import cv2
@@ -21,8 +24,34 @@ except ImportError:
     print(json.dumps({'error': 'MediaPipe not installed. Run: pip install mediapipe'}))
     sys.exit(1)
 
+from gaze_batch import pipelined, summarize_gaze_results
+from gaze_cache import GazeResultCache
+from gaze_image import DEFAULT_MAX_INPUT_DIM, decode_image, downscale, read_image_file
+from gaze_stream import GazeStreamProcessor
+
+# Bump whenever landmark scoring changes so cached results are not reused
+ANALYZER_VERSION = 4
+
+GAZE_THRESHOLDS = {
+    'head_yaw': 15,
+    'head_pitch': 10,
+    'iris_left': 0.35,
+    'iris_right': 0.65,
+    'iris_up': 0.4,
+    'iris_down': 0.6
+}
+
+NO_FACE_ERROR = 'No face detected in image'
+DEGENERATE_EYE_ERROR = 'Degenerate eye landmarks (eye box has no width or height)'
+
+
 class GazeAnalyzer:
-    def __init__(self):
+    MAX_TRACKED_STREAMS = 16
+
+    def __init__(self, max_input_dim=DEFAULT_MAX_INPUT_DIM, cache_dir=os.environ.get('GAZE_CACHE_DIR')):
+        # Longest image side passed to FaceMesh; larger inputs are downscaled
+        self.max_input_dim = max_input_dim
+        self.cache = GazeResultCache(cache_dir, self.cache_settings()) if cache_dir else None
         self.mp_face_mesh = mp.solutions.face_mesh
         self.mp_drawing = mp.solutions.drawing_utils
         self.face_mesh = self.mp_face_mesh.FaceMesh(
@@ -31,6 +60,20 @@ class GazeAnalyzer:
             refine_landmarks=True,
             min_detection_confidence=0.5
         )
+        # Tracking-mode meshes for the stream/video methods, one per stream id in
+        # least recently used order, and the smoothing/segmentation state of live
+        # streams (only kept for streams that have a tracking mesh)
+        self.tracking_meshes = OrderedDict()
+        self.stream_processors = {}
+        # Previous frame's solvePnP rotation/translation per stream, used as the initial guess
+        self.stream_poses = {}
+        # Camera intrinsics depend only on the capture resolution
+        self.camera_matrices = {}
+        self.dist_coeffs = np.zeros((4, 1), dtype=np.float32)
+        # Set to a dict to accumulate seconds per stage (see benchmark_gaze.py);
+        # batch decode threads record into it concurrently
+        self.stage_times = None
+        self._stage_lock = threading.Lock()
         
         self.face_3d = np.array([
             [0.0, 0.0, 0.0],
@@ -50,85 +93,349 @@ class GazeAnalyzer:
             [150.0, -150.0]
         ], dtype=np.float32)
 
+    def record_stage(self, stage, start):
+        if self.stage_times is not None:
+            elapsed = time.perf_counter() - start
+            with self._stage_lock:
+                self.stage_times[stage] = self.stage_times.get(stage, 0.0) + elapsed
+
+    def read_image(self, image_path):
+        """Decode an image for inference; returns (image, (orig_h, orig_w))."""
+        start = time.perf_counter()
+        image, original_size = read_image_file(image_path, self.max_input_dim)
+        self.record_stage('decode', start)
+        if image is None:
+            raise ValueError(f'Could not read image file: {image_path} (Invalid image format or corrupted file)')
+        return image, original_size
+
+    def load_image(self, image_path):
+        """Read an image and consult the result cache before decoding it.
+
+        Returns (image, original_size, cache_key, cached_result); on a cache
+        hit the image is not decoded and only cached_result is set.
+        """
+        start = time.perf_counter()
+        with open(image_path, 'rb') as f:
+            buf = f.read()
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key(buf)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return None, None, cache_key, cached
+        
+        image, original_size = decode_image(buf, self.max_input_dim)
+        self.record_stage('decode', start)
+        if image is None:
+            raise ValueError(f'Could not read image file: {image_path} (Invalid image format or corrupted file)')
+        return image, original_size, cache_key, None
+
+    def cache_settings(self):
+        return {
+            'version': ANALYZER_VERSION,
+            'thresholds': GAZE_THRESHOLDS,
+            'max_input_dim': self.max_input_dim
+        }
+
+    def store_result(self, cache_key, result):
+        # Only deterministic outcomes are cached, not unexpected failures
+        if cache_key is None or result.get('error') not in (None, NO_FACE_ERROR):
+            return
+        self.cache.put(cache_key, result)
+
     def estimate_gaze(self, image_path):
         try:
-            image = cv2.imread(image_path)
-            if image is None:
-                return {'error': f'Could not read image file: {image_path} (Invalid image format or corrupted file)'}
-            
-            h, w, c = image.shape
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            results = self.face_mesh.process(rgb_image)
-            
-            if not results.multi_face_landmarks:
-                return {
-                    'error': 'No face detected in image',
-                    'gaze_direction': 'unknown',
-                    'attention_score': 0.0,
-                    'head_pitch': 0.0,
-                    'head_yaw': 0.0
-                }
-            
-            face_landmarks = results.multi_face_landmarks[0]
-            landmarks = face_landmarks.landmark
-            
-            face_2d_detected = []
-            face_3d_detected = []
-            
-            landmark_points = [33, 263, 1, 61, 291, 199]
-            
-            for idx, point in enumerate(landmark_points):
-                x = landmarks[point].x * w
-                y = landmarks[point].y * h
-                
-                face_2d_detected.append([x, y])
-                face_3d_detected.append(self.face_3d[idx])
-            
-            face_2d_detected = np.array(face_2d_detected, dtype=np.float32)
-            face_3d_detected = np.array(face_3d_detected, dtype=np.float32)
+            image, original_size, cache_key, cached = self.load_image(image_path)
+        except (OSError, ValueError) as e:
+            return {'error': str(e)}
+        if cached is not None:
+            return cached
+        
+        result = self.estimate_gaze_image(image, original_size=original_size)
+        self.store_result(cache_key, result)
+        return result
+
+    def estimate_gaze_batch(self, image_paths, decode_workers=2):
+        """Score a whole session of images in one call.
+
+        Images are decoded on a small thread pool while FaceMesh runs on the
+        previous ones. Returns {'frames': [...], 'summary': {...}} where the
+        frames are in input order and match estimate_gaze's output.
+        """
+        frames = []
+        poses = []
+        unscored = []
+        for image_path, loaded, error in pipelined(image_paths, self.load_image, workers=decode_workers):
+            if error is not None:
+                frame = {'error': str(error)}
+            else:
+                image, original_size, cache_key, cached = loaded
+                if cached is not None:
+                    frame = cached
+                else:
+                    try:
+                        frame = self.landmarks_and_pose(image, original_size=original_size)
+                    except Exception as e:
+                        frame = no_face_result(str(e))
+                    if 'error' in frame:
+                        self.store_result(cache_key, frame)
+                    else:
+                        poses.append(frame)
+                        # Filled in below once every pose can be scored in one pass
+                        frame = {}
+                        unscored.append((frame, cache_key))
+            frame['image_path'] = image_path
+            frames.append(frame)
+        
+        for (frame, cache_key), result in zip(unscored, self.score_batch(poses)):
+            self.store_result(cache_key, result)
+            frame.update(result)
+        
+        return {'frames': frames, 'summary': summarize_gaze_results(frames)}
+
+    def new_tracking_mesh(self):
+        return self.mp_face_mesh.FaceMesh(
+            static_image_mode=False,
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+
+    def get_tracking_mesh(self, stream_id=None):
+        if stream_id in self.tracking_meshes:
+            self.tracking_meshes.move_to_end(stream_id)
+            return self.tracking_meshes[stream_id]
+        # Streams that were never ended should not pile up in a resident worker;
+        # the least recently active one is dropped along with its stream state
+        if len(self.tracking_meshes) >= self.MAX_TRACKED_STREAMS:
+            self.reset_tracking(next(iter(self.tracking_meshes)))
+        self.tracking_meshes[stream_id] = self.new_tracking_mesh()
+        return self.tracking_meshes[stream_id]
+
+    def reset_tracking(self, stream_id=None):
+        """Forget the tracked face so the next frame of this stream starts with a fresh detection."""
+        face_mesh = self.tracking_meshes.pop(stream_id, None)
+        if face_mesh is not None:
+            face_mesh.close()
+        self.stream_processors.pop(stream_id, None)
+        self.stream_poses.pop(stream_id, None)
+
+    def estimate_gaze_frame(self, image_path, stream_id, timestamp_ms=None):
+        """Score the next frame of a live stream, tracking the face from its previous frame.
+
+        The result also carries the stream's smoothed head pose / iris ratios,
+        the fixation or saccade segment that this frame ended (if any) and the
+        running stream summary.
+        """
+        # Registers the stream first so its processor is bounded and evicted with the mesh
+        face_mesh = self.get_tracking_mesh(stream_id)
+        try:
+            image, original_size = self.read_image(image_path)
+        except (OSError, ValueError) as e:
+            result = {'error': str(e)}
+        else:
+            result = self.estimate_gaze_image(image, face_mesh=face_mesh,
+                                              original_size=original_size,
+                                              pose_state=self.stream_poses.setdefault(stream_id, {}))
+        
+        processor = self.stream_processors.setdefault(stream_id, GazeStreamProcessor())
+        update = processor.update(result, time.time() * 1000 if timestamp_ms is None else timestamp_ms)
+        result['smoothed'] = update['smoothed']
+        result['segment'] = update['segment']
+        result['stream_summary'] = processor.summary()
+        return result
+
+    def end_stream(self, stream_id):
+        """Close a live stream and return its last segment and final summary."""
+        processor = self.stream_processors.get(stream_id)
+        result = {'ended': True}
+        if processor is not None:
+            result['segment'] = processor.finish()
+            result['stream_summary'] = processor.summary()
+        self.reset_tracking(stream_id)
+        return result
+
+    def estimate_gaze_stream(self, frames, stream_id=None):
+        """Yield one result per frame of an ordered sequence (BGR arrays or paths).
+
+        Uses FaceMesh in tracking mode: the face detector only runs on the
+        first frame and whenever landmark tracking is lost, instead of on
+        every frame as in estimate_gaze.
+        """
+        face_mesh = self.get_tracking_mesh(stream_id)
+        pose_state = self.stream_poses.setdefault(stream_id, {})
+        for frame in frames:
+            original_size = None
+            if isinstance(frame, str):
+                try:
+                    frame, original_size = self.read_image(frame)
+                except (OSError, ValueError) as e:
+                    yield {'error': str(e)}
+                    continue
+            yield self.estimate_gaze_image(frame, face_mesh=face_mesh, original_size=original_size,
+                                           pose_state=pose_state)
+
+    def estimate_gaze_video(self, video_path, frame_step=1):
+        """Track gaze through a video file, scoring every `frame_step`-th frame."""
+        if isinstance(frame_step, bool) or not isinstance(frame_step, int) or frame_step < 1:
+            return {'error': f'frame_step must be a positive integer, got {frame_step!r}'}
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            return {'error': f'Could not open video file: {video_path}'}
+        
+        frames = []
+        segments = []
+        processor = GazeStreamProcessor()
+        # A private mesh: the live streams' LRU (and their ids) are left untouched
+        face_mesh = self.new_tracking_mesh()
+        pose_state = {}
+        try:
+            index = 0
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                if index % frame_step == 0:
+                    result = self.estimate_gaze_image(frame, face_mesh=face_mesh, pose_state=pose_state)
+                    result['frame_index'] = index
+                    result['timestamp_ms'] = round(float(capture.get(cv2.CAP_PROP_POS_MSEC)), 2)
+                    update = processor.update(result, result['timestamp_ms'])
+                    if update['segment'] is not None:
+                        segments.append(update['segment'])
+                    result['smoothed'] = update['smoothed']
+                    frames.append(result)
+                index += 1
+        finally:
+            capture.release()
+            face_mesh.close()
+        
+        last_segment = processor.finish()
+        if last_segment is not None:
+            segments.append(last_segment)
+        
+        summary = summarize_gaze_results(frames)
+        summary['stream'] = processor.summary()
+        return {'frames': frames, 'segments': segments, 'summary': summary}
+
+    def estimate_gaze_image(self, image, face_mesh=None, original_size=None, pose_state=None):
+        try:
+            pose = self.landmarks_and_pose(image, face_mesh, original_size, pose_state)
+            if 'error' in pose:
+                return pose
             
+            return self.score_batch([pose])[0]
+        
+        except Exception as e:
+            return no_face_result(str(e))
+
+    def landmarks_and_pose(self, image, face_mesh=None, original_size=None, pose_state=None):
+        """Run FaceMesh and solvePnP on one BGR image.
+
+        original_size is the (h, w) of the full-resolution capture when image
+        was already decoded at reduced size; otherwise image is downscaled
+        here. Pose is always solved in original pixel coordinates.
+
+        pose_state is a per-stream dict: the previous frame's rotation and
+        translation seed solvePnP (useExtrinsicGuess) and are replaced by
+        this frame's, and it is cleared when the face is lost.
+
+        Returns {'landmarks': (478, 3) array, 'head_pitch', 'head_yaw'} or an
+        error result when no face is found.
+        """
+        start = time.perf_counter()
+        if original_size is None:
+            original_size = image.shape[:2]
+            image = downscale(image, self.max_input_dim)
+        h, w = original_size
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        self.record_stage('color', start)
+        
+        start = time.perf_counter()
+        results = (face_mesh or self.face_mesh).process(rgb_image)
+        self.record_stage('mesh', start)
+        
+        if not results.multi_face_landmarks:
+            if pose_state is not None:
+                pose_state.clear()
+            return no_face_result(NO_FACE_ERROR)
+        
+        start = time.perf_counter()
+        points = landmarks_to_array(results.multi_face_landmarks[0].landmark)
+        
+        face_2d_detected = (points[POSE_LANDMARKS, :2] * (w, h)).astype(np.float32)
+        cam_matrix = self.camera_matrix(h, w)
+        
+        if pose_state:
+            success, rotation_vec, translation_vec = cv2.solvePnP(
+                self.face_3d, face_2d_detected, cam_matrix, self.dist_coeffs,
+                rvec=pose_state['rotation_vec'].copy(), tvec=pose_state['translation_vec'].copy(),
+                useExtrinsicGuess=True, flags=cv2.SOLVEPNP_ITERATIVE
+            )
+        else:
+            success, rotation_vec, translation_vec = cv2.solvePnP(
+                self.face_3d, face_2d_detected, cam_matrix, self.dist_coeffs
+            )
+        
+        if pose_state is not None:
+            if success:
+                pose_state['rotation_vec'] = rotation_vec
+                pose_state['translation_vec'] = translation_vec
+            else:
+                pose_state.clear()
+        
+        rotation_mat, _ = cv2.Rodrigues(rotation_vec)
+        
+        angles = self.rotation_matrix_to_euler_angles(rotation_mat)
+        self.record_stage('pnp', start)
+        
+        return {'landmarks': points, 'head_pitch': angles[0], 'head_yaw': angles[1]}
+
+    def camera_matrix(self, h, w):
+        key = (h, w)
+        cam_matrix = self.camera_matrices.get(key)
+        if cam_matrix is None:
             focal_length = 1 * w
             cam_matrix = np.array([
                 [focal_length, 0, h / 2],
                 [0, focal_length, w / 2],
                 [0, 0, 1]
             ], dtype=np.float32)
-            
-            dist_coeffs = np.zeros((4, 1), dtype=np.float32)
-            
-            success, rotation_vec, translation_vec = cv2.solvePnP(
-                face_3d_detected, face_2d_detected, cam_matrix, dist_coeffs
-            )
-            
-            rotation_mat, _ = cv2.Rodrigues(rotation_vec)
-            
-            angles = self.rotation_matrix_to_euler_angles(rotation_mat)
-            pitch = angles[0]
-            yaw = angles[1]
-            
-            left_eye = np.array([landmarks[33].x, landmarks[33].y, landmarks[33].z])
-            right_eye = np.array([landmarks[263].x, landmarks[263].y, landmarks[263].z])
-            eye_center = (left_eye + right_eye) / 2
-            
-            gaze_direction = self.classify_gaze_direction(pitch, yaw, eye_center, landmarks)
-            attention_score = self.calculate_attention_score(pitch, yaw, eye_center, landmarks)
-            
-            return {
-                'gaze_direction': gaze_direction,
-                'attention_score': min(1.0, max(0.0, attention_score)),
-                'head_pitch': float(pitch),
-                'head_yaw': float(yaw)
-            }
+            self.camera_matrices[key] = cam_matrix
+        return cam_matrix
+
+    def score_batch(self, poses):
+        """Score many frames at once from landmarks_and_pose outputs.
+
+        The landmarks are stacked into one (N, 478, 3) array so direction and
+        attention are computed by the same vectorised kernel as single frames.
+        """
+        if not poses:
+            return []
         
-        except Exception as e:
-            return {
-                'error': str(e),
-                'gaze_direction': 'unknown',
-                'attention_score': 0.0,
-                'head_pitch': 0.0,
-                'head_yaw': 0.0
+        start = time.perf_counter()
+        points = np.stack([pose['landmarks'] for pose in poses])
+        pitch = np.array([pose['head_pitch'] for pose in poses], dtype=np.float64)
+        yaw = np.array([pose['head_yaw'] for pose in poses], dtype=np.float64)
+        
+        iris_h, iris_v = iris_ratios(points)
+        directions = gaze_directions(pitch, yaw, iris_h, iris_v)
+        scores = attention_scores(pitch, yaw, points)
+        iris_h, iris_v = np.clip(iris_h, 0, 1), np.clip(iris_v, 0, 1)
+        self.record_stage('scoring', start)
+        
+        return [
+            no_face_result(DEGENERATE_EYE_ERROR) if directions[i] == 'unknown' else {
+                'gaze_direction': str(directions[i]),
+                'attention_score': float(scores[i]),
+                'head_pitch': float(pitch[i]),
+                'head_yaw': float(yaw[i]),
+                'iris_horizontal': float(iris_h[i]),
+                'iris_vertical': float(iris_v[i])
             }
+            for i in range(len(poses))
+        ]
 
     def rotation_matrix_to_euler_angles(self, rotation_mat):
         sy = np.sqrt(rotation_mat[0, 0] ** 2 + rotation_mat[1, 0] ** 2)
@@ -146,69 +453,213 @@ class GazeAnalyzer:
         
         return np.array([np.degrees(x), np.degrees(y), np.degrees(z)])
 
-    def classify_gaze_direction(self, pitch, yaw, eye_center, landmarks):
-        iris_x = (landmarks[473].x + landmarks[474].x + landmarks[475].x + landmarks[476].x) / 4
-        iris_y = (landmarks[473].y + landmarks[474].y + landmarks[475].y + landmarks[476].y) / 4
-        
-        eye_left = landmarks[263].x
-        eye_right = landmarks[33].x
-        eye_top = min(landmarks[27].y, landmarks[257].y)
-        eye_bottom = max(landmarks[30].y, landmarks[260].y)
-        
-        iris_horizontal = (iris_x - eye_left) / (eye_right - eye_left)
-        iris_vertical = (iris_y - eye_top) / (eye_bottom - eye_top)
-        
-        if abs(yaw) > 15:
-            if yaw > 0:
-                return 'right'
-            else:
-                return 'left'
-        
-        if pitch > 10:
-            return 'down'
-        elif pitch < -10:
-            return 'up'
-        
-        if iris_horizontal < 0.35:
-            return 'left'
-        elif iris_horizontal > 0.65:
-            return 'right'
-        elif iris_vertical < 0.4:
-            return 'up'
-        elif iris_vertical > 0.6:
-            return 'down'
+    def classify_gaze_direction(self, pitch, yaw, landmarks):
+        return str(gaze_directions(pitch, yaw, *iris_ratios(landmarks)))
+
+    def calculate_attention_score(self, pitch, yaw, landmarks):
+        return float(attention_scores(pitch, yaw, landmarks))
+
+
+# FaceMesh indices matched to GazeAnalyzer.face_3d for solvePnP
+POSE_LANDMARKS = [33, 263, 1, 61, 291, 199]
+IRIS_LANDMARKS = [473, 474, 475, 476]
+
+
+def no_face_result(error):
+    return {
+        'error': error,
+        'gaze_direction': 'unknown',
+        'attention_score': 0.0,
+        'head_pitch': 0.0,
+        'head_yaw': 0.0
+    }
+
+
+def landmarks_to_array(landmarks):
+    """Convert a FaceMesh landmark list into a (478, 3) array of x, y, z."""
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float64)
+
+
+def eye_geometry(points):
+    """Iris centre and eye box for (..., 478, 3) landmark arrays."""
+    iris = points[..., IRIS_LANDMARKS, :2].mean(axis=-2)
+    return {
+        'iris_x': iris[..., 0],
+        'iris_y': iris[..., 1],
+        'eye_left': points[..., 263, 0],
+        'eye_right': points[..., 33, 0],
+        'eye_top': np.minimum(points[..., 27, 1], points[..., 257, 1]),
+        'eye_bottom': np.maximum(points[..., 30, 1], points[..., 260, 1]),
+        'eye_open': points[..., 386, 1] - points[..., 374, 1]
+    }
+
+
+def iris_ratios(points):
+    """Iris position inside the eye box as unclipped (horizontal, vertical) ratios.
+
+    A ratio is NaN or infinite where the eye box has no width or height.
+    """
+    eye = eye_geometry(points)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        horizontal = (eye['iris_x'] - eye['eye_left']) / (eye['eye_right'] - eye['eye_left'])
+        vertical = (eye['iris_y'] - eye['eye_top']) / (eye['eye_bottom'] - eye['eye_top'])
+    return horizontal, vertical
+
+
+def gaze_directions(pitch, yaw, iris_horizontal, iris_vertical):
+    """Vectorised gaze direction labels from iris_ratios; works on one frame or a stacked batch.
+
+    Frames whose ratios are not finite are labelled 'unknown' (the scalar
+    scoring raised a division error for them).
+    """
+    pitch = np.asarray(pitch)
+    yaw = np.asarray(yaw)
+    t = GAZE_THRESHOLDS
+    head_turned = np.abs(yaw) > t['head_yaw']
+    degenerate = ~(np.isfinite(iris_horizontal) & np.isfinite(iris_vertical))
+    
+    return np.select(
+        [
+            degenerate,
+            head_turned & (yaw > 0),
+            head_turned,
+            pitch > t['head_pitch'],
+            pitch < -t['head_pitch'],
+            iris_horizontal < t['iris_left'],
+            iris_horizontal > t['iris_right'],
+            iris_vertical < t['iris_up'],
+            iris_vertical > t['iris_down']
+        ],
+        ['unknown', 'right', 'left', 'down', 'up', 'left', 'right', 'up', 'down'],
+        default='straight'
+    )
+
+
+def attention_scores(pitch, yaw, points):
+    """Vectorised attention score in [0, 1]; works on one frame or a stacked batch."""
+    straight_penalty = (np.abs(pitch) + np.abs(yaw)) / 180.0
+    straight_score = np.maximum(0, 1.0 - straight_penalty)
+    
+    eye = eye_geometry(points)
+    iris_h = (eye['iris_x'] - eye['eye_left']) / np.maximum(0.001, eye['eye_right'] - eye['eye_left'])
+    iris_v = (eye['iris_y'] - eye['eye_top']) / np.maximum(0.001, eye['eye_bottom'] - eye['eye_top'])
+    
+    iris_h = np.clip(iris_h, 0, 1)
+    iris_v = np.clip(iris_v, 0, 1)
+    
+    h_center_distance = np.abs(iris_h - 0.5) * 2
+    v_center_distance = np.abs(iris_v - 0.5) * 2
+    
+    center_score = np.maximum(0, 1.0 - (h_center_distance + v_center_distance) / 2)
+    
+    eye_aspect_ratio = np.clip(eye['eye_open'] * 100, 0, 1)
+    
+    attention_score = (straight_score * 0.4 + center_score * 0.35 + eye_aspect_ratio * 0.25)
+    
+    return np.clip(attention_score, 0.0, 1.0)
+
+
+def validate_image_path(image_path):
+    if not os.path.exists(image_path):
+        return f'File not found at path: {image_path}'
+    
+    if not os.path.isfile(image_path):
+        return f'Path is not a file: {image_path}'
+    
+    if not os.access(image_path, os.R_OK):
+        return f'No read permission for file: {image_path}'
+    
+    return None
+
+
+def handle_request(analyzer, request):
+    """Answer one line of the --serve protocol.
+
+    A request is either a bare image path or a JSON object of the form
+    {"id": ..., "image_path": "..."}; the id is echoed back so callers can
+    pipeline several requests over the same pipe. {"image_paths": [...]}
+    scores a whole batch and answers with per-frame results plus a summary;
+    {"video_path": "...", "frame_step": n} does the same for a video file
+    using FaceMesh tracking across frames. Adding "stream_id" (and optionally
+    "timestamp_ms") to a single image request tracks the face across that
+    stream's frames and returns smoothed pose plus fixation/saccade segments
+    until an {"end_stream": stream_id} request closes it.
+    """
+    request_id = None
+    if isinstance(request, dict):
+        request_id = request.get('id')
+        image_path = request.get('image_path')
+    else:
+        image_path = request
+    
+    if isinstance(request, dict) and 'image_paths' in request:
+        result = analyzer.estimate_gaze_batch(request['image_paths'])
+    elif isinstance(request, dict) and 'video_path' in request:
+        error = validate_image_path(request['video_path'])
+        if error:
+            result = {'error': error}
+        else:
+            result = analyzer.estimate_gaze_video(request['video_path'], request.get('frame_step', 1))
+    elif isinstance(request, dict) and 'end_stream' in request:
+        result = analyzer.end_stream(request['end_stream'])
+    elif not image_path:
+        result = {'error': 'Image path required'}
+    else:
+        error = validate_image_path(image_path)
+        if error:
+            result = {'error': error}
         else:
-            return 'straight'
+            stream_id = request.get('stream_id') if isinstance(request, dict) else None
+            try:
+                if stream_id is not None:
+                    result = analyzer.estimate_gaze_frame(image_path, stream_id, request.get('timestamp_ms'))
+                else:
+                    result = analyzer.estimate_gaze(image_path)
+            except Exception as e:
+                result = {'error': f'Gaze analysis error: {str(e)}'}
+    
+    if request_id is not None:
+        result['id'] = request_id
+    return result
 
-    def calculate_attention_score(self, pitch, yaw, eye_center, landmarks):
-        straight_penalty = (abs(pitch) + abs(yaw)) / 180.0
-        straight_score = max(0, 1.0 - straight_penalty)
-        
-        iris_x = (landmarks[473].x + landmarks[474].x + landmarks[475].x + landmarks[476].x) / 4
-        iris_y = (landmarks[473].y + landmarks[474].y + landmarks[475].y + landmarks[476].y) / 4
-        
-        eye_left = landmarks[263].x
-        eye_right = landmarks[33].x
-        eye_top = min(landmarks[27].y, landmarks[257].y)
-        eye_bottom = max(landmarks[30].y, landmarks[260].y)
-        
-        iris_h = (iris_x - eye_left) / max(0.001, (eye_right - eye_left))
-        iris_v = (iris_y - eye_top) / max(0.001, (eye_bottom - eye_top))
-        
-        iris_h = max(0, min(1, iris_h))
-        iris_v = max(0, min(1, iris_v))
-        
-        h_center_distance = abs(iris_h - 0.5) * 2
-        v_center_distance = abs(iris_v - 0.5) * 2
-        
-        center_score = max(0, 1.0 - (h_center_distance + v_center_distance) / 2)
-        
-        eye_open = landmarks[386].y - landmarks[374].y
-        eye_aspect_ratio = max(0, min(1, eye_open * 100))
+
+def serve(stdin=sys.stdin, stdout=sys.stdout):
+    """Keep one warmed GazeAnalyzer resident and answer requests line by line.
+
+    Every input line is one request and produces exactly one JSON line on
+    stdout. A ready line is written once the FaceMesh graph is built so the
+    parent process knows when it can start sending work.
+    """
+    analyzer = GazeAnalyzer()
+    stdout.write(json.dumps({'ready': True, 'pid': os.getpid()}) + '\n')
+    stdout.flush()
+    
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
         
-        attention_score = (straight_score * 0.4 + center_score * 0.35 + eye_aspect_ratio * 0.25)
+        if line.startswith('{'):
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                stdout.write(json.dumps({'error': f'Invalid request: {str(e)}'}) + '\n')
+                stdout.flush()
+                continue
+        else:
+            request = line
         
-        return min(1.0, max(0.0, attention_score))
+        # A malformed request must not take the resident worker (and the
+        # requests queued behind it) down; it gets an error line like any other
+        try:
+            response = json.dumps(handle_request(analyzer, request))
+        except Exception as e:
+            result = {'error': f'Gaze analysis error: {str(e)}'}
+            if isinstance(request, dict) and request.get('id') is not None:
+                result['id'] = request['id']
+            response = json.dumps(result)
+        stdout.write(response + '\n')
+        stdout.flush()
 
 
 def main():
@@ -216,18 +667,34 @@ def main():
         print(json.dumps({'error': 'Image path required'}))
         sys.exit(1)
     
-    image_path = sys.argv[1]
+    if sys.argv[1] == '--serve':
+        serve()
+        return
     
-    if not os.path.exists(image_path):
-        print(json.dumps({'error': f'File not found at path: {image_path}'}))
-        sys.exit(1)
+    if sys.argv[1] == '--video':
+        if len(sys.argv) < 3:
+            print(json.dumps({'error': 'Video path required'}))
+            sys.exit(1)
+        try:
+            analyzer = GazeAnalyzer()
+            print(json.dumps(analyzer.estimate_gaze_video(sys.argv[2])))
+        except Exception as e:
+            print(json.dumps({'error': f'Gaze analysis error: {str(e)}'}))
+        return
     
-    if not os.path.isfile(image_path):
-        print(json.dumps({'error': f'Path is not a file: {image_path}'}))
-        sys.exit(1)
+    if sys.argv[1] == '--batch':
+        try:
+            analyzer = GazeAnalyzer()
+            print(json.dumps(analyzer.estimate_gaze_batch(sys.argv[2:])))
+        except Exception as e:
+            print(json.dumps({'error': f'Gaze analysis error: {str(e)}'}))
+        return
     
-    if not os.access(image_path, os.R_OK):
-        print(json.dumps({'error': f'No read permission for file: {image_path}'}))
+    image_path = sys.argv[1]
+    
+    error = validate_image_path(image_path)
+    if error:
+        print(json.dumps({'error': error}))
         sys.exit(1)
     
     try:
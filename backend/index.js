@@ -3,9 +3,10 @@ const express = require('express');
 const cors = require('cors');
 const path = require('path');
 const fs = require('fs');
-const { spawn } = require('child_process');
 const mongoose = require('mongoose');
 const trackScreening = require('./utils/trackScreening');
+const { analyzeGazeImage } = require('./utils/gazeWorker');
+const { predictMriScan, startServer: startMriServer } = require('./utils/mriWorker');
 
 const http = require('http');
 const { Server } = require('socket.io');
@@ -134,6 +135,13 @@ try {
   console.error('Gaze Routes Error:', e.message);
 }
 
+// ✅ MRI Connectivity Job Routes (submit, then poll status/result)
+try {
+  app.use('/api/mri-jobs', require('./routes/mriJobs'));
+} catch (e) {
+  console.error('MRI Job Routes Error:', e.message);
+}
+
 // ✅ Guest Routes (Unauthenticated)
 try {
   app.use('/api/guest', require('./routes/guest'));
@@ -262,74 +270,11 @@ app.post('/api/predict-mri', (req, res, next) => {
     const patientId = req.body.patientId || null;
     const imagePath = path.resolve(req.file.path);
     const originalName = req.file.originalname; // Get original filename
-    const workerPath = path.resolve(__dirname, 'python_worker.py');
 
     console.log('🧠 [MRI Route] Processing scan:', imagePath);
     console.log('📝 [MRI Route] Original filename:', originalName);
-    console.log('📍 [MRI Route] Worker path:', workerPath);
-
-    const result = await new Promise((resolve, reject) => {
-      // Pass originalName as a 3rd argument to the worker
-      const pythonProcess = spawn('py', [workerPath, imagePath, originalName], {
-        stdio: ['pipe', 'pipe', 'pipe']
-      });
-
-      let output = '';
-      let errorOutput = '';
-
-      pythonProcess.stdout.on('data', (data) => {
-        output += data.toString();
-      });
-
-      pythonProcess.stderr.on('data', (data) => {
-        errorOutput += data.toString();
-        console.log(`🐍 [MRI Route] Python stderr: ${data}`);
-      });
-
-      const timeout = setTimeout(() => {
-        pythonProcess.kill();
-        reject(new Error('MRI prediction timed out after 120 seconds'));
-      }, 120000);
-
-      pythonProcess.on('close', (code) => {
-        clearTimeout(timeout);
-        console.log('📊 [MRI Route] Python process exit code:', code);
-
-        if (!output.trim()) {
-          reject(new Error('No output from MRI analysis process. Check Python environment and model file.'));
-          return;
-        }
-
-        try {
-          // Strip ANSI escape codes (progress bars, etc.)
-          const cleanOutput = output.trim().replace(/\x1b\[[0-9;]*[a-zA-Z]/g, '');
-          
-          // Try to extract JSON if it's still not clean
-          let jsonStr = cleanOutput;
-          const firstBrace = cleanOutput.indexOf('{');
-          const lastBrace = cleanOutput.lastIndexOf('}');
-          
-          if (firstBrace !== -1 && lastBrace !== -1 && lastBrace > firstBrace) {
-            jsonStr = cleanOutput.substring(firstBrace, lastBrace + 1);
-          }
-          
-          const parsed = JSON.parse(jsonStr);
-          if (parsed.error) {
-            reject(new Error(parsed.error));
-          } else {
-            resolve(parsed);
-          }
-        } catch (parseError) {
-          console.error('JSON parse error:', parseError, 'output:', output);
-          reject(new Error('Failed to parse MRI analysis response: ' + parseError.message + ' (Raw output: ' + output.substring(0, 100) + '...)'));
-        }
-      });
 
-      pythonProcess.on('error', (err) => {
-        console.error('Python spawn error:', err);
-        reject(new Error('Failed to start MRI analysis process: ' + err.message));
-      });
-    });
+    const result = await predictMriScan(imagePath, originalName);
 
     // Track MRI screening in central Screening collection
     trackScreening({
@@ -366,108 +311,31 @@ app.post('/api/predict-gaze-snapshot', upload.single('file'), async (req, res) =
     }
 
     const imagePath = path.resolve(req.file.path);
-    const gazeWorkerPath = path.resolve(__dirname, 'gaze_worker.py');
 
     console.log('📷 Processing gaze snapshot:', imagePath);
-    console.log('📍 Gaze worker path:', gazeWorkerPath);
     console.log('📝 File exists:', fs.existsSync(imagePath));
-    console.log('📝 Worker exists:', fs.existsSync(gazeWorkerPath));
-
-    return new Promise((resolve) => {
-      const pythonProcess = spawn('py', ['-3.10', gazeWorkerPath, imagePath], {
-        stdio: ['pipe', 'pipe', 'pipe']
-      });
-
-      let output = '';
-      let errorOutput = '';
 
-      pythonProcess.stdout.on('data', (data) => {
-        output += data.toString();
-      });
+    const result = await analyzeGazeImage(imagePath);
 
-      pythonProcess.stderr.on('data', (data) => {
-        errorOutput += data.toString();
+    if (result.error) {
+      console.error('Gaze analysis error:', result.error);
+      return res.status(400).json({
+        error: result.error || 'Gaze analysis failed',
+        gaze_direction: 'unknown',
+        attention_score: 0,
+        head_pitch: 0,
+        head_yaw: 0,
       });
+    }
 
-      const timeout = setTimeout(() => {
-        pythonProcess.kill();
-        console.error('Python process timeout after 60 seconds');
-        resolve(res.status(500).json({
-          error: 'Gaze analysis timed out',
-          gaze_direction: 'unknown',
-          attention_score: 0,
-          head_pitch: 0,
-          head_yaw: 0,
-        }));
-      }, 60000);
-
-      pythonProcess.on('close', (code) => {
-        clearTimeout(timeout);
-
-        console.log('📊 Python process exit code:', code);
-        console.log('📊 Python stdout length:', output.length);
-        console.log('📊 Python stderr length:', errorOutput.length);
-
-        if (errorOutput) {
-          console.error('Python stderr:', errorOutput);
-        }
-
-        if (!output.trim()) {
-          console.error('No output from Python process');
-          return resolve(res.status(500).json({
-            error: 'No output from gaze analysis process. Check Python dependencies.',
-            gaze_direction: 'unknown',
-            attention_score: 0,
-            head_pitch: 0,
-            head_yaw: 0,
-          }));
-        }
-
-        try {
-          const result = JSON.parse(output.trim());
-
-          if (result.error) {
-            console.error('Gaze analysis error:', result.error);
-            return resolve(res.status(400).json({
-              error: result.error || 'Gaze analysis failed',
-              gaze_direction: 'unknown',
-              attention_score: 0,
-              head_pitch: 0,
-              head_yaw: 0,
-            }));
-          }
-
-          console.log('✅ Gaze analysis complete:', result);
-
-          resolve(res.status(200).json({
-            gaze_direction: result.gaze_direction,
-            attention_score: Number(result.attention_score.toFixed(3)),
-            head_pitch: Number(result.head_pitch.toFixed(2)),
-            head_yaw: Number(result.head_yaw.toFixed(2)),
-            filename: req.file.filename,
-          }));
-        } catch (parseError) {
-          console.error('JSON parse error:', parseError, 'output:', output);
-          resolve(res.status(500).json({
-            error: 'Failed to parse gaze analysis response',
-            gaze_direction: 'unknown',
-            attention_score: 0,
-            head_pitch: 0,
-            head_yaw: 0,
-          }));
-        }
-      });
+    console.log('✅ Gaze analysis complete:', result);
 
-      pythonProcess.on('error', (err) => {
-        console.error('Python process error:', err);
-        resolve(res.status(500).json({
-          error: 'Gaze analysis process failed: ' + err.message,
-          gaze_direction: 'unknown',
-          attention_score: 0,
-          head_pitch: 0,
-          head_yaw: 0,
-        }));
-      });
+    return res.status(200).json({
+      gaze_direction: result.gaze_direction,
+      attention_score: Number(result.attention_score.toFixed(3)),
+      head_pitch: Number(result.head_pitch.toFixed(2)),
+      head_yaw: Number(result.head_yaw.toFixed(2)),
+      filename: req.file.filename,
     });
   } catch (err) {
     console.error('Gaze prediction route error:', err);
@@ -522,6 +390,8 @@ async function start() {
   });
 
   server.listen(PORT, () => console.log(`🚀 Server Live on Port ${PORT}`));
+  // Load the MRI CNN in the background so scans skip TensorFlow start-up
+  startMriServer();
 }
 
 start();
@@ -0,0 +1,308 @@
+"""
+Shared registry of trained model artifacts for the Python predictors.
+Artifacts are resolved by name (and optionally version) through the JSON
+manifest next to this file instead of ad-hoc filenames relative to the CWD.
+Files are checked against their recorded SHA-256, deserialized objects are
+cached per process, and joblib artifacts are opened with mmap_mode so their
+numpy arrays are paged in from disk and shared between worker processes.
+
+CLI:
+    python model_registry.py list
+    python model_registry.py verify [NAME ...]
+    python model_registry.py checksum NAME [--version V]
+    python model_registry.py convert NAME     # re-save as uncompressed joblib (new version)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+
+MANIFEST_PATH = os.environ.get(
+    'MODEL_REGISTRY_MANIFEST',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_registry.json')
+)
+# Stats of files whose checksum was already computed, so unchanged files are not re-hashed
+CHECKSUM_CACHE_NAME = '.model_registry_checksums.json'
+
+_lock = threading.Lock()
+_manifest = None
+_objects = {}
+
+
+class ArtifactError(Exception):
+    """Unknown artifact or version, or a file that does not match its checksum."""
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(reload=False):
+    global _manifest
+    with _lock:
+        if _manifest is None or reload:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        return _manifest
+
+
+def save_manifest(manifest):
+    global _manifest
+    tmp_path = f'{MANIFEST_PATH}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, MANIFEST_PATH)
+    with _lock:
+        _manifest = manifest
+
+
+def resolve(name, version=None):
+    """Manifest entry of an artifact version (the default one when version is None).
+
+    The returned dict has name, version, format, sha256 and an absolute path.
+    """
+    models = load_manifest()['models']
+    if name not in models:
+        raise ArtifactError(f"Unknown model artifact: {name}")
+    artifact = models[name]
+    version = str(version or artifact['default'])
+    if version not in artifact['versions']:
+        raise ArtifactError(f"Unknown version {version} of model artifact {name}")
+
+    entry = dict(artifact['versions'][version], name=name, version=version)
+    entry['path'] = os.path.join(os.path.dirname(os.path.abspath(MANIFEST_PATH)), entry['path'])
+    return entry
+
+
+def artifact_path(name, version=None):
+    return resolve(name, version)['path']
+
+
+def exists(name, version=None):
+    try:
+        return os.path.exists(artifact_path(name, version))
+    except ArtifactError:
+        return False
+
+
+def _checksum_cache_path():
+    return os.path.join(os.path.dirname(os.path.abspath(MANIFEST_PATH)), CHECKSUM_CACHE_NAME)
+
+
+def cached_sha256(path):
+    """SHA-256 of a file, reusing the last result while its size and mtime are unchanged."""
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    cache_path = _checksum_cache_path()
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    cached = cache.get(path)
+    if cached and cached[:2] == stamp:
+        return cached[2]
+
+    digest = file_sha256(path)
+    cache[path] = stamp + [digest]
+    try:
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # read-only deployment: verify again next time
+    return digest
+
+
+def verify(entry):
+    """Raise unless the artifact file exists and matches its recorded checksum.
+
+    Artifacts without a recorded checksum are accepted with a warning on stderr.
+    """
+    if not os.path.exists(entry['path']):
+        raise FileNotFoundError(f"Model artifact {entry['name']} v{entry['version']} not found: {entry['path']}")
+    expected = entry.get('sha256')
+    if not expected:
+        # stderr, since the predictor scripts print their results as JSON on stdout
+        print(
+            f"Warning: no checksum recorded for model artifact {entry['name']} v{entry['version']}, "
+            f"skipping verification. Run 'python model_registry.py checksum {entry['name']}'.",
+            file=sys.stderr
+        )
+    elif cached_sha256(entry['path']) != expected:
+        raise ArtifactError(
+            f"Checksum mismatch for model artifact {entry['name']} v{entry['version']} ({entry['path']}). "
+            f"Re-export it or run 'python model_registry.py checksum {entry['name']}'."
+        )
+
+
+def _load_joblib(path, mmap=True):
+    import joblib
+
+    try:
+        # Arrays in uncompressed joblib files are memory-mapped copy-on-write (libsvm
+        # rejects read-only buffers); pages stay shared with other processes until written
+        return joblib.load(path, mmap_mode='c' if mmap else None)
+    except (pickle.UnpicklingError, ValueError, KeyError, EOFError):
+        # Only format errors fall back to plain pickle; anything else (e.g. a
+        # module the pickled object needs is missing) is raised as-is
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def _load_pickle(path, mmap=True):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _load_npy(path, mmap=True):
+    import numpy as np
+
+    return np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+
+
+def _load_keras(path, mmap=True):
+    from tensorflow import keras
+
+    return keras.models.load_model(path)
+
+
+def _load_tflite(path, mmap=True):
+    """Allocated TFLite interpreter; callers wanting a predict() wrapper pass their own loader."""
+    try:
+        # The standalone runtime avoids importing all of TensorFlow
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+
+    interpreter = Interpreter(model_path=path, num_threads=os.cpu_count())
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+LOADERS = {
+    'joblib': _load_joblib,
+    'pickle': _load_pickle,
+    'npy': _load_npy,
+    'keras': _load_keras,
+    'tflite': _load_tflite,
+}
+
+
+def load(name, version=None, loader=None, mmap=True):
+    """Deserialized artifact, verified and cached for the life of the process.
+
+    loader(path) overrides the loader of the artifact's format (e.g. Keras
+    models that need custom objects).
+    """
+    entry = resolve(name, version)
+    key = (entry['name'], entry['version'])
+    with _lock:
+        if key in _objects:
+            return _objects[key]
+
+    verify(entry)
+    if loader is None:
+        if entry['format'] not in LOADERS:
+            raise ArtifactError(f"No loader for format {entry['format']} of model artifact {name}")
+        obj = LOADERS[entry['format']](entry['path'], mmap)
+    else:
+        obj = loader(entry['path'])
+
+    with _lock:
+        return _objects.setdefault(key, obj)
+
+
+def clear_cache():
+    with _lock:
+        _objects.clear()
+
+
+def record_checksum(name, version=None):
+    entry = resolve(name, version)
+    manifest = load_manifest(reload=True)
+    digest = file_sha256(entry['path'])
+    manifest['models'][name]['versions'][entry['version']]['sha256'] = digest
+    save_manifest(manifest)
+    return digest
+
+
+def convert_to_joblib(name, version=None):
+    """Re-save a pickle/joblib artifact as uncompressed joblib under a new default version."""
+    import joblib
+
+    entry = resolve(name, version)
+    if entry['format'] not in ('pickle', 'joblib'):
+        raise ArtifactError(f"Only pickle/joblib artifacts can be converted, {name} is {entry['format']}")
+    obj = LOADERS[entry['format']](entry['path'], False)
+
+    manifest = load_manifest(reload=True)
+    versions = manifest['models'][name]['versions']
+    new_version = str(max(int(v) for v in versions) + 1)
+    base_dir = os.path.dirname(os.path.abspath(MANIFEST_PATH))
+    relative = os.path.splitext(versions[entry['version']]['path'])[0] + f'.v{new_version}.joblib'
+    joblib.dump(obj, os.path.join(base_dir, relative), compress=0)
+
+    versions[new_version] = {
+        'path': relative.replace(os.sep, '/'),
+        'format': 'joblib',
+        'sha256': file_sha256(os.path.join(base_dir, relative))
+    }
+    manifest['models'][name]['default'] = new_version
+    save_manifest(manifest)
+    return new_version
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and maintain the model artifact registry.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='Show every artifact version and whether its file exists')
+    verify_parser = commands.add_parser('verify', help='Check artifact files against their checksums')
+    verify_parser.add_argument('names', nargs='*')
+    checksum_parser = commands.add_parser('checksum', help='Record the current checksum of an artifact')
+    checksum_parser.add_argument('name')
+    checksum_parser.add_argument('--version')
+    convert_parser = commands.add_parser('convert', help='Re-save as memory-mappable joblib (new version)')
+    convert_parser.add_argument('name')
+    convert_parser.add_argument('--version')
+    args = parser.parse_args()
+
+    models = load_manifest()['models']
+    if args.command == 'list':
+        for name, artifact in models.items():
+            for version in artifact['versions']:
+                entry = resolve(name, version)
+                default = '*' if version == artifact['default'] else ' '
+                state = 'ok' if os.path.exists(entry['path']) else 'missing'
+                print(f"{default} {name} v{version} [{entry['format']}] {state}: {entry['path']}")
+    elif args.command == 'verify':
+        failed = 0
+        for name in args.names or models:
+            try:
+                verify(resolve(name))
+                print(f"✓ {name}")
+            except (ArtifactError, FileNotFoundError) as e:
+                failed += 1
+                print(f"✗ {e}")
+        return 1 if failed else 0
+    elif args.command == 'checksum':
+        print(record_checksum(args.name, args.version))
+    elif args.command == 'convert':
+        print(f"{args.name} v{convert_to_joblib(args.name, args.version)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,19 +1,8 @@
 import json
 import sys
 import numpy as np
-from pathlib import Path
 
-try:
-    import joblib
-    JOBLIB_AVAILABLE = True
-except ImportError:
-    JOBLIB_AVAILABLE = False
-
-try:
-    import pickle
-    PICKLE_AVAILABLE = True
-except ImportError:
-    PICKLE_AVAILABLE = False
+import model_registry
 
 def predict_asd_risk_heuristic(features_dict):
     """
@@ -115,32 +104,13 @@ def predict_asd_risk(features_dict):
         Dictionary with risk level and probabilities.
     """
     try:
-        backend_dir = Path(__file__).parent
-        model_path = backend_dir / 'asd_model.pkl'
-        scaler_path = backend_dir / 'scaler.pkl'
-        
-        if not model_path.exists():
+        if not model_registry.exists('asd_risk'):
             return predict_asd_risk_heuristic(features_dict)
         
-        model = None
-        scaler = None
-        
-        if JOBLIB_AVAILABLE:
-            try:
-                model = joblib.load(model_path)
-                scaler = joblib.load(scaler_path) if scaler_path.exists() else None
-            except Exception as e:
-                return predict_asd_risk_heuristic(features_dict)
-        elif PICKLE_AVAILABLE:
-            try:
-                with open(model_path, 'rb') as f:
-                    model = pickle.load(f)
-                if scaler_path.exists():
-                    with open(scaler_path, 'rb') as f:
-                        scaler = pickle.load(f)
-            except Exception as e:
-                return predict_asd_risk_heuristic(features_dict)
-        else:
+        try:
+            model = model_registry.load('asd_risk')
+            scaler = model_registry.load('asd_risk_scaler') if model_registry.exists('asd_risk_scaler') else None
+        except Exception:
             return predict_asd_risk_heuristic(features_dict)
         
         feature_names = [
@@ -1,17 +1,13 @@
 import sys
 import json
-import pickle
 import numpy as np
-from tensorflow import keras
+
+import model_registry
 
 def predict_progress(child_data):
-    model = keras.models.load_model('bpnn_progress_model.h5')
-    
-    with open('bpnn_scaler_x.pkl', 'rb') as f:
-        scaler_x = pickle.load(f)
-    
-    with open('bpnn_scaler_y.pkl', 'rb') as f:
-        scaler_y = pickle.load(f)
+    model = model_registry.load('bpnn_progress')
+    scaler_x = model_registry.load('bpnn_scaler_x')
+    scaler_y = model_registry.load('bpnn_scaler_y')
     
     input_features = np.array([
         child_data['week'],
@@ -1,10 +1,10 @@
 import sys
 import json
-import pickle
+
+import model_registry
 
 def predict_survey(answers):
-    with open('survey_dt.pkl', 'rb') as f:
-        model = pickle.load(f)
+    model = model_registry.load('survey_dt')
     
     prediction = model.predict([answers])[0]
     probabilities = model.predict_proba([answers])[0]
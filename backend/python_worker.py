@@ -3,36 +3,60 @@ import sys
 import subprocess
 import json
 
+
+def emit(message_type, **fields):
+    """Write one NDJSON message to stdout for Node (see predict_mri.ResultChannel)."""
+    print(json.dumps({"type": message_type, **fields}), flush=True)
+
+
+def result_pipe_args():
+    """Create the child's result pipe.
+
+    Returns (read_fd, write_fd, extra child arguments, extra Popen kwargs).
+    """
+    read_fd, write_fd = os.pipe()
+    if os.name == 'nt':
+        import msvcrt
+        handle = msvcrt.get_osfhandle(write_fd)
+        os.set_handle_inheritable(handle, True)
+        startupinfo = subprocess.STARTUPINFO(lpAttributeList={'handle_list': [handle]})
+        return read_fd, write_fd, [f'--result-handle={handle}'], {'startupinfo': startupinfo}
+    return read_fd, write_fd, [f'--result-fd={write_fd}'], {'pass_fds': (write_fd,)}
+
+
 def main() -> int:
     """
     This script acts as a bridge to the actual prediction script.
     It ensures that the environment is set up correctly and calls
     the prediction script with the provided file path.
+
+    Output is newline-delimited JSON: progress and timing messages while the
+    scan is processed, then exactly one result or error message.
     """
     if len(sys.argv) < 2:
-        print('{"error": "Missing file path argument"}')
+        emit("error", error="Missing file path argument")
         return 1
 
     file_path = sys.argv[1]
     original_filename = sys.argv[2] if len(sys.argv) > 2 else os.path.basename(file_path)
-    
+
     if not os.path.exists(file_path):
-        print(f'{{"error": "File not found: {file_path}"}}')
+        emit("error", error=f"File not found: {file_path}")
         return 1
 
     # Get the absolute path to the directory containing this script
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    
+
     # Construct the absolute path to the MRI prediction script
     predict_script_path = os.path.join(script_dir, 'asd_fmri', 'predict_mri.py')
 
     if not os.path.exists(predict_script_path):
-        print(f'{{"error": "Prediction script not found: {predict_script_path}"}}')
+        emit("error", error=f"Prediction script not found: {predict_script_path}")
         return 1
 
     # Get the Python executable path
     python_executable = sys.executable
-    
+
     # Debug logging to stderr
     debug_info = {
         "python_executable": python_executable,
@@ -46,51 +70,41 @@ def main() -> int:
     # Launch the prediction script as a separate process
     # This is important for dependency and environment isolation
     try:
-        process = subprocess.run(
-            [python_executable, predict_script_path, file_path, original_filename],
-            capture_output=True,
-            text=True,
-            check=False  # Don't raise on non-zero exit - we'll handle it
-        )
-        
-        # Log everything to stderr for debugging (Node.js will capture this)
-        print(f"WORKER_DEBUG: returncode={process.returncode}, stdout_len={len(process.stdout)}, stderr_len={len(process.stderr)}", file=sys.stderr)
-        if process.stderr:
-            print(f"WORKER_STDERR: {process.stderr}", file=sys.stderr)
-        
-        # If there's stdout, try to extract JSON (it might be mixed with progress bars)
-        if process.stdout:
-            stdout_str = process.stdout.strip()
-            # Try to find the last occurrence of { and its matching }
-            # Or just check if the whole thing is JSON
-            try:
-                # First try direct parse
-                json.loads(stdout_str)
-                print(stdout_str, end='')
-            except json.JSONDecodeError:
-                # If direct parse fails, try to find { ... } in the output
-                import re
-                json_match = re.search(r'\{.*\}', stdout_str, re.DOTALL)
-                if json_match:
-                    print(json_match.group(0), end='')
-                else:
-                    # If still not found, print it as is and let Node handle it
-                    print(stdout_str, end='')
-        # If there's stderr and no stdout, wrap it as JSON error
-        elif process.stderr:
-            print(f'{{"error": "Python script error: {process.stderr}"}}')
-        # If nothing was output and exit was non-zero, provide fallback error
-        elif process.returncode != 0:
-            print(f'{{"error": "Python script failed with exit code {process.returncode} and produced no output"}}')
-        else:
-            # This shouldn't happen - successful exit but no output
-            print(f'{{"error": "Python script completed but produced no output"}}')
-        
-        return process.returncode
+        read_fd, write_fd, extra_args, popen_kwargs = result_pipe_args()
+        try:
+            # The child's stdout and stderr (TensorFlow logs, progress bars) go
+            # straight to our stderr; only the result pipe is parsed
+            process = subprocess.Popen(
+                [python_executable, predict_script_path, file_path, original_filename] + extra_args,
+                stdin=subprocess.DEVNULL,
+                stdout=sys.stderr.fileno(),
+                **popen_kwargs
+            )
+        finally:
+            os.close(write_fd)
+
+        finished = False
+        with os.fdopen(read_fd, 'r', encoding='utf-8') as messages:
+            for line in messages:
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"WORKER_DEBUG: invalid result message: {line.strip()}", file=sys.stderr)
+                    continue
+                finished = finished or message.get("type") in ("result", "error")
+                print(json.dumps(message), flush=True)
+
+        returncode = process.wait()
+        print(f"WORKER_DEBUG: returncode={returncode}", file=sys.stderr)
+
+        if not finished:
+            emit("error", error=f"Python script failed with exit code {returncode} and produced no result")
+            return returncode or 1
+        return returncode
     except Exception as e:
         # Catch any other errors (e.g., file not found, permission denied)
-        print(f'{{"error": "Worker error: {str(e)}"}}')
+        emit("error", error=f"Worker error: {str(e)}")
         return 1
 
 if __name__ == "__main__":
-    raise SystemExit(main())
\ No newline at end of file
+    raise SystemExit(main())
@@ -3,12 +3,12 @@ const router = express.Router();
 const multer = require('multer');
 const path = require('path');
 const fs = require('fs');
-const { spawn } = require('child_process');
 const { verifyToken, therapistCheck } = require('../middlewares/auth');
 const GazeSession = require('../models/GazeSession');
 const Patient = require('../models/patient');
 const User = require('../models/user');
 const trackScreening = require('../utils/trackScreening');
+const { analyzeGazeImage, endGazeStream } = require('../utils/gazeWorker');
 
 // Helper function to auto-link guest sessions to patient
 async function autoLinkGuestSessions(patientId, parentEmail) {
@@ -105,32 +105,7 @@ async function handleSnapshotUpload(req, res, sessionId, analyze) {
 
     if (analyze === 'true') {
         const imagePath = path.resolve(req.file.path);
-        const gazeWorkerPath = path.resolve(__dirname, '../gaze_worker.py');
-
-        const result = await new Promise((resolve) => {
-            const pythonProcess = spawn('py', ['-3.10', gazeWorkerPath, imagePath]);
-            let output = '';
-            let errorOutput = '';
-
-            pythonProcess.stdout.on('data', (data) => output += data.toString());
-            pythonProcess.stderr.on('data', (data) => errorOutput += data.toString());
-
-            const timeout = setTimeout(() => {
-                pythonProcess.kill();
-                console.error('Snapshot analysis timed out');
-                resolve({ error: 'Analysis timed out' });
-            }, 60000);
-
-            pythonProcess.on('close', (code) => {
-                clearTimeout(timeout);
-                try {
-                    resolve(JSON.parse(output.trim()));
-                } catch (e) {
-                    console.error('Snapshot Python error:', errorOutput);
-                    resolve({ error: 'Analysis failed' });
-                }
-            });
-        });
+        const result = await analyzeGazeImage(imagePath, sessionId.toString());
 
         if (result && !result.error) {
             snapshotData.gazeDirection = result.gaze_direction;
@@ -169,32 +144,7 @@ router.post('/analyze', async (req, res) => {
         tempFilePath = path.join(gazeUploadsDir, `temp-${Date.now()}-${Math.round(Math.random() * 1E9)}.png`);
         fs.writeFileSync(tempFilePath, base64Data, 'base64');
 
-        const gazeWorkerPath = path.resolve(__dirname, '../gaze_worker.py');
-
-        const result = await new Promise((resolve) => {
-            const pythonProcess = spawn('py', ['-3.10', gazeWorkerPath, tempFilePath]);
-            let output = '';
-            let errorOutput = '';
-
-            pythonProcess.stdout.on('data', (data) => output += data.toString());
-            pythonProcess.stderr.on('data', (data) => errorOutput += data.toString());
-
-            const timeout = setTimeout(() => {
-                pythonProcess.kill();
-                resolve({ error: 'Analysis timed out after 60s' });
-            }, 60000);
-
-            pythonProcess.on('close', (code) => {
-                clearTimeout(timeout);
-                try {
-                    const parsed = JSON.parse(output.trim());
-                    resolve(parsed);
-                } catch (e) {
-                    console.error('Python error output:', errorOutput);
-                    resolve({ error: 'Analysis failed to parse output', details: errorOutput });
-                }
-            });
-        });
+        const result = await analyzeGazeImage(tempFilePath);
 
         res.status(200).json(result);
     } catch (err) {
@@ -633,6 +583,7 @@ router.post('/session/end/:sessionId', verifyToken, async (req, res) => {
             { status: 'completed', endTime: new Date() },
             { new: true }
         );
+        endGazeStream(sessionId);
         // Track gaze screening in the central Screening collection
         if (session) {
             // NEW: Accept patientId from request body
@@ -0,0 +1,82 @@
+const express = require('express');
+const router = express.Router();
+const multer = require('multer');
+const path = require('path');
+const fs = require('fs');
+const { submitMriJob, getMriJob, getMriJobResult } = require('../utils/mriJobs');
+
+// Uploads only stay here until they have been forwarded to the job API
+const uploadDir = path.join(__dirname, '../uploads/mri_jobs');
+if (!fs.existsSync(uploadDir)) fs.mkdirSync(uploadDir, { recursive: true });
+
+const upload = multer({
+    storage: multer.diskStorage({
+        destination: (req, file, cb) => cb(null, uploadDir),
+        filename: (req, file, cb) => cb(null, Date.now() + '-' + path.basename(file.originalname))
+    }),
+    limits: { fileSize: 500 * 1024 * 1024 }
+});
+
+function sendApiError(res, err) {
+    const unavailable = err.code === 'ECONNREFUSED';
+    console.error('❌ [MRI Jobs] Job API error:', err.message);
+    return res.status(unavailable ? 503 : 502).json({
+        error: unavailable ? 'MRI analysis service is not running' : 'MRI job API request failed',
+        details: err.message
+    });
+}
+
+/**
+ * POST /api/mri-jobs
+ * Queue a connectivity (fMRI) analysis. Responds 202 with job_id; poll the
+ * status and result URLs below.
+ */
+router.post('/', upload.single('mri_scan'), async (req, res) => {
+    if (!req.file) {
+        return res.status(400).json({ error: 'No file uploaded' });
+    }
+
+    try {
+        const { statusCode, body } = await submitMriJob(req.file.path, req.file.originalname);
+        if (body.job_id) {
+            body.status_url = `/api/mri-jobs/${body.job_id}`;
+            body.result_url = `/api/mri-jobs/${body.job_id}/result`;
+            console.log(`📥 [MRI Jobs] Queued ${req.file.originalname} as job ${body.job_id}`);
+        }
+        return res.status(statusCode).json(body);
+    } catch (err) {
+        return sendApiError(res, err);
+    } finally {
+        // The job API keeps its own copy of the scan
+        fs.unlink(req.file.path, () => {});
+    }
+});
+
+/**
+ * GET /api/mri-jobs/:jobId
+ * Status (queued, running, completed, failed) and current stage of a job.
+ */
+router.get('/:jobId', async (req, res) => {
+    try {
+        const { statusCode, body } = await getMriJob(req.params.jobId);
+        return res.status(statusCode).json(body);
+    } catch (err) {
+        return sendApiError(res, err);
+    }
+});
+
+/**
+ * GET /api/mri-jobs/:jobId/result
+ * 200 with the prediction once the job completed, 202 while it is still
+ * queued or running, 422 with the error if it failed.
+ */
+router.get('/:jobId/result', async (req, res) => {
+    try {
+        const { statusCode, body } = await getMriJobResult(req.params.jobId);
+        return res.status(statusCode).json(body);
+    } catch (err) {
+        return sendApiError(res, err);
+    }
+});
+
+module.exports = router;
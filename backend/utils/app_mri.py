@@ -1,16 +1,12 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS # 1. Import CORS
 import os
-import joblib
-import pickle
 import numpy as np
+import sys
 import werkzeug.utils
 from pathlib import Path
 import nibabel as nib
 
-from nilearn import datasets
-from nilearn.maskers import NiftiLabelsMasker
-from nilearn.connectome import ConnectivityMeasure
 
 app = Flask(__name__)
 CORS(app) # 2. Initialize CORS for your app
@@ -18,20 +14,19 @@ CORS(app) # 2. Initialize CORS for your app
 # --- Load the saved model, scaler, and atlas ---
 backend_dir = Path(__file__).parent.parent
 asd_fmri_dir = backend_dir / 'asd_fmri'
-MODEL_FILENAME = 'asd_mri_model_new.pkl'
-SCALER_FILENAME = 'scaler.pkl'
+sys.path.insert(0, str(asd_fmri_dir))
+sys.path.insert(0, str(backend_dir))
+import model_registry
+import mri_atlas
+import mri_feature_store
+import mri_upload
+
+# Artifact names in backend/model_registry.json
+MODEL_ARTIFACT = 'mri_svm'
+SCALER_ARTIFACT = 'mri_svm_scaler'
 TRAINING_DATASET_INFO = 'ABIDE dataset (Stanford, UCLA, Caltech, Oregon, Michigan)'
 
 
-def load_serialized_model(model_path):
-    """Load model with joblib first, then pickle fallback."""
-    try:
-        return joblib.load(model_path), 'joblib'
-    except Exception:
-        with open(model_path, 'rb') as f:
-            return pickle.load(f), 'pickle'
-
-
 def compute_class_probabilities(model_obj, features_2d, prediction_value):
     """Return (control_probability, asd_probability) using available model APIs."""
     if hasattr(model_obj, 'predict_proba'):
@@ -48,31 +43,68 @@ def compute_class_probabilities(model_obj, features_2d, prediction_value):
     return float(1.0 - asd_prob), float(asd_prob)
 
 
-model_path = asd_fmri_dir / MODEL_FILENAME
-if not model_path.exists():
-    raise FileNotFoundError(f"MRI model file missing: {model_path}")
-model, model_loader = load_serialized_model(model_path)
-print(f"Loaded MRI model via {model_loader}: {model_path}")
+model = model_registry.load(MODEL_ARTIFACT)
+print(f"Loaded MRI model: {model_registry.artifact_path(MODEL_ARTIFACT)}")
 
-scaler_path = asd_fmri_dir / SCALER_FILENAME
-scaler = joblib.load(scaler_path) if scaler_path.exists() else None
+scaler = model_registry.load(SCALER_ARTIFACT) if model_registry.exists(SCALER_ARTIFACT) else None
 if scaler is None:
-    print(f"Scaler not found at {scaler_path}. Using model without external scaler.")
-atlas = datasets.fetch_atlas_harvard_oxford('cort-maxprob-thr25-2mm')
+    print(f"Scaler not found at {model_registry.artifact_path(SCALER_ARTIFACT)}. Using model without external scaler.")
 
 # --- Create the tools for feature extraction ---
-masker = NiftiLabelsMasker(
-    labels_img=atlas.maps, 
-    standardize=True, 
-    memory='nilearn_cache',
-    resampling_target='labels'  # Resample data to match atlas, not vice versa
-)
-correlation_measure = ConnectivityMeasure(kind='correlation')
+# Features come from mri_feature_store / mri_features instead of a per-scan masker
+# fit. Like the masker this app's model was used with, scans are resampled onto
+# the atlas grid (resampling_target='labels'), not the atlas onto each scan.
+mri_atlas.load_atlas()
+RESAMPLING_TARGET = 'labels'
 
 # Expected number of features based on 48 regions
 EXPECTED_FEATURES = 1128  # 48 * 47 / 2
 
-def process_new_scan(scan_path):
+def scan_shape_error(img_shape):
+    """User-facing message when a scan's shape cannot be used, else None."""
+    # REJECT 3D structural MRI scans - they cannot be used for connectivity analysis
+    if len(img_shape) == 3:
+        print("ERROR: This is a 3D structural MRI (T1/MPRAGE/anatomical)")
+        return ("⚠️ Structural MRI Detected\n\n"
+                "This appears to be a structural/anatomical MRI scan (like T1-weighted MPRAGE). "
+                "This tool requires functional MRI (fMRI) scans with time-series data.\n\n"
+                "Please upload a 4D resting-state or task-based fMRI scan (typically named rest.nii.gz, bold.nii.gz, or similar).")
+    
+    # Check if it's a 4D functional MRI (should have time dimension)
+    if len(img_shape) != 4:
+        print(f"Error: Expected 4D functional MRI (x, y, z, time), got {len(img_shape)}D")
+        return f"Expected 4D fMRI scan with time-series data. Got {len(img_shape)}D image."
+    
+    n_timepoints = img_shape[3]
+    print(f"Number of timepoints: {n_timepoints}")
+    
+    # Require sufficient timepoints for reliable correlation (training data had ~150+)
+    if n_timepoints < 50:
+        print(f"Error: Insufficient timepoints ({n_timepoints}). Need at least 50 for reliable correlation analysis.")
+        return (f"The fMRI scan has only {n_timepoints} timepoints. "
+                f"Reliable connectivity analysis requires at least 50 timepoints. "
+                f"The model was trained on scans with ~150+ timepoints.")
+    return None
+
+def validate_scan_shape(img_shape):
+    """Streaming upload check: raises ValueError with the scan_shape_error message."""
+    error_message = scan_shape_error(img_shape)
+    if error_message:
+        raise ValueError(error_message)
+
+def allowed_file(filename):
+    return filename.endswith('.nii.gz') or filename.endswith('.nii')
+
+UPLOAD_FOLDER = 'temp_uploads'
+
+# NIfTI uploads are streamed to UPLOAD_FOLDER, hashed and header-checked while they arrive
+app.request_class = mri_upload.scan_request_class(UPLOAD_FOLDER, allowed_file, validate_scan_shape)
+
+@app.errorhandler(mri_upload.InvalidScanUpload)
+def invalid_scan_upload(e):
+    return jsonify({'error': e.message}), 400
+
+def process_new_scan(scan_path, digest=None):
     try:
         # First, validate the input file
         print(f"Loading MRI file: {scan_path}")
@@ -80,51 +112,21 @@ def process_new_scan(scan_path):
         img_shape = img.shape
         print(f"MRI image shape: {img_shape}")
         
-        # REJECT 3D structural MRI scans - they cannot be used for connectivity analysis
-        if len(img_shape) == 3:
-            print("ERROR: This is a 3D structural MRI (T1/MPRAGE/anatomical)")
-            return None, ("⚠️ Structural MRI Detected\n\n"
-                         "This appears to be a structural/anatomical MRI scan (like T1-weighted MPRAGE). "
-                         "This tool requires functional MRI (fMRI) scans with time-series data.\n\n"
-                         "Please upload a 4D resting-state or task-based fMRI scan (typically named rest.nii.gz, bold.nii.gz, or similar).")
-        
-        # Check if it's a 4D functional MRI (should have time dimension)
-        if len(img_shape) != 4:
-            print(f"Error: Expected 4D functional MRI (x, y, z, time), got {len(img_shape)}D")
-            return None, f"Expected 4D fMRI scan with time-series data. Got {len(img_shape)}D image."
-        
-        n_timepoints = img_shape[3]
-        print(f"Number of timepoints: {n_timepoints}")
-        
-        # Require sufficient timepoints for reliable correlation (training data had ~150+)
-        if n_timepoints < 50:
-            print(f"Error: Insufficient timepoints ({n_timepoints}). Need at least 50 for reliable correlation analysis.")
-            return None, (f"The fMRI scan has only {n_timepoints} timepoints. "
-                         f"Reliable connectivity analysis requires at least 50 timepoints. "
-                         f"The model was trained on scans with ~150+ timepoints.")
+        error_message = scan_shape_error(img_shape)
+        if error_message:
+            return None, error_message
         
-        # Extract time series from the scan
-        time_series = masker.fit_transform(scan_path)
+        # Connectivity features; scans seen before come from the feature store
+        feature_vector, cached = mri_feature_store.scan_features(
+            scan_path, digest=digest, filename=os.path.basename(scan_path),
+            resampling_target=RESAMPLING_TARGET
+        )
         
-        # Debug: Check the shape of time_series
-        print(f"Time series shape: {time_series.shape}")
-        
-        # Validate time series dimensions
-        if time_series.ndim != 2:
-            print(f"Error: Expected 2D time series, got {time_series.ndim}D")
-            return None, "Failed to extract valid time series from the MRI scan."
-        
-        # Compute connectivity matrix
-        correlation_matrix = correlation_measure.fit_transform([time_series])[0]
-        
-        # Get the number of regions
-        n_regions = correlation_matrix.shape[0]
+        # Get the number of regions (n * (n - 1) / 2 correlations)
+        n_regions = int(round((1 + np.sqrt(1 + 8 * len(feature_vector))) / 2))
         expected_regions = 48
         
-        print(f"Extracted {n_regions} regions, expected {expected_regions}")
-        
-        upper_triangle_indices = np.triu_indices(correlation_matrix.shape[0], k=1)
-        feature_vector = correlation_matrix[upper_triangle_indices]
+        print(f"Extracted {n_regions} regions, expected {expected_regions}{' (from feature store)' if cached else ''}")
         
         # Check for NaN values BEFORE padding - this indicates data quality issues
         nan_count = np.isnan(feature_vector).sum()
@@ -171,13 +173,19 @@ def predict():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
-    filename = werkzeug.utils.secure_filename(file.filename)
-    upload_folder = 'temp_uploads'
-    os.makedirs(upload_folder, exist_ok=True)
-    filepath = os.path.join(upload_folder, filename)
-    file.save(filepath)
+    if isinstance(file.stream, mri_upload.ScanUploadStream):
+        # Streamed straight to disk and hashed while uploading
+        if file.stream.shape is None:
+            return jsonify({'error': 'Invalid file: no NIfTI header found'}), 400
+        file.stream.flush()
+        filepath, digest = file.stream.path, file.stream.digest
+    else:
+        filename = werkzeug.utils.secure_filename(file.filename)
+        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        filepath, digest = os.path.join(UPLOAD_FOLDER, filename), None
+        file.save(filepath)
 
-    features, error_message = process_new_scan(filepath)
+    features, error_message = process_new_scan(filepath, digest)
 
     if features is not None:
         try:
@@ -0,0 +1,212 @@
+const path = require('path');
+const readline = require('readline');
+const { spawn } = require('child_process');
+
+const GAZE_WORKER_PATH = path.resolve(__dirname, '../gaze_worker.py');
+const REQUEST_TIMEOUT_MS = 60000;
+// Time allowed for the mediapipe import and FaceMesh graph setup of a new worker
+const STARTUP_TIMEOUT_MS = 60000;
+// Results of already-analysed snapshots are reused by content hash
+const GAZE_CACHE_DIR = path.resolve(__dirname, '../uploads/gaze_cache');
+const BATCH_TIMEOUT_PER_IMAGE_MS = 1000;
+
+let nextRequestId = 1;
+
+/**
+ * Each worker process answers one request at a time. Live snapshots and
+ * whole-session batches run on separate processes so a long batch never
+ * holds up (or times out) the frames of an ongoing session.
+ */
+function createWorkerState(name) {
+    return { name, process: null, ready: false, queue: [], inFlight: null, startupTimer: null };
+}
+
+const workers = {
+    live: createWorkerState('live'),
+    batch: createWorkerState('batch')
+};
+
+function failQueued(state, message) {
+    const queued = state.queue.splice(0);
+    for (const entry of queued) {
+        entry.resolve({ error: message });
+    }
+}
+
+function finishInFlight(state, result) {
+    const entry = state.inFlight;
+    if (!entry) return;
+    clearTimeout(entry.timeout);
+    state.inFlight = null;
+    entry.resolve(result);
+}
+
+/**
+ * Stops a worker process without failing the requests still queued for it;
+ * the next dispatch starts a fresh process for them.
+ */
+function discardWorker(state) {
+    const pythonProcess = state.process;
+    clearTimeout(state.startupTimer);
+    state.process = null;
+    state.ready = false;
+    if (pythonProcess) pythonProcess.kill();
+}
+
+/**
+ * Starts the long-lived gaze worker of one lane. The Python side keeps one
+ * warmed GazeAnalyzer in memory and answers one JSON line per request, so
+ * the mediapipe import and FaceMesh graph setup are paid once per process
+ * instead of once per snapshot.
+ */
+function startWorker(state) {
+    const pythonProcess = spawn('py', ['-3.10', GAZE_WORKER_PATH, '--serve'], {
+        stdio: ['pipe', 'pipe', 'pipe'],
+        env: { GAZE_CACHE_DIR: GAZE_CACHE_DIR, ...process.env }
+    });
+    state.process = pythonProcess;
+    state.ready = false;
+
+    state.startupTimer = setTimeout(() => {
+        if (state.process !== pythonProcess) return;
+        console.error(`Gaze ${state.name} worker did not start in time`);
+        discardWorker(state);
+        failQueued(state, 'Gaze worker failed to start');
+    }, STARTUP_TIMEOUT_MS);
+
+    const lines = readline.createInterface({ input: pythonProcess.stdout });
+    lines.on('line', (line) => {
+        if (state.process !== pythonProcess) return;
+        let message;
+        try {
+            message = JSON.parse(line);
+        } catch (e) {
+            console.error('Gaze worker sent invalid output:', line);
+            return;
+        }
+
+        if (message.ready) {
+            console.log(`✅ Gaze ${state.name} worker ready (pid ${message.pid})`);
+            clearTimeout(state.startupTimer);
+            state.ready = true;
+            dispatch(state);
+            return;
+        }
+
+        if (!state.inFlight || state.inFlight.id !== message.id) return;
+        delete message.id;
+        finishInFlight(state, message);
+        dispatch(state);
+    });
+
+    pythonProcess.stdin.on('error', (err) => {
+        console.error('Gaze worker stdin error:', err.message);
+    });
+
+    pythonProcess.stderr.on('data', (data) => {
+        console.error('Gaze worker stderr:', data.toString());
+    });
+
+    const onExit = (reason) => {
+        // Already replaced after a timeout or stop
+        if (state.process !== pythonProcess) return;
+        const wasReady = state.ready;
+        discardWorker(state);
+        finishInFlight(state, { error: reason });
+        if (wasReady) {
+            // Only the request being analysed is lost; the rest go to a new worker
+            dispatch(state);
+        } else {
+            // A worker that cannot start would fail the same way again
+            failQueued(state, reason);
+        }
+    };
+    pythonProcess.on('error', (err) => onExit('Failed to start gaze worker: ' + err.message));
+    pythonProcess.on('close', (code) => onExit(`Gaze worker exited with code ${code}`));
+}
+
+/**
+ * Writes the next queued request once the worker is idle. The request's
+ * timeout starts here, so time spent waiting behind other requests does
+ * not count against it.
+ */
+function dispatch(state) {
+    if (state.inFlight || state.queue.length === 0) return;
+    if (!state.process) {
+        startWorker(state);
+        return;
+    }
+    if (!state.ready) return;
+
+    const entry = state.queue.shift();
+    entry.timeout = setTimeout(() => {
+        if (state.inFlight !== entry) return;
+        console.error(`Gaze ${state.name} worker request timed out, restarting worker`);
+        discardWorker(state);
+        finishInFlight(state, { error: 'Analysis timed out' });
+        dispatch(state);
+    }, entry.timeoutMs);
+    state.inFlight = entry;
+    state.process.stdin.write(JSON.stringify({ id: entry.id, ...entry.payload }) + '\n');
+}
+
+function sendRequest(state, payload, timeoutMs) {
+    return new Promise((resolve) => {
+        state.queue.push({ id: nextRequestId++, payload, timeoutMs, resolve, timeout: null });
+        dispatch(state);
+    });
+}
+
+/**
+ * Analyzes a single image with the resident gaze worker.
+ * Always resolves; failures are reported as `{ error }` like the one-shot worker.
+ *
+ * Passing a streamId (e.g. the gaze session id) keeps FaceMesh in tracking
+ * mode across that stream's frames, so the face detector only re-runs when
+ * tracking is lost. Call endGazeStream when the session finishes.
+ *
+ * @param {string} imagePath - Absolute path of the image on disk
+ * @param {string} [streamId] - Identifier of the live stream this frame belongs to
+ * @returns {Promise<Object>} gaze_direction, attention_score, head_pitch, head_yaw
+ */
+function analyzeGazeImage(imagePath, streamId = null) {
+    const payload = { image_path: imagePath };
+    if (streamId) payload.stream_id = streamId;
+    return sendRequest(workers.live, payload, REQUEST_TIMEOUT_MS);
+}
+
+/**
+ * Releases the tracking state held for a live stream. Does nothing if the
+ * worker is not running.
+ */
+function endGazeStream(streamId) {
+    if (!workers.live.process) return Promise.resolve({ ended: false });
+    return sendRequest(workers.live, { end_stream: streamId }, REQUEST_TIMEOUT_MS);
+}
+
+/**
+ * Analyzes a whole session of stored snapshots in one round trip to the
+ * batch worker, which runs separately from the live snapshot worker.
+ *
+ * @param {string[]} imagePaths - Absolute paths of the images on disk
+ * @returns {Promise<Object>} `{ frames, summary }` where summary holds mean_attention,
+ *                            direction_histogram and face_percentage
+ */
+function analyzeGazeBatch(imagePaths) {
+    const timeoutMs = REQUEST_TIMEOUT_MS + imagePaths.length * BATCH_TIMEOUT_PER_IMAGE_MS;
+    return sendRequest(workers.batch, { image_paths: imagePaths }, timeoutMs);
+}
+
+/**
+ * Stops both worker processes, failing anything still queued. Scripts call
+ * this before exiting so the child processes do not keep Node alive.
+ */
+function stopGazeWorkers() {
+    for (const state of Object.values(workers)) {
+        discardWorker(state);
+        finishInFlight(state, { error: 'Gaze worker stopped' });
+        failQueued(state, 'Gaze worker stopped');
+    }
+}
+
+module.exports = { analyzeGazeImage, analyzeGazeBatch, endGazeStream, stopGazeWorkers };
@@ -0,0 +1,104 @@
+const fs = require('fs');
+const http = require('http');
+const path = require('path');
+const crypto = require('crypto');
+
+// Connectivity SVM app (asd_fmri/app_mri.py) and its job API
+const MRI_JOBS_HOST = process.env.MRI_SVM_HOST || '127.0.0.1';
+const MRI_JOBS_PORT = parseInt(process.env.MRI_SVM_PORT || '5002', 10);
+const REQUEST_TIMEOUT_MS = 120000;
+
+function parseResponse(res, resolve, reject) {
+    let data = '';
+    res.setEncoding('utf8');
+    res.on('data', (chunk) => { data += chunk; });
+    res.on('end', () => {
+        try {
+            resolve({ statusCode: res.statusCode, body: JSON.parse(data) });
+        } catch (e) {
+            reject(new Error(`Invalid response from MRI job API (HTTP ${res.statusCode})`));
+        }
+    });
+}
+
+/**
+ * Uploads a scan to POST /predict_mri/jobs. The file is streamed from disk
+ * as multipart/form-data, so large scans are never buffered in memory.
+ *
+ * @param {string} filePath - Path of the scan on disk
+ * @param {string} originalName - Filename the job is reported under
+ * @returns {Promise<{statusCode: number, body: Object}>} 202 with job_id, or the API's error
+ */
+function submitMriJob(filePath, originalName) {
+    return new Promise((resolve, reject) => {
+        const boundary = '----mri-job-' + crypto.randomBytes(12).toString('hex');
+        const filename = (originalName || path.basename(filePath)).replace(/["\r\n]/g, '_');
+        const head = Buffer.from(
+            `--${boundary}\r\n` +
+            `Content-Disposition: form-data; name="mri_file"; filename="${filename}"\r\n` +
+            'Content-Type: application/octet-stream\r\n\r\n'
+        );
+        const tail = Buffer.from(`\r\n--${boundary}--\r\n`);
+
+        let size;
+        try {
+            size = fs.statSync(filePath).size;
+        } catch (err) {
+            reject(err);
+            return;
+        }
+
+        const req = http.request({
+            host: MRI_JOBS_HOST,
+            port: MRI_JOBS_PORT,
+            path: '/predict_mri/jobs',
+            method: 'POST',
+            headers: {
+                'Content-Type': `multipart/form-data; boundary=${boundary}`,
+                'Content-Length': head.length + size + tail.length
+            },
+            timeout: REQUEST_TIMEOUT_MS
+        }, (res) => parseResponse(res, resolve, reject));
+
+        req.on('timeout', () => req.destroy(new Error('MRI job upload timed out')));
+        req.on('error', reject);
+
+        req.write(head);
+        const file = fs.createReadStream(filePath);
+        file.on('error', (err) => req.destroy(err));
+        file.on('end', () => req.end(tail));
+        file.pipe(req, { end: false });
+    });
+}
+
+function getJson(urlPath) {
+    return new Promise((resolve, reject) => {
+        const req = http.get({
+            host: MRI_JOBS_HOST,
+            port: MRI_JOBS_PORT,
+            path: urlPath,
+            timeout: REQUEST_TIMEOUT_MS
+        }, (res) => parseResponse(res, resolve, reject));
+        req.on('timeout', () => req.destroy(new Error('MRI job API request timed out')));
+        req.on('error', reject);
+    });
+}
+
+/**
+ * Status and stage of a job (GET /predict_mri/jobs/<id>).
+ * @returns {Promise<{statusCode: number, body: Object}>}
+ */
+function getMriJob(jobId) {
+    return getJson(`/predict_mri/jobs/${encodeURIComponent(jobId)}`);
+}
+
+/**
+ * Result of a job (GET /predict_mri/jobs/<id>/result): 200 with the
+ * prediction, 202 while queued/running, 422 if it failed, 404 if unknown.
+ * @returns {Promise<{statusCode: number, body: Object}>}
+ */
+function getMriJobResult(jobId) {
+    return getJson(`/predict_mri/jobs/${encodeURIComponent(jobId)}/result`);
+}
+
+module.exports = { submitMriJob, getMriJob, getMriJobResult };
@@ -0,0 +1,158 @@
+const path = require('path');
+const http = require('http');
+const readline = require('readline');
+const { spawn } = require('child_process');
+
+const MRI_SERVER_PATH = path.resolve(__dirname, '../asd_fmri/mri_cnn_server.py');
+const MRI_WORKER_PATH = path.resolve(__dirname, '../python_worker.py');
+const MRI_SERVER_HOST = process.env.MRI_CNN_HOST || '127.0.0.1';
+const MRI_SERVER_PORT = parseInt(process.env.MRI_CNN_PORT || '5003', 10);
+const REQUEST_TIMEOUT_MS = 120000;
+
+let server = null;
+
+/**
+ * Starts the resident MRI CNN server once per Node process. It loads and
+ * warms the model before opening its port, so until it is listening
+ * requests keep going through the one-shot worker.
+ */
+function startServer() {
+    if (server || process.env.MRI_CNN_AUTOSTART === '0') return;
+
+    const serverProcess = spawn('py', ['-3.10', MRI_SERVER_PATH], {
+        cwd: path.dirname(MRI_SERVER_PATH),
+        stdio: ['ignore', 'ignore', 'pipe'],
+        env: { ...process.env, MRI_CNN_HOST: MRI_SERVER_HOST, MRI_CNN_PORT: String(MRI_SERVER_PORT) }
+    });
+    server = serverProcess;
+
+    serverProcess.stderr.on('data', (data) => {
+        console.log(`🧠 [MRI Server] ${data.toString().trim()}`);
+    });
+
+    const onExit = (reason) => {
+        console.error(`❌ [MRI Server] ${reason}`);
+        if (server === serverProcess) server = null;
+    };
+    serverProcess.on('error', (err) => onExit('Failed to start: ' + err.message));
+    serverProcess.on('close', (code) => onExit(`Exited with code ${code}`));
+}
+
+function requestServer(payload) {
+    return new Promise((resolve, reject) => {
+        const body = JSON.stringify(payload);
+        const req = http.request({
+            host: MRI_SERVER_HOST,
+            port: MRI_SERVER_PORT,
+            path: '/predict',
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) },
+            timeout: REQUEST_TIMEOUT_MS
+        }, (res) => {
+            let data = '';
+            res.setEncoding('utf8');
+            res.on('data', (chunk) => { data += chunk; });
+            res.on('end', () => {
+                try {
+                    resolve(JSON.parse(data));
+                } catch (e) {
+                    reject(new Error('Failed to parse MRI server response: ' + e.message));
+                }
+            });
+        });
+
+        req.on('timeout', () => req.destroy(new Error('MRI prediction timed out after 120 seconds')));
+        req.on('error', reject);
+        req.end(body);
+    });
+}
+
+/**
+ * Runs python_worker.py for a single scan (TensorFlow start-up and model
+ * load included). The worker writes one JSON message per line: progress and
+ * timing messages, then a final result or error. Timings are attached to the
+ * result as `timings_ms`.
+ */
+function runWorker(imagePath, originalName) {
+    return new Promise((resolve, reject) => {
+        // Pass originalName as a 3rd argument to the worker
+        const pythonProcess = spawn('py', [MRI_WORKER_PATH, imagePath, originalName], {
+            stdio: ['ignore', 'pipe', 'pipe']
+        });
+
+        let result = null;
+        const timings = {};
+
+        const lines = readline.createInterface({ input: pythonProcess.stdout });
+        lines.on('line', (line) => {
+            let message;
+            try {
+                message = JSON.parse(line);
+            } catch (e) {
+                console.error('MRI worker sent invalid output:', line);
+                return;
+            }
+
+            const { type, ...fields } = message;
+            if (type === 'progress') {
+                console.log(`⏳ [MRI Route] Stage: ${fields.stage}`);
+            } else if (type === 'timing') {
+                timings[fields.stage] = fields.ms;
+            } else if (type === 'result' || type === 'error') {
+                result = fields;
+            }
+        });
+
+        pythonProcess.stderr.on('data', (data) => {
+            console.log(`🐍 [MRI Route] Python stderr: ${data}`);
+        });
+
+        const timeout = setTimeout(() => {
+            pythonProcess.kill();
+            reject(new Error('MRI prediction timed out after 120 seconds'));
+        }, REQUEST_TIMEOUT_MS);
+
+        pythonProcess.on('close', (code) => {
+            clearTimeout(timeout);
+            console.log('📊 [MRI Route] Python process exit code:', code, 'timings (ms):', timings);
+
+            if (!result) {
+                reject(new Error('No output from MRI analysis process. Check Python environment and model file.'));
+                return;
+            }
+            if (!result.error) result.timings_ms = timings;
+            resolve(result);
+        });
+
+        pythonProcess.on('error', (err) => {
+            clearTimeout(timeout);
+            console.error('Python spawn error:', err);
+            reject(new Error('Failed to start MRI analysis process: ' + err.message));
+        });
+    });
+}
+
+/**
+ * Predicts ASD from one MRI scan. Uses the resident CNN server when it is
+ * listening and falls back to the one-shot python_worker.py otherwise
+ * (starting the server in the background for the next scans).
+ *
+ * @param {string} imagePath - Absolute path of the uploaded scan
+ * @param {string} originalName - Filename reported back in the result
+ * @returns {Promise<Object>} diagnosis, confidence, asd_probability, ...
+ */
+async function predictMriScan(imagePath, originalName) {
+    let result;
+    try {
+        result = await requestServer({ file_path: imagePath, filename: originalName });
+    } catch (err) {
+        if (err.code !== 'ECONNREFUSED') throw err;
+        startServer();
+        result = await runWorker(imagePath, originalName);
+    }
+
+    if (result.error) throw new Error(result.error);
+    return result;
+}
+
+module.exports = { predictMriScan, startServer };
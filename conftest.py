@@ -0,0 +1,83 @@
+import json
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / 'backend'))
+sys.path.insert(0, str(ROOT / 'backend' / 'asd_fmri'))
+
+# Setup/diagnostic scripts (test_mri_setup.py, backend/test_*.py) need the deployed
+# models and services and are run directly, not collected
+collect_ignore = ['test_mri_setup.py', 'backend', 'frontend']
+
+
+class StubFaceMesh:
+    """Stand-in for mediapipe's FaceMesh that never finds a face."""
+
+    def __init__(self, **options):
+        self.options = options
+        self.closed = False
+
+    def process(self, image):
+        return types.SimpleNamespace(multi_face_landmarks=None)
+
+    def close(self):
+        self.closed = True
+
+
+try:
+    import mediapipe  # noqa: F401
+except ImportError:
+    # The gaze modules import mediapipe at module level; their NumPy/OpenCV parts
+    # (scoring kernels, pose, pooling, the serve loop) are tested against this stub
+    mediapipe = types.ModuleType('mediapipe')
+    mediapipe.solutions = types.SimpleNamespace(
+        face_mesh=types.SimpleNamespace(FaceMesh=StubFaceMesh),
+        drawing_utils=types.SimpleNamespace()
+    )
+    sys.modules['mediapipe'] = mediapipe
+
+
+@pytest.fixture
+def atlas_dir(tmp_path, monkeypatch):
+    """Small synthetic labels atlas installed as the local Harvard-Oxford copy."""
+    nib = pytest.importorskip('nibabel')
+    np = pytest.importorskip('numpy')
+    import mri_atlas
+
+    atlas_dir = tmp_path / 'atlas'
+    atlas_dir.mkdir()
+    monkeypatch.setattr(mri_atlas, 'ATLAS_CACHE_DIR', str(atlas_dir))
+    monkeypatch.setattr(mri_atlas, '_atlas', None)
+    monkeypatch.setattr(mri_atlas, '_label_indices', {})
+
+    labels = np.zeros((20, 22, 18), dtype=np.int16)
+    for region in range(6):
+        x = 2 + (region % 3) * 6
+        y = 3 + (region // 3) * 8
+        labels[x:x + 5, y:y + 7, 4:14] = region + 1
+    maps_path, labels_path = mri_atlas._atlas_paths()
+    nib.save(nib.Nifti1Image(labels, np.diag([2.0, 2.0, 2.0, 1.0])), maps_path)
+    with open(labels_path, 'w') as f:
+        json.dump(['Background'] + [f'Region {i}' for i in range(1, 7)], f)
+    return atlas_dir
+
+
+@pytest.fixture
+def make_scan(tmp_path):
+    """make_scan(n_timepoints=80, name='scan.nii', seed=0) -> path of a random 4D scan on a 3mm grid."""
+    nib = pytest.importorskip('nibabel')
+    np = pytest.importorskip('numpy')
+
+    def make(n_timepoints=80, name='scan.nii', seed=0, shape=(14, 15, 12)):
+        rng = np.random.default_rng(seed)
+        data = (1000 + 50 * rng.standard_normal((*shape, n_timepoints))).astype(np.int16)
+        affine = np.diag([3.0, 3.0, 3.0, 1.0])
+        path = tmp_path / name
+        nib.save(nib.Nifti1Image(data, affine), str(path))
+        return str(path)
+
+    return make
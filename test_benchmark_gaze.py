@@ -0,0 +1,42 @@
+"""Tests for the summary math of the gaze benchmark (backend/benchmark_gaze.py)."""
+
+import pytest
+
+pytest.importorskip('cv2')
+
+import benchmark_gaze
+
+
+def test_percentiles_are_reported_in_milliseconds():
+    latencies = [i / 1000.0 for i in range(1, 101)]
+    assert benchmark_gaze.percentiles_ms(latencies) == {'p50': 50.5, 'p95': 95.05, 'p99': 99.01}
+
+
+def test_summarize_rates_and_stage_times_per_frame():
+    results = [{'gaze_direction': 'straight'}, {'error': 'No face detected'}, {}, {}]
+    summary = benchmark_gaze.summarize([0.01] * 4, [0.04], results, 0.5, {'mesh': 0.2, 'decode': 0.04})
+    assert summary['frames'] == 4
+    assert summary['frames_per_sec'] == 8.0
+    assert summary['latency_ms']['p50'] == 10.0
+    assert summary['call_latency_ms']['p99'] == 40.0
+    assert summary['face_detection_rate'] == 0.75
+    assert summary['stage_ms_per_frame'] == {'decode': 10.0, 'mesh': 50.0}
+    assert list(summary['stage_ms_per_frame']) == ['decode', 'mesh']
+
+
+def test_run_batches_spreads_call_latency_over_frames(monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(benchmark_gaze.time, 'perf_counter', lambda: float(next(clock)))
+    timed = {'mesh': 1.0}
+    warm = []
+
+    frame_latencies, call_latencies, results, elapsed = benchmark_gaze.run_batches(
+        list(range(5)), 2, warm.append,
+        lambda chunk: {'frames': [{'item': item} for item in chunk]}, timed, warmup=1
+    )
+    assert warm == [0]
+    assert timed == {}
+    assert call_latencies == [1.0, 1.0, 1.0]
+    assert frame_latencies == [0.5, 0.5, 0.5, 0.5, 1.0]
+    assert [result['item'] for result in results] == [0, 1, 2, 3, 4]
+    assert elapsed == 7.0
@@ -0,0 +1,65 @@
+"""Tests for the pooled FaceMesh in gaze_analysis (base64 frames)."""
+
+import atexit
+import importlib
+import sys
+import threading
+import types
+
+import pytest
+
+pytest.importorskip('mediapipe')
+pytest.importorskip('cv2')
+
+import gaze_analysis
+
+
+class FakeFaceMesh:
+    def __init__(self, **options):
+        self.options = options
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_face_mesh(monkeypatch):
+    monkeypatch.setattr(gaze_analysis, 'mp_face_mesh', types.SimpleNamespace(FaceMesh=FakeFaceMesh))
+
+
+def test_pool_reuses_one_face_mesh_per_thread():
+    pool = gaze_analysis.FaceMeshPool(static_image_mode=True)
+    first = pool.get()
+    assert pool.get() is first
+    assert first.options == {'static_image_mode': True}
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.get()))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+    assert pool._meshes == [first, other[0]]
+
+
+def test_pool_close_releases_meshes_and_starts_over():
+    pool = gaze_analysis.FaceMeshPool()
+    face_mesh = pool.get()
+    pool.close()
+    assert face_mesh.closed
+    assert pool._meshes == []
+
+    replacement = pool.get()
+    assert replacement is not face_mesh
+    assert not replacement.closed
+
+
+def test_module_analyzer_is_closed_at_exit(monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, 'register', registered.append)
+    monkeypatch.delitem(sys.modules, 'gaze_analysis')
+    module = importlib.import_module('gaze_analysis')
+    try:
+        assert module.analyzer.close in registered
+    finally:
+        sys.modules['gaze_analysis'] = gaze_analysis
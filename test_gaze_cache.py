@@ -0,0 +1,63 @@
+"""Tests for the gaze result cache."""
+
+import gaze_cache
+from gaze_cache import GazeResultCache
+
+
+def test_round_trip_and_settings_in_key(tmp_path):
+    cache = GazeResultCache(str(tmp_path), {'version': 1})
+    key = cache.key(b'image bytes')
+    assert cache.get(key) is None
+    cache.put(key, {'gaze_direction': 'center', 'attention_score': 0.9})
+    assert cache.get(key) == {'gaze_direction': 'center', 'attention_score': 0.9}
+
+    other = GazeResultCache(str(tmp_path / 'other'), {'version': 2})
+    assert other.key(b'image bytes') != key
+    cache.close()
+    other.close()
+
+
+def test_replacing_an_entry_does_not_count_as_insert(tmp_path):
+    cache = GazeResultCache(str(tmp_path), {}, max_entries=10)
+    for i in range(20):
+        cache.put('same', {'i': i})
+    assert cache._count == 1
+    assert cache.get('same') == {'i': 19}
+    cache.close()
+
+
+def test_eviction_drops_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(gaze_cache.time, 'time', lambda: next(clock))
+    cache = GazeResultCache(str(tmp_path), {}, max_entries=10)
+    for i in range(10):
+        cache.put(f'k{i}', {'i': i})
+    # A buffered hit must still protect k0 from eviction
+    assert cache.get('k0') == {'i': 0}
+    cache.put('k10', {'i': 10})
+
+    assert cache._count <= 10
+    assert cache.get('k0') is not None
+    assert cache.get('k1') is None
+    assert cache.get('k10') is not None
+    cache.close()
+
+
+def test_hits_are_persisted_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(gaze_cache, 'ACCESS_FLUSH_SIZE', 3)
+    cache = GazeResultCache(str(tmp_path), {})
+    cache.put('a', {})
+    cache.get('a')
+    cache.get('a')
+    assert len(cache._accessed) == 1
+    cache.put('b', {})
+    cache.get('b')
+    assert len(cache._accessed) == 2
+    cache.put('c', {})
+    cache.get('c')
+    assert cache._accessed == {}
+    cache.close()
+
+    reopened = GazeResultCache(str(tmp_path), {})
+    assert reopened._count == 3
+    reopened.close()
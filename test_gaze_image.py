@@ -0,0 +1,41 @@
+"""Tests for the gaze image decoding helpers (backend/gaze_image.py)."""
+
+import importlib
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+import gaze_image
+
+
+def encoded_jpeg(width, height):
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.circle(image, (width // 2, height // 2), min(width, height) // 3, (200, 180, 160), -1)
+    return cv2.imencode('.jpg', image)[1].tobytes()
+
+
+def test_downscaling_is_off_unless_configured(monkeypatch):
+    try:
+        monkeypatch.delenv('GAZE_MAX_INPUT_DIM', raising=False)
+        assert importlib.reload(gaze_image).DEFAULT_MAX_INPUT_DIM == 0
+        monkeypatch.setenv('GAZE_MAX_INPUT_DIM', '1280')
+        assert importlib.reload(gaze_image).DEFAULT_MAX_INPUT_DIM == 1280
+    finally:
+        monkeypatch.undo()
+        importlib.reload(gaze_image)
+
+
+def test_decode_keeps_full_resolution_by_default():
+    image, size = gaze_image.decode_image(encoded_jpeg(1600, 1200), 0)
+    assert image.shape[:2] == (1200, 1600)
+    assert size == (1200, 1600)
+
+
+def test_decode_with_max_input_dim_reports_original_size():
+    buf = encoded_jpeg(4000, 3000)
+    assert gaze_image.jpeg_size(buf) == (3000, 4000)
+    image, size = gaze_image.decode_image(buf, 1280)
+    assert image.shape[:2] == (960, 1280)
+    assert size == (3000, 4000)
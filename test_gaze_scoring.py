@@ -0,0 +1,106 @@
+"""Tests for the vectorised gaze direction / attention kernel in gaze_worker."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('mediapipe')
+pytest.importorskip('cv2')
+
+import gaze_worker
+
+
+def reference_direction(pitch, yaw, p):
+    """Per-landmark scalar classification the kernel replaced."""
+    iris_x = p[473:477, 0].mean()
+    iris_y = p[473:477, 1].mean()
+    eye_left, eye_right = p[263, 0], p[33, 0]
+    eye_top = min(p[27, 1], p[257, 1])
+    eye_bottom = max(p[30, 1], p[260, 1])
+    iris_horizontal = (iris_x - eye_left) / (eye_right - eye_left)
+    iris_vertical = (iris_y - eye_top) / (eye_bottom - eye_top)
+    if abs(yaw) > 15:
+        return 'right' if yaw > 0 else 'left'
+    if pitch > 10:
+        return 'down'
+    if pitch < -10:
+        return 'up'
+    if iris_horizontal < 0.35:
+        return 'left'
+    if iris_horizontal > 0.65:
+        return 'right'
+    if iris_vertical < 0.4:
+        return 'up'
+    if iris_vertical > 0.6:
+        return 'down'
+    return 'straight'
+
+
+def reference_attention(pitch, yaw, p):
+    straight_score = max(0, 1.0 - (abs(pitch) + abs(yaw)) / 180.0)
+    iris_x = p[473:477, 0].mean()
+    iris_y = p[473:477, 1].mean()
+    eye_left, eye_right = p[263, 0], p[33, 0]
+    eye_top = min(p[27, 1], p[257, 1])
+    eye_bottom = max(p[30, 1], p[260, 1])
+    iris_h = max(0, min(1, (iris_x - eye_left) / max(0.001, eye_right - eye_left)))
+    iris_v = max(0, min(1, (iris_y - eye_top) / max(0.001, eye_bottom - eye_top)))
+    center_score = max(0, 1.0 - (abs(iris_h - 0.5) * 2 + abs(iris_v - 0.5) * 2) / 2)
+    eye_aspect_ratio = max(0, min(1, (p[386, 1] - p[374, 1]) * 100))
+    return min(1.0, max(0.0, straight_score * 0.4 + center_score * 0.35 + eye_aspect_ratio * 0.25))
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0.3, 0.7, size=(200, 478, 3))
+    # Eye corners far enough apart for realistic iris ratios
+    points[:, 263, 0] = rng.uniform(0.3, 0.4, 200)
+    points[:, 33, 0] = rng.uniform(0.6, 0.7, 200)
+    pitch = rng.uniform(-20, 20, 200)
+    yaw = rng.uniform(-25, 25, 200)
+    return pitch, yaw, points
+
+
+def directions_of(pitch, yaw, points):
+    return gaze_worker.gaze_directions(pitch, yaw, *gaze_worker.iris_ratios(points))
+
+
+def test_batch_kernel_matches_scalar_reference(frames):
+    pitch, yaw, points = frames
+    directions = directions_of(pitch, yaw, points)
+    scores = gaze_worker.attention_scores(pitch, yaw, points)
+    for i in range(len(pitch)):
+        assert directions[i] == reference_direction(pitch[i], yaw[i], points[i])
+        assert scores[i] == pytest.approx(reference_attention(pitch[i], yaw[i], points[i]))
+
+
+def test_single_frame_matches_batch(frames):
+    pitch, yaw, points = frames
+    batch = gaze_worker.attention_scores(pitch, yaw, points)
+    for i in range(5):
+        assert str(directions_of(pitch[i], yaw[i], points[i])) == directions_of(pitch, yaw, points)[i]
+        assert float(gaze_worker.attention_scores(pitch[i], yaw[i], points[i])) == pytest.approx(batch[i])
+
+
+@pytest.mark.parametrize('collapse', ['all', 'width', 'height'])
+def test_degenerate_eye_box_is_an_error_result(frames, monkeypatch, collapse):
+    pitch, yaw, points = frames
+    points = points[:3].copy()
+    if collapse == 'all':
+        points[0] = 0.5
+    elif collapse == 'width':
+        points[0, 33, 0] = points[0, 263, 0]
+    else:
+        points[0, [27, 257, 30, 260], 1] = 0.5
+    # Even a turned head, which the kernel would otherwise label first
+    yaw = yaw[:3].copy()
+    yaw[0] = 30.0
+    assert directions_of(pitch[:3], yaw, points)[0] == 'unknown'
+
+    monkeypatch.delenv('GAZE_CACHE_DIR', raising=False)
+    analyzer = gaze_worker.GazeAnalyzer(cache_dir=None)
+    poses = [{'landmarks': points[i], 'head_pitch': pitch[i], 'head_yaw': yaw[i]} for i in range(3)]
+    results = analyzer.score_batch(poses)
+    assert results[0] == gaze_worker.no_face_result(gaze_worker.DEGENERATE_EYE_ERROR)
+    assert 'error' not in results[1] and 'error' not in results[2]
+    assert results[1]['gaze_direction'] == reference_direction(pitch[1], yaw[1], points[1])
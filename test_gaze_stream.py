@@ -0,0 +1,78 @@
+"""Tests for gaze stream smoothing and fixation/saccade segmentation."""
+
+import math
+
+import pytest
+
+from gaze_stream import GazeStreamProcessor, OneEuroFilter
+
+
+def test_one_euro_filter_passes_first_sample_and_constants():
+    f = OneEuroFilter()
+    assert f(3.0, 0.0) == 3.0
+    for i in range(1, 20):
+        assert f(3.0, i / 30.0) == pytest.approx(3.0)
+
+
+def test_one_euro_filter_reduces_jitter():
+    f = OneEuroFilter(min_cutoff=1.0, beta=0.0)
+    samples = [(-1) ** i for i in range(60)]
+    out = [f(x, i / 30.0) for i, x in enumerate(samples)]
+    assert max(abs(v) for v in out[10:]) < 0.5
+
+
+def test_one_euro_filter_follows_fast_motion_with_beta():
+    slow = OneEuroFilter(min_cutoff=1.0, beta=0.0)
+    fast = OneEuroFilter(min_cutoff=1.0, beta=1.0)
+    for i in range(30):
+        x = 10.0 * i
+        slow_out = slow(x, i / 30.0)
+        fast_out = fast(x, i / 30.0)
+    assert abs(fast_out - x) < abs(slow_out - x)
+
+
+def test_one_euro_filter_ignores_non_increasing_time():
+    f = OneEuroFilter()
+    f(1.0, 1.0)
+    assert f(5.0, 1.0) == 5.0
+    assert f(5.0, 0.5) == 5.0
+
+
+def frame(yaw=0.0, attention=1.0):
+    return {'head_pitch': 0.0, 'head_yaw': yaw, 'iris_horizontal': 0.5,
+            'iris_vertical': 0.5, 'attention_score': attention}
+
+
+def test_stream_segments_fixation_saccade_fixation():
+    processor = GazeStreamProcessor(beta=1.0)
+    segments = []
+    yaws = [0.0] * 10 + [20.0 * i for i in range(1, 6)] + [100.0] * 20
+    for i, yaw in enumerate(yaws):
+        update = processor.update(frame(yaw), i * 33.0)
+        if update['segment'] is not None:
+            segments.append(update['segment'])
+    segments.append(processor.finish())
+
+    kinds = [s['type'] for s in segments]
+    assert kinds[0] == 'fixation' and 'saccade' in kinds and kinds[-1] == 'fixation'
+    summary = processor.summary()
+    assert summary['frames'] == len(yaws)
+    assert summary['frames_with_face'] == len(yaws)
+    assert summary['mean_attention'] == 1.0
+
+
+def test_stream_frame_without_face_ends_segment_and_resets_filters():
+    processor = GazeStreamProcessor()
+    for i in range(5):
+        processor.update(frame(attention=0.5), i * 33.0)
+    update = processor.update({'error': 'No face detected'}, 5 * 33.0)
+    assert update['smoothed'] is None
+    assert update['segment']['type'] == 'fixation'
+    assert update['segment']['frames'] == 5
+    assert update['segment']['mean_attention'] == 0.5
+    assert all(f.x_prev is None for f in processor.filters.values())
+
+    restarted = processor.update(frame(yaw=45.0), 6 * 33.0)
+    assert restarted['smoothed']['head_yaw'] == 45.0
+    assert restarted['smoothed']['velocity_deg_s'] == 0.0
+    assert not math.isnan(processor.summary()['mean_attention'])
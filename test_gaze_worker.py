@@ -0,0 +1,142 @@
+"""Tests for the resident gaze worker's --serve loop (backend/gaze_worker.py)."""
+
+import io
+import json
+import types
+
+import numpy as np
+import pytest
+
+pytest.importorskip('mediapipe')
+cv2 = pytest.importorskip('cv2')
+
+import gaze_worker
+
+
+def serve_lines(monkeypatch, lines):
+    monkeypatch.delenv('GAZE_CACHE_DIR', raising=False)
+    stdout = io.StringIO()
+    gaze_worker.serve(io.StringIO(''.join(line + '\n' for line in lines)), stdout)
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+def test_serve_survives_a_bad_request(monkeypatch, tmp_path):
+    responses = serve_lines(monkeypatch, [
+        json.dumps({'id': 1, 'end_stream': ['not', 'hashable']}),
+        'not json {',
+        json.dumps({'id': 2, 'end_stream': 'session-1'}),
+        json.dumps({'id': 3, 'image_path': str(tmp_path / 'missing.jpg')}),
+    ])
+    assert responses[0]['ready'] is True
+    assert responses[1]['id'] == 1 and 'error' in responses[1]
+    assert 'error' in responses[2]
+    assert responses[3] == {'ended': True, 'id': 2}
+    assert responses[4]['id'] == 3 and 'File not found' in responses[4]['error']
+
+
+def test_serve_answers_invalid_json_without_stopping(monkeypatch):
+    responses = serve_lines(monkeypatch, ['{"id": 1,', json.dumps({'id': 2, 'end_stream': 's'})])
+    assert 'Invalid request' in responses[1]['error']
+    assert responses[2] == {'ended': True, 'id': 2}
+
+
+class FaceMeshReplay:
+    """FaceMesh stand-in returning the queued landmark arrays (None = no face)."""
+
+    def __init__(self, *frames):
+        self.frames = list(frames)
+
+    def process(self, image):
+        points = self.frames.pop(0)
+        if points is None:
+            return types.SimpleNamespace(multi_face_landmarks=None)
+        landmark = [types.SimpleNamespace(x=x, y=y, z=z) for x, y, z in points]
+        return types.SimpleNamespace(multi_face_landmarks=[types.SimpleNamespace(landmark=landmark)])
+
+
+def face_points(analyzer, h, w, yaw_degrees=0.0):
+    """Landmarks whose pose points are the 3D face model projected at a given yaw."""
+    rotation = np.array([0.0, np.radians(yaw_degrees), 0.0])
+    projected, _ = cv2.projectPoints(analyzer.face_3d, rotation, np.array([0.0, 0.0, 2000.0]),
+                                     analyzer.camera_matrix(h, w), analyzer.dist_coeffs)
+    points = np.full((478, 3), 0.5)
+    points[gaze_worker.POSE_LANDMARKS, 0] = projected[:, 0, 0] / w
+    points[gaze_worker.POSE_LANDMARKS, 1] = projected[:, 0, 1] / h
+    return points
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.delenv('GAZE_CACHE_DIR', raising=False)
+    return gaze_worker.GazeAnalyzer(cache_dir=None)
+
+
+def test_camera_matrix_is_cached_per_resolution(analyzer):
+    matrix = analyzer.camera_matrix(480, 640)
+    assert analyzer.camera_matrix(480, 640) is matrix
+    other = analyzer.camera_matrix(720, 1280)
+    assert other is not matrix
+    assert other[0, 0] == 1280
+
+
+def test_stream_pose_is_seeded_from_previous_frame_and_reset_without_face(analyzer, monkeypatch):
+    h, w = 480, 640
+    calls = []
+    solve_pnp = cv2.solvePnP
+
+    def recording_solve_pnp(*args, **kwargs):
+        calls.append(kwargs.get('useExtrinsicGuess', False))
+        return solve_pnp(*args, **kwargs)
+
+    monkeypatch.setattr(gaze_worker.cv2, 'solvePnP', recording_solve_pnp)
+    face_mesh = FaceMeshReplay(face_points(analyzer, h, w), face_points(analyzer, h, w, 5.0), None,
+                               face_points(analyzer, h, w))
+    image = np.zeros((h, w, 3), dtype=np.uint8)
+    pose_state = {}
+
+    first = analyzer.landmarks_and_pose(image, face_mesh, pose_state=pose_state)
+    assert set(pose_state) == {'rotation_vec', 'translation_vec'}
+    second = analyzer.landmarks_and_pose(image, face_mesh, pose_state=pose_state)
+    assert abs(second['head_yaw'] - first['head_yaw']) == pytest.approx(5.0, abs=0.5)
+
+    assert analyzer.landmarks_and_pose(image, face_mesh, pose_state=pose_state)['error'] == gaze_worker.NO_FACE_ERROR
+    assert pose_state == {}
+    analyzer.landmarks_and_pose(image, face_mesh, pose_state=pose_state)
+    # Cold solve, warm start from frame 1, then cold again after the face was lost
+    assert calls == [False, True, False]
+
+
+def write_video(path, n_frames=6):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for _ in range(n_frames):
+        writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+@pytest.mark.parametrize('frame_step', [0, -1, 1.5, '2', True])
+def test_video_rejects_invalid_frame_step(analyzer, tmp_path, frame_step):
+    result = analyzer.estimate_gaze_video(write_video(tmp_path / 'clip.avi'), frame_step)
+    assert 'frame_step' in result['error']
+
+
+def test_video_uses_a_private_mesh_and_keeps_live_streams(analyzer, tmp_path):
+    path = write_video(tmp_path / 'clip.avi')
+    for i in range(analyzer.MAX_TRACKED_STREAMS):
+        analyzer.get_tracking_mesh(f'session-{i}')
+    live = dict(analyzer.tracking_meshes)
+    meshes, closed = [], []
+    new_tracking_mesh = analyzer.new_tracking_mesh
+
+    def recording_mesh():
+        face_mesh = new_tracking_mesh()
+        face_mesh.close = lambda: closed.append(face_mesh)
+        meshes.append(face_mesh)
+        return face_mesh
+
+    analyzer.new_tracking_mesh = recording_mesh
+    result = analyzer.estimate_gaze_video(path, frame_step=2)
+    assert [frame['frame_index'] for frame in result['frames']] == [0, 2, 4]
+    assert dict(analyzer.tracking_meshes) == live
+    assert len(meshes) == 1 and meshes[0] not in live.values()
+    assert closed == meshes
@@ -0,0 +1,115 @@
+"""Tests for the model artifact registry (backend/model_registry.py)."""
+
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+import model_registry
+
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    """Registry reading a manifest in tmp_path with one artifact per format."""
+    np.save(tmp_path / 'weights.npy', np.arange(6.0))
+    with open(tmp_path / 'model.pkl', 'wb') as f:
+        pickle.dump({'coef': [1, 2, 3]}, f)
+    manifest = {'models': {
+        'weights': {'default': '1', 'versions': {'1': {'path': 'weights.npy', 'format': 'npy', 'sha256': None}}},
+        'model': {'default': '2', 'versions': {
+            '1': {'path': 'missing.pkl', 'format': 'pickle', 'sha256': None},
+            '2': {'path': 'model.pkl', 'format': 'pickle', 'sha256': None},
+        }},
+        'graph': {'default': '1', 'versions': {'1': {'path': 'model.pkl', 'format': 'onnx', 'sha256': None}}},
+    }}
+    manifest_path = tmp_path / 'model_registry.json'
+    manifest_path.write_text(json.dumps(manifest))
+    monkeypatch.setattr(model_registry, 'MANIFEST_PATH', str(manifest_path))
+    monkeypatch.setattr(model_registry, '_manifest', None)
+    monkeypatch.setattr(model_registry, '_objects', {})
+    return tmp_path
+
+
+def test_resolve_default_and_explicit_versions(registry):
+    entry = model_registry.resolve('model')
+    assert entry['version'] == '2'
+    assert entry['path'] == str(registry / 'model.pkl')
+    assert model_registry.resolve('model', 1)['path'] == str(registry / 'missing.pkl')
+    assert model_registry.exists('model')
+    assert not model_registry.exists('model', '1')
+    assert not model_registry.exists('unknown')
+
+    with pytest.raises(model_registry.ArtifactError):
+        model_registry.resolve('unknown')
+    with pytest.raises(model_registry.ArtifactError):
+        model_registry.resolve('model', '3')
+
+
+def test_verify_checks_recorded_checksum(registry, capsys):
+    with pytest.raises(FileNotFoundError):
+        model_registry.verify(model_registry.resolve('model', '1'))
+
+    model_registry.verify(model_registry.resolve('model'))
+    assert 'no checksum recorded for model artifact model v2' in capsys.readouterr().err
+
+    digest = model_registry.record_checksum('model')
+    assert digest == model_registry.file_sha256(str(registry / 'model.pkl'))
+    model_registry.verify(model_registry.resolve('model'))
+    assert (registry / model_registry.CHECKSUM_CACHE_NAME).exists()
+    assert capsys.readouterr().err == ''
+
+    with open(registry / 'model.pkl', 'ab') as f:
+        f.write(b'tampered')
+    with pytest.raises(model_registry.ArtifactError, match='Checksum mismatch'):
+        model_registry.verify(model_registry.resolve('model'))
+
+
+def test_load_caches_objects_and_memory_maps_arrays(registry):
+    weights = model_registry.load('weights')
+    assert isinstance(weights, np.memmap)
+    np.testing.assert_array_equal(weights, np.arange(6.0))
+    assert model_registry.load('weights') is weights
+
+    model = model_registry.load('model', loader=lambda path: ('custom', path))
+    assert model == ('custom', str(registry / 'model.pkl'))
+    model_registry.clear_cache()
+    assert model_registry.load('model') == {'coef': [1, 2, 3]}
+
+
+def test_load_without_loader_for_format(registry):
+    with pytest.raises(model_registry.ArtifactError, match='No loader for format onnx'):
+        model_registry.load('graph')
+    assert 'tflite' in model_registry.LOADERS
+
+
+def test_joblib_loader_falls_back_only_on_format_errors(registry, monkeypatch):
+    joblib = pytest.importorskip('joblib')
+    path = str(registry / 'model.pkl')
+    assert model_registry._load_joblib(path) == {'coef': [1, 2, 3]}
+
+    def fail(error):
+        def load(*args, **kwargs):
+            raise error
+        return load
+
+    monkeypatch.setattr(joblib, 'load', fail(ValueError('unsupported compressor')))
+    assert model_registry._load_joblib(path) == {'coef': [1, 2, 3]}
+    monkeypatch.setattr(joblib, 'load', fail(MemoryError()))
+    with pytest.raises(MemoryError):
+        model_registry._load_joblib(path)
+
+
+def test_convert_to_joblib_adds_default_version(registry):
+    pytest.importorskip('joblib')
+    assert model_registry.convert_to_joblib('model') == '3'
+
+    entry = model_registry.resolve('model')
+    assert entry['version'] == '3'
+    assert entry['format'] == 'joblib'
+    assert entry['path'] == str(registry / 'model.v3.joblib')
+    model_registry.verify(entry)
+    assert model_registry.load('model') == {'coef': [1, 2, 3]}
+
+    with pytest.raises(model_registry.ArtifactError):
+        model_registry.convert_to_joblib('weights')
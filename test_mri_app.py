@@ -0,0 +1,181 @@
+"""Tests for the connectivity SVM app (asd_fmri/app_mri.py) with a stand-in model."""
+
+import importlib
+import io
+import json
+import sys
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+nib = pytest.importorskip('nibabel')
+
+import model_registry
+
+
+class ConstantModel:
+    n_features_in_ = 1128
+
+    def predict(self, features):
+        return np.ones(len(features), dtype=int)
+
+    def predict_proba(self, features):
+        return np.tile([0.25, 0.75], (len(features), 1))
+
+
+@pytest.fixture
+def app_module(monkeypatch, tmp_path, atlas_dir):
+    loads = []
+
+    def load(name, *args, **kwargs):
+        loads.append(name)
+        if name == 'mri_svm':
+            return ConstantModel()
+        raise FileNotFoundError(name)
+
+    monkeypatch.setattr(model_registry, 'load', load)
+    monkeypatch.setattr(model_registry, 'artifact_path', lambda name, version=None: str(tmp_path / name))
+    monkeypatch.setenv('MRI_JOB_DB', str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setenv('MRI_FEATURE_STORE', str(tmp_path / 'features'))
+    monkeypatch.chdir(tmp_path)
+    for name in ('app_mri', 'mri_jobs', 'mri_feature_store'):
+        sys.modules.pop(name, None)
+    module = importlib.import_module('app_mri')
+    module.loads = loads
+    yield module
+    if module.job_queue is not None:
+        module.job_queue.shutdown()
+        module.job_queue.store.close()
+    if module.batch_executor is not None:
+        module.batch_executor.shutdown()
+    for name in ('app_mri', 'mri_jobs', 'mri_feature_store'):
+        sys.modules.pop(name, None)
+
+
+def test_import_does_not_initialize_the_model(app_module):
+    assert app_module.loads == []
+    assert app_module.initialization_success is None
+
+    assert app_module.model_ready()
+    assert app_module.loads[0] == 'mri_svm'
+    assert app_module.EXPECTED_FEATURES == 1128
+
+
+def test_predict_rejects_structural_scan_from_header(app_module, tmp_path):
+    path = tmp_path / 'anat.nii'
+    nib.save(nib.Nifti1Image(np.zeros((8, 8, 8), dtype=np.int16), np.eye(4)), str(path))
+    client = app_module.app.test_client()
+    response = client.post('/predict_mri', data={'mri_file': (open(path, 'rb'), 'anat.nii')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert 'Structural MRI' in response.get_json()['error']
+    assert list((tmp_path / 'mri_uploads').iterdir()) == []
+
+
+def test_predict_scores_uploaded_scan(app_module, make_scan, tmp_path):
+    client = app_module.app.test_client()
+    with open(make_scan(), 'rb') as f:
+        response = client.post('/predict_mri', data={'mri_file': (f, 'rest.nii')},
+                               content_type='multipart/form-data')
+    body = response.get_json()
+    assert response.status_code == 200, body
+    assert body['diagnosis'] == 'ASD'
+    assert body['asd_probability'] == 0.75
+    assert list((tmp_path / 'mri_uploads').iterdir()) == []
+
+
+def test_job_api_scores_scan_and_removes_upload(app_module, make_scan, tmp_path):
+    client = app_module.app.test_client()
+    with open(make_scan(), 'rb') as f:
+        response = client.post('/predict_mri/jobs', data={'mri_file': (f, 'rest.nii')},
+                               content_type='multipart/form-data')
+    assert response.status_code == 202, response.get_json()
+    job_id = response.get_json()['job_id']
+
+    deadline = time.time() + 60
+    while True:
+        response = client.get(f'/predict_mri/jobs/{job_id}/result')
+        if response.status_code != 202 or time.time() > deadline:
+            break
+        time.sleep(0.05)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['diagnosis'] == 'ASD'
+    assert client.get(f'/predict_mri/jobs/{job_id}').get_json()['status'] == 'completed'
+    assert client.get('/predict_mri/jobs/unknown').status_code == 404
+    assert list((tmp_path / 'mri_uploads').iterdir()) == []
+
+
+def test_job_queue_removes_uploads_of_interrupted_jobs(app_module, tmp_path):
+    leftover = tmp_path / 'leftover.nii'
+    leftover.write_bytes(b'scan')
+    store = app_module.mri_jobs.JobStore()
+    job_id = store.create('leftover.nii', {'path': str(leftover), 'digest': None, 'filename': 'leftover.nii'})
+    store.create('no-payload.nii')
+    store.close()
+
+    queue = app_module.get_job_queue()
+    assert not leftover.exists()
+    assert queue.store.get(job_id)['status'] == 'failed'
+
+
+class HeldExecutor:
+    """Hands out futures that never start, failing from the ``fail_at``-th submit on."""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.futures = []
+
+    def submit(self, fn, *args):
+        if len(self.futures) == self.fail_at:
+            raise RuntimeError('cannot schedule new futures after shutdown')
+        self.futures.append(Future())
+        return self.futures[-1]
+
+
+def batch_files(make_scan):
+    return [(open(make_scan(name=f'{i}.nii', seed=i), 'rb'), f'{i}.nii') for i in range(3)]
+
+
+def test_batch_removes_uploads_when_submit_fails(app_module, make_scan, tmp_path, monkeypatch):
+    executor = HeldExecutor(fail_at=1)
+    monkeypatch.setattr(app_module, 'get_batch_executor', lambda: executor)
+    assert app_module.model_ready()
+    response = app_module.app.test_client().post(
+        '/predict_mri/batch', data={'mri_files': batch_files(make_scan)}, content_type='multipart/form-data')
+    assert response.status_code == 500
+    assert executor.futures[0].cancelled()
+    assert list((tmp_path / 'mri_uploads').iterdir()) == []
+
+
+def test_batch_removes_uploads_when_body_is_never_read(app_module, make_scan, tmp_path, monkeypatch):
+    executor = HeldExecutor()
+    monkeypatch.setattr(app_module, 'get_batch_executor', lambda: executor)
+    assert app_module.model_ready()
+    # The test client always reads the first chunk, so dispatch directly to
+    # model a client that disconnects before the body is streamed
+    with app_module.app.test_request_context('/predict_mri/batch', method='POST',
+                                             data={'mri_files': batch_files(make_scan)},
+                                             content_type='multipart/form-data'):
+        response = app_module.app.full_dispatch_request()
+    assert response.status_code == 200
+    assert len(list((tmp_path / 'mri_uploads').iterdir())) == 3
+
+    response.close()
+    assert all(future.cancelled() for future in executor.futures)
+    assert list((tmp_path / 'mri_uploads').iterdir()) == []
+
+
+def test_batch_streams_a_result_per_scan(app_module, make_scan, tmp_path):
+    client = app_module.app.test_client()
+    response = client.post('/predict_mri/batch', data={'mri_files': batch_files(make_scan)},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(line['filename'] for line in lines[:-1]) == ['0.nii', '1.nii', '2.nii']
+    assert all(line['success'] and line['asd_probability'] == 0.75 for line in lines[:-1])
+    assert lines[-1]['summary'] and lines[-1]['succeeded'] == 3
+    assert list((tmp_path / 'mri_uploads').iterdir()) == []
@@ -0,0 +1,98 @@
+"""Tests for the micro-batching in front of the MRI CNN (asd_fmri/mri_batcher.py)."""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from mri_batcher import MicroBatcher
+
+
+class GatedPredict:
+    """Fake predict_fn: blocks the first call until released, records batch sizes."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = fail
+
+    def __call__(self, images):
+        self.batches.append(len(images))
+        if len(self.batches) == 1:
+            self.started.set()
+            self.release.wait(10)
+        if self.fail:
+            raise RuntimeError('model failed')
+        return images[:, 0]
+
+
+def rows(*values):
+    return np.array(values, dtype=float).reshape(-1, 1)
+
+
+@pytest.fixture
+def batcher_factory():
+    batchers = []
+
+    def make(predict_fn, **kwargs):
+        batchers.append(MicroBatcher(predict_fn, **kwargs))
+        return batchers[-1]
+
+    yield make
+    for batcher in batchers:
+        batcher.close()
+
+
+def test_concurrent_submits_share_one_predict_call(batcher_factory):
+    predict = GatedPredict()
+    # A long wait, so batches here are only flushed by filling up
+    batcher = batcher_factory(predict, max_batch_size=6, max_wait_ms=10000)
+    # Holds the batcher thread while the next requests queue up behind it
+    first = batcher.submit(rows(*range(6)))
+    assert predict.started.wait(5)
+    futures = [batcher.submit(rows(i, i + 0.5)) for i in range(1, 4)]
+    predict.release.set()
+
+    assert first.result(5).tolist() == list(range(6))
+    assert [f.result(5).tolist() for f in futures] == [[1, 1.5], [2, 2.5], [3, 3.5]]
+    assert predict.batches == [6, 6]
+
+
+def test_batch_is_flushed_when_full(batcher_factory):
+    predict = GatedPredict()
+    batcher = batcher_factory(predict, max_batch_size=2, max_wait_ms=10000)
+    batcher.submit(rows(0, 0))
+    assert predict.started.wait(5)
+    futures = [batcher.submit(rows(i)) for i in range(1, 5)]
+    predict.release.set()
+
+    assert [f.result(5).tolist() for f in futures] == [[1], [2], [3], [4]]
+    assert predict.batches == [2, 2, 2]
+
+
+def test_partial_batch_is_flushed_after_max_wait(batcher_factory):
+    predict = GatedPredict()
+    predict.release.set()
+    batcher = batcher_factory(predict, max_batch_size=16, max_wait_ms=50)
+    start = time.monotonic()
+    assert batcher.predict(rows(1, 2), timeout=5).tolist() == [1, 2]
+    assert time.monotonic() - start >= 0.04
+    assert predict.batches == [2]
+
+
+def test_predict_error_reaches_every_waiting_future(batcher_factory):
+    predict = GatedPredict(fail=True)
+    batcher = batcher_factory(predict, max_batch_size=16, max_wait_ms=0)
+    first = batcher.submit(rows(0))
+    assert predict.started.wait(5)
+    futures = [batcher.submit(rows(i)) for i in range(1, 3)]
+    predict.release.set()
+
+    for future in [first] + futures:
+        with pytest.raises(RuntimeError, match='model failed'):
+            future.result(5)
+    # The batcher keeps serving after a failed batch
+    predict.fail = False
+    assert batcher.predict(rows(7), timeout=5).tolist() == [7]
@@ -0,0 +1,72 @@
+"""Tests for the resident MRI CNN server (asd_fmri/mri_cnn_server.py) with a stub model."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('cv2')
+pytest.importorskip('nibabel')
+
+import mri_cnn_server
+import predict_mri
+from mri_batcher import MicroBatcher
+
+
+class SliceIndexModel:
+    """Stub CNN: the probability of each row rises with its position in the batch."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, images, verbose=0):
+        self.batch_sizes.append(len(images))
+        return np.linspace(0.2, 0.6, len(images)).reshape(-1, 1)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    model = SliceIndexModel()
+    monkeypatch.setattr(predict_mri, 'model', model)
+    batcher = MicroBatcher(predict_mri.predict_probabilities, max_wait_ms=0)
+    monkeypatch.setattr(mri_cnn_server, 'batcher', batcher)
+    yield mri_cnn_server.app.test_client(), model
+    batcher.close()
+
+
+def test_predict_scores_sampled_slices(client, make_scan):
+    client, model = client
+    response = client.post('/predict', json={'file_path': make_scan(), 'filename': 'rest.nii',
+                                              'slices': 3, 'aggregate': 'max', 'threshold': 0.5})
+    body = response.get_json()
+    assert response.status_code == 200, body
+    assert model.batch_sizes == [3]
+    assert body['filename'] == 'rest.nii'
+    assert body['slice_probabilities'] == [0.2, 0.4, 0.6]
+    assert body['asd_probability'] == 0.6
+    assert body['diagnosis'] == 'ASD'
+    assert body['threshold_used'] == 0.5
+
+
+def test_predict_defaults_to_one_slice(client, make_scan):
+    client, model = client
+    body = client.post('/predict', json={'file_path': make_scan()}).get_json()
+    assert model.batch_sizes == [1]
+    assert body['diagnosis'] == 'No ASD'
+    assert body['filename'] == 'scan.nii'
+    assert 'slice_probabilities' not in body
+
+
+def test_predict_rejects_bad_requests(client, make_scan, tmp_path):
+    client, model = client
+    assert client.post('/predict', json={}).status_code == 400
+    assert client.post('/predict', json={'file_path': str(tmp_path / 'missing.nii')}).status_code == 404
+    assert client.post('/predict', json={'file_path': make_scan(), 'slices': 'many'}).status_code == 400
+    assert client.post('/predict', json={'file_path': make_scan(), 'aggregate': 'median'}).status_code == 400
+    assert model.batch_sizes == []
+
+
+def test_health_reports_loaded_model(client):
+    client, _ = client
+    body = client.get('/health').get_json()
+    assert body['model_loaded'] is True
+    assert body['max_batch_size'] == mri_cnn_server.MAX_BATCH_SIZE
@@ -0,0 +1,90 @@
+"""Tests for the persistent connectivity feature store."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('nibabel')
+pytest.importorskip('scipy')
+
+import mri_feature_store
+import mri_features
+from mri_feature_store import FeatureStore
+
+
+def test_round_trip_is_exact_and_padded(tmp_path):
+    store = FeatureStore(str(tmp_path), n_features=10)
+    rng = np.random.default_rng(0)
+    full = rng.standard_normal(10)
+    short = rng.standard_normal(6)
+    store.put('a' * 64, full, 'a.nii')
+    store.put('b' * 64, short, 'b.nii')
+
+    np.testing.assert_array_equal(store.get('a' * 64), full)
+    np.testing.assert_array_equal(store.get('b' * 64), short)
+    assert store.get('c' * 64) is None
+
+    digests, matrix = store.matrix()
+    assert digests == ['a' * 64, 'b' * 64]
+    np.testing.assert_array_equal(matrix[0], full)
+    np.testing.assert_array_equal(matrix[1, :6], short)
+    assert not matrix[1, 6:].any()
+    assert not isinstance(matrix, np.memmap)
+    store.close()
+
+
+def test_put_keeps_the_first_vector_and_rejects_long_ones(tmp_path):
+    store = FeatureStore(str(tmp_path), n_features=4)
+    store.put('d', [1.0, 2.0])
+    store.put('d', [3.0, 4.0])
+    np.testing.assert_array_equal(store.get('d'), [1.0, 2.0])
+    assert store._rows() == 1
+    with pytest.raises(ValueError):
+        store.put('e', np.zeros(5))
+    store.close()
+
+
+def test_resampling_targets_are_stored_separately(tmp_path):
+    data = FeatureStore(str(tmp_path), n_features=3, resampling_target='data')
+    labels = FeatureStore(str(tmp_path), n_features=3, resampling_target='labels')
+    data.put('d', [1.0, 2.0, 3.0])
+    assert labels.get('d') is None
+    labels.put('d', [4.0, 5.0, 6.0])
+    np.testing.assert_array_equal(data.get('d'), [1.0, 2.0, 3.0])
+    np.testing.assert_array_equal(labels.get('d'), [4.0, 5.0, 6.0])
+    assert [len(store.matrix()[0]) for store in (data, labels)] == [1, 1]
+    data.close()
+    labels.close()
+
+
+def test_scan_features_from_store_match_fresh_extraction(atlas_dir, make_scan, tmp_path, monkeypatch):
+    monkeypatch.setattr(mri_feature_store, '_stores', {})
+    scan = make_scan()
+    store_dir = str(tmp_path / 'store')
+
+    fresh, cached = mri_feature_store.scan_features(scan, store_dir)
+    assert not cached
+    again, cached = mri_feature_store.scan_features(scan, store_dir)
+    assert cached
+    np.testing.assert_array_equal(again, fresh)
+    np.testing.assert_array_equal(fresh, mri_features.connectivity_features(scan))
+    for store in mri_feature_store._stores.values():
+        store.close()
+
+
+def test_time_series_are_correlated_together_and_stored(atlas_dir, make_scan, tmp_path, monkeypatch):
+    monkeypatch.setattr(mri_feature_store, '_stores', {})
+    scans = [make_scan(name=f'{i}.nii', seed=i) for i in range(3)]
+    store_dir = str(tmp_path / 'store')
+
+    results = [mri_feature_store.scan_features_or_time_series(scan, store_dir) for scan in scans]
+    assert all(features is None for _, features, _ in results)
+    digests, _, time_series = zip(*results)
+    features = mri_feature_store.store_time_series_features(time_series, digests, None, store_dir)
+    for scan, vector in zip(scans, features):
+        np.testing.assert_allclose(vector, mri_features.connectivity_features(scan), atol=1e-12)
+
+    digest, stored, time_series = mri_feature_store.scan_features_or_time_series(scans[1], store_dir)
+    assert digest == digests[1] and time_series is None
+    np.testing.assert_array_equal(stored, features[1])
+    for store in mri_feature_store._stores.values():
+        store.close()
@@ -0,0 +1,100 @@
+"""Tests for region time-series extraction and the correlation kernel."""
+
+import warnings
+
+import numpy as np
+import pytest
+
+nib = pytest.importorskip('nibabel')
+pytest.importorskip('nilearn')
+pytest.importorskip('scipy')
+
+import mri_atlas
+import mri_features
+from nilearn.connectome import ConnectivityMeasure
+from nilearn.maskers import NiftiLabelsMasker
+
+
+@pytest.mark.parametrize('resampling_target', ['data', 'labels'])
+def test_region_time_series_matches_nilearn_masker(atlas_dir, make_scan, resampling_target):
+    scan = make_scan()
+    atlas_img = mri_atlas.load_atlas()[0]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = NiftiLabelsMasker(labels_img=atlas_img, standardize='zscore_sample',
+                                     resampling_target=resampling_target).fit_transform(scan)
+    time_series = mri_features.region_time_series(scan, resampling_target)
+    assert time_series.shape == expected.shape
+    # nilearn averages in float32 after resampling; the sparse path stays in float64
+    np.testing.assert_allclose(time_series, expected, atol=1e-4 if resampling_target == 'labels' else 1e-10)
+
+
+def test_resampled_voxels_do_not_depend_on_chunking(atlas_dir, make_scan, monkeypatch):
+    scan = make_scan(n_timepoints=37)
+    whole = mri_features.region_time_series(scan, 'labels')
+    monkeypatch.setattr(mri_features, 'RESAMPLE_CHUNK', 5)
+    np.testing.assert_array_equal(mri_features.region_time_series(scan, 'labels'), whole)
+
+
+def test_region_time_series_rejects_unknown_target(atlas_dir, make_scan):
+    with pytest.raises(ValueError):
+        mri_features.region_time_series(make_scan(), 'atlas')
+
+
+def test_validate_fmri_shape():
+    mri_features.validate_fmri_shape((10, 10, 10, mri_features.MIN_TIMEPOINTS))
+    for shape in [(10, 10, 10), (10, 10), (10, 10, 10, mri_features.MIN_TIMEPOINTS - 1)]:
+        with pytest.raises(ValueError):
+            mri_features.validate_fmri_shape(shape)
+
+
+def test_align_features_pads_and_truncates():
+    features = np.arange(5.0)
+    np.testing.assert_array_equal(mri_features.align_features(features, 7), [0, 1, 2, 3, 4, 0, 0])
+    np.testing.assert_array_equal(mri_features.align_features(features, 3), [0, 1, 2])
+
+
+@pytest.mark.parametrize('zscored', [False, True])
+def test_correlation_kernel_matches_connectivity_measure(zscored):
+    rng = np.random.default_rng(0)
+    series = rng.normal(size=(80, 6)) * rng.uniform(0.5, 20, 6) + rng.uniform(-50, 50, 6)
+    series[:, 1] += 0.7 * series[:, 0]
+    if zscored:
+        series = mri_features.standardize(series)
+    original = series.copy()
+    kernel = mri_features.CorrelationKernel(6)
+
+    matrix = ConnectivityMeasure(kind='correlation').fit_transform([series])[0]
+    features = kernel(series)
+    np.testing.assert_allclose(features, matrix[kernel.rows, kernel.cols], atol=1e-12)
+    np.testing.assert_array_equal(series, original)
+
+    out = np.zeros(kernel.n_features + 2)
+    kernel(series, out=out[:kernel.n_features])
+    np.testing.assert_array_equal(out[:kernel.n_features], features)
+    assert not out[kernel.n_features:].any()
+
+
+def test_correlation_kernel_batch_matches_connectivity_measure():
+    rng = np.random.default_rng(1)
+    stack = rng.normal(size=(4, 60, 6)) * rng.uniform(0.5, 20, (4, 1, 6)) + rng.uniform(-50, 50, (4, 1, 6))
+    stack[:, :, 2] += 0.5 * stack[:, :, 3]
+    original = stack.copy()
+    kernel = mri_features.CorrelationKernel(6)
+
+    matrices = ConnectivityMeasure(kind='correlation').fit_transform(list(stack))
+    features = kernel.batch(stack)
+    np.testing.assert_allclose(features, matrices[:, kernel.rows, kernel.cols], atol=1e-12)
+    np.testing.assert_array_equal(stack, original)
+
+    zscored = mri_features.standardize(stack.copy(), axis=1)
+    np.testing.assert_allclose(kernel.batch(zscored, standardized=True), features, atol=1e-12)
+    np.testing.assert_allclose(kernel(zscored[1], standardized=True), features[1], atol=1e-12)
+
+
+def test_batch_connectivity_features_groups_by_shape():
+    rng = np.random.default_rng(2)
+    series = [mri_features.standardize(rng.normal(size=shape)) for shape in [(50, 5), (70, 5), (50, 5), (50, 4)]]
+    features = mri_features.batch_connectivity_features(series)
+    for vector, one in zip(features, series):
+        np.testing.assert_allclose(vector, mri_features.correlation_kernel(one.shape[1])(one), atol=1e-12)
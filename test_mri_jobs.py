@@ -0,0 +1,96 @@
+"""Tests for the MRI job store/queue (asd_fmri/mri_jobs.py) and the job API."""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import mri_jobs
+
+
+def wait_for(store, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = store.get(job_id)
+        if job['status'] in (mri_jobs.COMPLETED, mri_jobs.FAILED):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = mri_jobs.JobStore(str(tmp_path / 'jobs.sqlite3'))
+    yield store
+    store.close()
+
+
+def test_completed_and_failed_jobs_run_cleanup(store):
+    cleaned = []
+
+    def run_job(payload, set_stage):
+        set_stage('working')
+        if payload['fail']:
+            raise ValueError('bad scan')
+        return {'value': payload['value']}
+
+    queue = mri_jobs.JobQueue(run_job, store, max_workers=2, cleanup=cleaned.append)
+    ok = queue.submit({'fail': False, 'value': 3}, 'a.nii')
+    bad = queue.submit({'fail': True, 'value': 0}, 'b.nii')
+    queue.shutdown()
+
+    job = wait_for(store, ok)
+    assert job['status'] == mri_jobs.COMPLETED
+    assert job['result'] == {'value': 3}
+    assert job['filename'] == 'a.nii'
+    job = wait_for(store, bad)
+    assert job['status'] == mri_jobs.FAILED
+    assert job['error'] == 'bad scan'
+    assert sorted(p['value'] for p in cleaned) == [0, 3]
+    assert store.get('missing') is None
+
+
+def test_submit_raises_queue_full(store):
+    release = threading.Event()
+    queue = mri_jobs.JobQueue(lambda payload, set_stage: release.wait(10) and {}, store,
+                              max_workers=1, max_pending=1)
+    queue.submit({})
+    with pytest.raises(mri_jobs.QueueFull):
+        queue.submit({})
+    release.set()
+    queue.shutdown()
+
+
+def test_interrupt_unfinished_returns_payloads(store):
+    queued = store.create('a.nii', {'path': 'a.nii'})
+    running = store.create('b.nii')
+    store.update(running, status=mri_jobs.RUNNING)
+    done = store.create('c.nii', {'path': 'c.nii'})
+    store.update(done, status=mri_jobs.COMPLETED, result={})
+
+    payloads = store.interrupt_unfinished()
+    assert sorted(payloads, key=str) == [None, {'path': 'a.nii'}]
+    assert store.get(queued)['status'] == mri_jobs.FAILED
+    assert 'restart' in store.get(running)['error']
+    assert store.get(done)['status'] == mri_jobs.COMPLETED
+    assert store.interrupt_unfinished() == []
+
+
+def test_old_table_gains_payload_column(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute(
+        'CREATE TABLE jobs (id TEXT PRIMARY KEY, filename TEXT, status TEXT NOT NULL, stage TEXT, '
+        'result TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL)'
+    )
+    conn.execute("INSERT INTO jobs VALUES ('old', 'x.nii', 'running', 'running', NULL, NULL, 0, 0)")
+    conn.commit()
+    conn.close()
+
+    store = mri_jobs.JobStore(path)
+    assert store.interrupt_unfinished() == [None]
+    job_id = store.create('y.nii', {'path': 'y.nii'})
+    assert store.interrupt_unfinished() == [{'path': 'y.nii'}]
+    assert store.get(job_id)['status'] == mri_jobs.FAILED
+    store.close()
@@ -1,28 +1,29 @@
 """Test MRI Pipeline Setup"""
 print('Testing MRI Pipeline Initialization...\n')
 
+import sys
 from pathlib import Path
 import joblib
-from nilearn import datasets
-from nilearn.maskers import NiftiLabelsMasker
-from nilearn.connectome import ConnectivityMeasure
-
-print('✓ All imports successful')
 
 backend_dir = Path('backend')
 asd_fmri_dir = backend_dir / 'asd_fmri'
+sys.path.insert(0, str(asd_fmri_dir))
+import mri_atlas
+import mri_features
+
+print('✓ All imports successful')
 model = joblib.load(asd_fmri_dir / 'asd_svm_model.pkl')
 scaler = joblib.load(asd_fmri_dir / 'scaler.pkl')
 print('✓ Model and scaler loaded')
 
-atlas = datasets.fetch_atlas_harvard_oxford('cort-maxprob-thr25-2mm')
-print('✓ Harvard-Oxford Atlas loaded')
+atlas_img, _ = mri_atlas.load_atlas()
+print(f'✓ Harvard-Oxford Atlas loaded from {mri_atlas.atlas_file()}')
 
-masker = NiftiLabelsMasker(labels_img=atlas.maps, standardize=True)
-print('✓ NiftiLabelsMasker initialized')
+label_index = mri_atlas.label_index(atlas_img.affine, atlas_img.shape)
+print(f'✓ Atlas label index ready ({label_index.n_regions} regions)')
 
-correlation_measure = ConnectivityMeasure(kind='correlation')
-print('✓ ConnectivityMeasure initialized')
+correlation_kernel = mri_features.correlation_kernel(label_index.n_regions)
+print('✓ Correlation kernel initialized')
 
 print(f'\nModel Details:')
 print(f'  - Type: {type(model).__name__}')
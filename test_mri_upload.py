@@ -0,0 +1,79 @@
+"""Tests for the streaming NIfTI upload validation (asd_fmri/mri_upload.py)."""
+
+import gzip
+import hashlib
+import io
+
+import numpy as np
+import pytest
+
+nib = pytest.importorskip('nibabel')
+pytest.importorskip('flask')
+
+import mri_upload
+
+
+def nifti_bytes(shape, image_class=None):
+    img = (image_class or nib.Nifti1Image)(np.zeros(shape, dtype=np.int16), np.eye(4))
+    buf = io.BytesIO()
+    file_map = img.make_file_map({'image': buf, 'header': buf})
+    img.to_file_map(file_map)
+    return buf.getvalue()
+
+
+def stream_in_chunks(stream, data, size=7):
+    for start in range(0, len(data), size):
+        stream.write(data[start:start + size])
+
+
+def test_parse_nifti_header_needs_whole_header():
+    data = nifti_bytes((4, 5, 6, 3))
+    assert mri_upload.parse_nifti_header(data[:100]) is None
+    assert mri_upload.parse_nifti_header(data).get_data_shape() == (4, 5, 6, 3)
+    assert mri_upload.parse_nifti_header(nifti_bytes((4, 5, 6), nib.Nifti2Image)).get_data_shape() == (4, 5, 6)
+    with pytest.raises(ValueError):
+        mri_upload.parse_nifti_header(b'not a nifti file')
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_stream_reads_shape_and_hash_while_saving(tmp_path, compressed):
+    data = nifti_bytes((4, 5, 6, 3))
+    if compressed:
+        data = gzip.compress(data)
+    shapes = []
+    stream = mri_upload.ScanUploadStream(str(tmp_path), 'scan.nii.gz', shapes.append)
+    stream_in_chunks(stream, data)
+    stream.flush()
+
+    assert stream.shape == (4, 5, 6, 3)
+    assert shapes == [(4, 5, 6, 3)]
+    assert stream.digest == hashlib.sha256(data).hexdigest()
+    path = stream.detach()
+    stream.close()
+    with open(path, 'rb') as f:
+        assert f.read() == data
+
+
+def test_stream_rejects_scan_and_removes_file(tmp_path):
+    def validate(shape):
+        if len(shape) != 4:
+            raise ValueError('Structural MRI')
+
+    stream = mri_upload.ScanUploadStream(str(tmp_path), 'anat.nii', validate)
+    with pytest.raises(mri_upload.InvalidScanUpload) as info:
+        stream_in_chunks(stream, gzip.compress(nifti_bytes((4, 5, 6))))
+    assert info.value.filename == 'anat.nii'
+    assert 'Structural MRI' in info.value.message
+    assert list(tmp_path.iterdir()) == []
+
+    stream = mri_upload.ScanUploadStream(str(tmp_path), 'bad.nii')
+    with pytest.raises(mri_upload.InvalidScanUpload):
+        stream.write(b'\x00' * 600)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_without_detach_is_deleted_on_close(tmp_path):
+    stream = mri_upload.ScanUploadStream(str(tmp_path), 'scan.nii')
+    stream.write(nifti_bytes((4, 5, 6, 3)))
+    stream.close()
+    assert list(tmp_path.iterdir()) == []
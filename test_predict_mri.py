@@ -0,0 +1,135 @@
+"""Tests for slice sampling, probability aggregation and the result channel of the MRI CNN predictor."""
+
+import io
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+pytest.importorskip('nibabel')
+
+import predict_mri
+
+
+def test_sample_indices_single_slice_is_the_middle():
+    assert predict_mri.sample_indices(40, 1) == [20]
+    assert predict_mri.sample_indices(1, 5) == [0]
+
+
+def test_sample_indices_stay_in_central_half():
+    indices = predict_mri.sample_indices(40, 5)
+    assert indices == [10, 15, 20, 24, 29]
+    assert predict_mri.sample_indices(100, 3) == [25, 50, 74]
+
+
+def test_sample_indices_with_fewer_slices_than_requested():
+    # Duplicates collapse, so a thin scan yields fewer samples than asked for
+    assert predict_mri.sample_indices(4, 8) == [1, 2]
+    assert predict_mri.sample_indices(2, 3) == [0]
+
+
+def test_nifti_slices_pairs_slices_with_volumes():
+    data = np.arange(4 * 4 * 8 * 5).reshape(4, 4, 8, 5)
+    slices = predict_mri.nifti_slices(data, 3)
+    assert len(slices) == 3
+    expected = [(z, t) for z, t in zip(predict_mri.sample_indices(8, 3), [0, 2, 4])]
+    for slice_data, (z, t) in zip(slices, expected):
+        np.testing.assert_array_equal(slice_data, data[:, :, z, t])
+    np.testing.assert_array_equal(predict_mri.nifti_slices(data)[0], data[:, :, 4, 2])
+    assert len(predict_mri.nifti_slices(data[..., 0], 3)) == 3
+    assert predict_mri.nifti_slices(data[:, :, 0, 0], 3)[0].shape == (4, 4)
+
+
+def test_aggregate_probabilities():
+    probabilities = [0.9, 0.1, 0.2, 0.3, 0.4]
+    assert predict_mri.aggregate_probabilities(probabilities, 'mean') == pytest.approx(0.38)
+    assert predict_mri.aggregate_probabilities(probabilities, 'max') == 0.9
+    # 20% trimmed from each end: 0.1 and 0.9 are dropped
+    assert predict_mri.aggregate_probabilities(probabilities, 'trimmed_mean') == pytest.approx(0.3)
+    # Too few slices to trim falls back to the plain mean
+    assert predict_mri.aggregate_probabilities([0.2, 0.8], 'trimmed_mean') == pytest.approx(0.5)
+    with pytest.raises(ValueError):
+        predict_mri.aggregate_probabilities(probabilities, 'median')
+
+
+def test_score_probabilities_thresholds_the_aggregate():
+    result = predict_mri.score_probabilities([0.2, 0.3, 0.7], threshold=0.35, aggregate='mean')
+    assert result['diagnosis'] == 'ASD'
+    assert result['asd_probability'] == 0.4
+    assert result['aggregation'] == 'mean'
+    assert result['slice_probabilities'] == [0.2, 0.3, 0.7]
+
+    single = predict_mri.score_probabilities([0.2])
+    assert single['diagnosis'] == 'No ASD'
+    assert single['confidence'] == 0.8
+    assert 'slice_probabilities' not in single
+
+
+def read_messages(fd):
+    with os.fdopen(fd, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def channels(monkeypatch, tmp_path):
+    """ResultChannels created by main(), whose model prints to stdout like TensorFlow does."""
+    class NoisyModel:
+        def predict(self, images, verbose=0):
+            print('1/1 [==============================] - 0s 20ms/step')
+            return np.full((len(images), 1), 0.8)
+
+    def initialize_model(raise_errors=False):
+        print('Loading model... {not json')
+        predict_mri.model = NoisyModel()
+        return True
+
+    monkeypatch.setattr(predict_mri, 'initialize_model', initialize_model)
+    monkeypatch.setattr(predict_mri, 'model', None)
+    # main() changes into the script directory
+    monkeypatch.chdir(tmp_path)
+
+    # main() leaves its channel open; closing it ends the pipe for the reader
+    channels = []
+    from_args = predict_mri.ResultChannel.from_args
+    monkeypatch.setattr(predict_mri.ResultChannel, 'from_args',
+                        lambda argv: channels.append(from_args(argv)) or channels[-1])
+    return channels
+
+
+def test_results_go_to_the_result_pipe(channels, monkeypatch, make_scan, capsys):
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setattr(sys, 'argv', ['predict_mri.py', make_scan(), 'rest.nii', f'--result-fd={write_fd}'])
+    predict_mri.main()
+    channels[0].stream.close()
+    messages = read_messages(read_fd)
+
+    assert [m['type'] for m in messages] == ['progress', 'timing', 'progress', 'timing',
+                                             'progress', 'timing', 'result']
+    assert [m['stage'] for m in messages if m['type'] == 'progress'] == ['load_model', 'preprocess', 'predict']
+    assert messages[-1]['diagnosis'] == 'ASD'
+    assert messages[-1]['filename'] == 'rest.nii'
+    # The noise stays on stdout and never reaches the channel
+    assert '{not json' in capsys.readouterr().out
+
+
+def test_without_result_pipe_only_the_result_is_printed():
+    channel = predict_mri.ResultChannel()
+    with redirect_stdout(io.StringIO()) as stdout:
+        with channel.stage('predict'):
+            pass
+        channel.send('result', diagnosis='ASD')
+    assert stdout.getvalue() == '{"diagnosis": "ASD"}\n'
+
+
+def test_error_is_sent_on_the_result_pipe(channels, monkeypatch, tmp_path):
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setattr(sys, 'argv', ['predict_mri.py', str(tmp_path / 'missing.nii'), f'--result-fd={write_fd}'])
+    with pytest.raises(SystemExit):
+        predict_mri.main()
+    channels[0].stream.close()
+    messages = read_messages(read_fd)
+    assert messages == [{'type': 'error', 'error': f"File not found: {tmp_path / 'missing.nii'}"}]